@@ -0,0 +1,220 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from conflict_graph import ConflictGraph, iter_bits
+from constraints import ShowConstraints
+from engines import check_engine, run_engine
+from lower_bound import Bound, LowerBound
+from show_cost import order_cost
+from show_timing import ShowTiming
+
+
+class ActPlan:
+    """How a show splits into acts around its intermissions, given by dance name.
+
+    Acts count from 0. max_sizes holds the most numbers each act can take
+    (an even split when not given), pinned maps a dance to the act it has to
+    be in, and constraints maps an act to ShowConstraints for the slots of
+    that act, which also pin every dance they name to it.
+    """
+
+    def __init__(self, acts: int = 2, max_sizes: Optional[Sequence[int]] = None,
+                 pinned: Optional[Dict[str, int]] = None,
+                 constraints: Optional[Dict[int, ShowConstraints]] = None):
+        if acts < 1:
+            raise ValueError("A show needs at least one act")
+        if max_sizes is not None and len(max_sizes) != acts:
+            raise ValueError(f"Got {len(max_sizes)} act sizes for {acts} acts")
+        self.acts = acts
+        self.max_sizes = list(max_sizes) if max_sizes is not None else None
+        self.pinned = dict(pinned or {})
+        self.constraints = dict(constraints or {})
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'ActPlan':
+        constraints = {int(act): ShowConstraints.from_dict(rules)
+                       for act, rules in spec.get("constraints", {}).items()}
+        return cls(spec.get("acts", 2), spec.get("max_sizes"), spec.get("pinned"), constraints)
+
+    def to_dict(self) -> Dict:
+        return {
+            "acts": self.acts,
+            "max_sizes": self.max_sizes,
+            "pinned": self.pinned,
+            "constraints": {str(act): rules.to_dict() for act, rules in self.constraints.items()},
+        }
+
+    def compile(self, graph: ConflictGraph) -> Tuple[List[int], Dict[int, int]]:
+        """The size limit of every act and {dance ID: act} for the pinned dances.
+
+        Raises ValueError naming the problem if the dances cannot fit.
+        """
+        sizes = self.max_sizes or [-(-len(graph) // self.acts)] * self.acts
+        if sum(sizes) < len(graph):
+            raise ValueError(f"Acts of at most {', '.join(map(str, sizes))} numbers "
+                             f"cannot hold all {len(graph)} dances")
+
+        pinned = {}
+
+        def pin(name, act):
+            if name not in graph.dance_index:
+                raise ValueError(f"Unknown dance {name!r} in the act plan")
+            if not 0 <= act < self.acts:
+                raise ValueError(f"{name} is pinned to act {act}, outside acts 0-{self.acts - 1}")
+            dance = graph.dance_index[name]
+            if pinned.get(dance, act) != act:
+                raise ValueError(f"{name} is pinned to both act {pinned[dance]} and act {act}")
+            pinned[dance] = act
+
+        for name, act in self.pinned.items():
+            pin(name, act)
+        for act, rules in self.constraints.items():
+            names = list(rules.pinned) + [pair_name for pair in rules.before + rules.not_adjacent
+                                          for pair_name in pair]
+            for name in names + [name for name in (rules.opener, rules.closer) if name is not None]:
+                pin(name, act)
+        for act, size in enumerate(sizes):
+            count = sum(1 for pinned_act in pinned.values() if pinned_act == act)
+            if count > size:
+                raise ValueError(f"Act {act} has {count} pinned dances but room for {size}")
+        return sizes, pinned
+
+
+class ActPartition:
+    """Splits the dances of a show into acts, keeping dancers' numbers in as few shared acts as possible.
+
+    An intermission resets every dancer's recency, so two numbers with a
+    dancer in common can only cost anything when they fall in the same act.
+    The partition minimises the number of such pairs: each dance goes
+    greedily to the act where it adds fewest, most connected dances first,
+    then single moves and random swaps between acts are kept while they
+    remove pairs. counts[act][dancer] is how many of the dancer's numbers
+    are in the act, so a move is costed from the moving dance's cast alone.
+    """
+
+    def __init__(self, graph: ConflictGraph, sizes: Sequence[int], pinned: Dict[int, int], seed=0):
+        self.graph = graph
+        self.sizes = list(sizes)
+        self.pinned = pinned
+        self.random = random.Random(seed)
+        self.counts = [[0] * len(graph.dancer_names) for _ in sizes]
+        self.members = [0] * len(sizes)
+        self.act_of: Dict[int, int] = {}
+
+    def place(self, dance: int, act: int):
+        for dancer in iter_bits(self.graph.casts[dance]):
+            self.counts[act][dancer] += 1
+        self.members[act] += 1
+        self.act_of[dance] = act
+
+    def take(self, dance: int):
+        act = self.act_of.pop(dance)
+        for dancer in iter_bits(self.graph.casts[dance]):
+            self.counts[act][dancer] -= 1
+        self.members[act] -= 1
+        return act
+
+    def added(self, dance: int, act: int) -> int:
+        """Pairs of numbers sharing a dancer that dance would add to act"""
+        counts = self.counts[act]
+        return sum(counts[dancer] for dancer in iter_bits(self.graph.casts[dance]))
+
+    def has_room(self, act: int) -> bool:
+        return self.members[act] < self.sizes[act]
+
+    def partition(self, passes: int = 4, swaps_per_dance: int = 8) -> List[List[int]]:
+        for dance, act in self.pinned.items():
+            self.place(dance, act)
+        free = [dance for dance in range(len(self.graph)) if dance not in self.pinned]
+        for dance in sorted(free, key=lambda dance: (-self.graph.degree(dance), dance)):
+            act = min((act for act in range(len(self.sizes)) if self.has_room(act)),
+                      key=lambda act: (self.added(dance, act), self.members[act]))
+            self.place(dance, act)
+
+        for _ in range(passes):
+            improved = False
+            for dance in free:
+                current = self.take(dance)
+                best = min((act for act in range(len(self.sizes)) if act == current or self.has_room(act)),
+                           key=lambda act: (self.added(dance, act), act != current))
+                self.place(dance, best)
+                improved |= best != current
+            for _ in range(swaps_per_dance * len(free) if len(self.sizes) > 1 and len(free) > 1 else 0):
+                improved |= self.try_swap(*self.random.sample(free, 2))
+            if not improved:
+                break
+        return self.acts()
+
+    def try_swap(self, dance: int, other: int) -> bool:
+        """Swap two dances between their acts if that removes pairs"""
+        act, other_act = self.act_of[dance], self.act_of[other]
+        if act == other_act:
+            return False
+        before = self.added_after_take(dance) + self.added_after_take(other)
+        self.take(dance)
+        self.take(other)
+        after = self.added(dance, other_act)
+        self.place(dance, other_act)
+        after += self.added(other, act)
+        if after < before:
+            self.place(other, act)
+            return True
+        self.take(dance)
+        self.place(dance, act)
+        self.place(other, other_act)
+        return False
+
+    def added_after_take(self, dance: int) -> int:
+        """Pairs dance adds to its own act, counting everything else there"""
+        act = self.act_of[dance]
+        counts = self.counts[act]
+        return sum(counts[dancer] - 1 for dancer in iter_bits(self.graph.casts[dance]))
+
+    def acts(self) -> List[List[int]]:
+        acts = [[] for _ in self.sizes]
+        for dance in range(len(self.graph)):
+            acts[self.act_of[dance]].append(dance)
+        return acts
+
+
+def partition_acts(graph: ConflictGraph, plan: ActPlan, seed=0) -> List[List[int]]:
+    """The dances of every act, each in roster order"""
+    sizes, pinned = plan.compile(graph)
+    return ActPartition(graph, sizes, pinned, seed).partition()
+
+
+def acts_cost(graph: ConflictGraph, acts: Sequence[Sequence[int]]) -> int:
+    """Cost of a show played as acts, with every dancer's recency reset at each intermission"""
+    return sum(order_cost(graph, act) for act in acts)
+
+
+class ActBound(Bound):
+    """The lower bound of a show played as acts: the sum of its acts' own bounds"""
+
+    def __init__(self, bounds: Sequence[LowerBound]):
+        self.bounds = list(bounds)
+        super().__init__(sum(bound.cost for bound in self.bounds), sum(bound.instants for bound in self.bounds))
+
+
+def schedule_acts(graph: ConflictGraph, plan: ActPlan, engine: str = "anneal", time_limit: float = 1.0,
+                  seed: int = 0, workers: Optional[int] = None,
+                  timing: Optional[ShowTiming] = None) -> Tuple[int, List[List[int]]]:
+    """Partition the show into acts, then order every act with engine, in parallel.
+
+    Acts are independent once partitioned, so each is solved in its own
+    worker process with time_limit seconds. Returns the total cost and the
+    order of every act. A timing is passed on to run_engine for each act.
+    """
+    check_engine(engine)
+    acts = partition_acts(graph, plan, seed)
+    jobs = [(graph, engine, act, time_limit, seed + index, plan.constraints.get(index), None, timing)
+            for index, act in enumerate(acts)]
+    if workers == 1 or len(jobs) == 1:
+        results = [run_engine(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(jobs), workers or os.cpu_count())) as pool:
+            futures = [pool.submit(run_engine, *job) for job in jobs]
+            results = [future.result() for future in futures]
+    return sum(cost for cost, _ in results), [order for _, order in results]
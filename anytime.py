@@ -0,0 +1,60 @@
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from conflict_graph import ConflictGraph
+from engines import check_engine, run_engine
+from instrumentation import Instruments
+from show_timing import ShowTiming
+
+
+def solve_anytime(graph: ConflictGraph, engine: str = "anneal", dances: Optional[Iterable[int]] = None,
+                  time_limit: float = 1.0, seed: int = 0, constraints=None, deadline: Optional[float] = None,
+                  instruments: Optional[Instruments] = None,
+                  timing: Optional[ShowTiming] = None) -> Iterator[Tuple[List[int], int, float]]:
+    """Yield (order, cost, seconds since the start) for each new best order engine finds, as it finds it.
+
+    The engine runs as in run_engine on a worker thread, so the caller can
+    stop at any point by leaving the loop; the search is then stopped and
+    the last order yielded is the best found. It also stops after deadline
+    seconds. anneal and exact yield their starting order straight away
+    and every improvement after it; greedy, degree and beam yield their
+    one order when they finish. Errors in the engine are raised here.
+    """
+    check_engine(engine)
+    started = time.monotonic()
+    messages: queue.Queue = queue.Queue()
+    stop_event = threading.Event()
+
+    def should_stop() -> bool:
+        return stop_event.is_set() or deadline is not None and time.monotonic() - started >= deadline
+
+    def improved(order: List[int], cost: int):
+        messages.put(("improved", order, cost, time.monotonic() - started))
+
+    def work():
+        try:
+            cost, order = run_engine(graph, engine, dances, time_limit, seed, constraints, instruments, timing,
+                                     on_improve=improved, should_stop=should_stop)
+            messages.put(("done", order, cost, time.monotonic() - started))
+        except Exception as e:
+            messages.put(("error", e))
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    best = None
+    try:
+        while True:
+            message = messages.get()
+            if message[0] == "error":
+                raise message[1]
+            kind, order, cost, elapsed = message
+            if best is None or cost < best:
+                best = cost
+                yield order, cost, elapsed
+            if kind == "done":
+                return
+    finally:
+        stop_event.set()
+        thread.join()
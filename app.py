@@ -2,28 +2,29 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 from pathlib import Path
 from typing import Dict, Set
-import pandas as pd
-from collections import defaultdict
 
+from appearance_index import AppearanceIndex
+from compiled_roster import compile_dances
 from dance import Dance
 from dancebox import DanceBox
 from dancer import Dancer
-from dances import process_dances
+from live_score import LiveScore
+from lower_bound import lower_bound
+from roster_io import RosterCache
+from roster_model import graph_of
+from show_layout import ShowLayout
+from optimize_job import AlternativesJob, LoadRosterJob, OptimizeJob
+from show_cost import order_costs, weighted
+from show_timing import show_timing
 
 
 class DanceRosterApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Vertical Dance Roster Manager")
-        self.root.geometry("700x700")
+        self.root.geometry("800x700")
         self.root.resizable(True, True)
-        
-        self.file_path = None
-        self.dance_data = None
-        self.dance_boxes = []
-        self.vertical_slots = []  # Y-coordinates of valid positions
-        self.slot_height = 100    # Height between slots
-        self.margin_top = 80      # Top margin
+        self.init_state()
         
         # Create and configure the main frame
         self.main_frame = tk.Frame(root, padx=20, pady=20)
@@ -83,6 +84,19 @@ class DanceRosterApp:
         )
         self.save_button.pack(side=tk.LEFT, padx=5)
         
+        # Compile button (saves the roster, order and locks as a .rdtr file)
+        self.compile_button = tk.Button(
+            self.buttons_frame,
+            text="Compile",
+            command=self.compile_roster,
+            width=15,
+            bg="#607D8B",
+            fg="white",
+            font=("Arial", 10, "bold"),
+            state=tk.DISABLED
+        )
+        self.compile_button.pack(side=tk.LEFT, padx=5)
+        
         # Reset button
         self.reset_button = tk.Button(
             self.buttons_frame,
@@ -96,6 +110,32 @@ class DanceRosterApp:
         )
         self.reset_button.pack(side=tk.LEFT, padx=5)
         
+        # Optimize button (becomes Cancel while a search is running)
+        self.optimize_button = tk.Button(
+            self.buttons_frame,
+            text="Optimize",
+            command=self.toggle_optimize,
+            width=15,
+            bg="#9C27B0",
+            fg="white",
+            font=("Arial", 10, "bold"),
+            state=tk.DISABLED
+        )
+        self.optimize_button.pack(side=tk.LEFT, padx=5)
+        
+        # Alternatives button (finds several good orders, then steps through them)
+        self.alternatives_button = tk.Button(
+            self.buttons_frame,
+            text="Alternatives",
+            command=self.show_alternative,
+            width=15,
+            bg="#009688",
+            fg="white",
+            font=("Arial", 10, "bold"),
+            state=tk.DISABLED
+        )
+        self.alternatives_button.pack(side=tk.LEFT, padx=5)
+        
         # File path display
         self.file_path_var = tk.StringVar()
         self.file_path_var.set("No file selected")
@@ -130,13 +170,14 @@ class DanceRosterApp:
             width=550,
             height=500,
             scrollregion=(0, 0, 550, 1000),
-            yscrollcommand=self.v_scrollbar.set,
+            yscrollcommand=self.on_canvas_scroll,
             bg="white"
         )
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Configure scrollbar
         self.v_scrollbar.config(command=self.canvas.yview)
+        self.canvas.bind("<Configure>", self.render_viewport)
         
         # Status message
         self.status_var = tk.StringVar()
@@ -148,11 +189,45 @@ class DanceRosterApp:
         )
         self.status_label.pack(fill=tk.X, pady=10)
     
+    def init_state(self):
+        """Set up everything but the Tk widgets, so the display code runs without a window"""
+        self.file_path = None
+        self.dance_data = None
+        self.layout = None        # Show order and slot geometry
+        self.dance_boxes = []     # Boxes drawn for the slots in view
+        self.free_boxes = []      # Hidden boxes ready to be reused
+        self.vertical_slots = []  # Y-coordinates of valid positions
+        self.slot_height = 100    # Height between slots
+        self.margin_top = 80      # Top margin
+        self.roster_cache = RosterCache()
+        self.optimize_job = None
+        self.optimize_seconds = 10.0  # Time budget for one optimize run
+        self.poll_interval = 100      # Milliseconds between optimizer progress checks
+        self.timed_roster = None      # Roster as read, with any running and change times
+        self.score_graph = None
+        self.score_timing = None      # ShowTiming of score_graph when the roster has times
+        self.live_score = None
+        self.appearances = None
+        self.alternatives = []        # (cost, dances) of the orders found by beam search, best first
+        self.alternative_index = 0
+        self.alternatives_locks = None  # Locked slots the alternatives were found with
+        self.alternative_count = 5
+        self.alternatives_job = None  # Beam search finding alternatives in the background
+        self.load_job = None          # Roster file being read in the background
+        self.score_text = None
+        self.slot_markers = {}        # (circle, label) canvas items for each slot in view
+        self.free_markers = []
+        self.drop_preview = None      # Free-slot index the dragged box would drop into
+        self.preview_scores = {}      # Slot scores the markers show for the drop preview
+    
     def select_file(self):
         """Open a file dialog to select a file"""
         filetypes = (
             ("Excel files (.xlsx)", "*.xlsx"),
-            ("Excel files (.xls)", "*.xls")
+            ("Excel files (.xls)", "*.xls"),
+            ("CSV files (.csv)", "*.csv"),
+            ("Text rosters (.txt)", "*.txt"),
+            ("Compiled rosters (.rdtr)", "*.rdtr")
         )
         
         selected_file = filedialog.askopenfilename(
@@ -169,64 +244,72 @@ class DanceRosterApp:
             self.status_var.set("Dance list selection cancelled.")
     
     def process_file(self):
-        """Process the selected Excel file to extract dance rosters"""
+        """Read the selected roster file in the background, then display its dances"""
         if not self.file_path:
             messagebox.showerror("Error", "No file selected!")
             return
         
+        # Clear previous results
+        self.canvas.delete("all")
+        self.layout = None
+        self.dance_boxes = []
+        self.vertical_slots = []
+        self.status_var.set("Processing...")
+        
+        self.load_job = LoadRosterJob(self.file_path, self.roster_cache)
+        self.load_job.start()
+        for button in (self.upload_button, self.process_button):
+            button.config(state=tk.DISABLED)
+        self.root.after(self.poll_interval, self.poll_load)
+    
+    def poll_load(self):
+        """Display the roster once the background read finishes"""
+        job = self.load_job
+        messages = job.poll()
+        if not job.finished:
+            self.root.after(self.poll_interval, self.poll_load)
+            return
+        self.load_job = None
+        for button in (self.upload_button, self.process_button):
+            button.config(state=tk.NORMAL)
+        
+        message = messages[0]
+        if message[0] == "error":
+            self.status_var.set(f"Error: {message[1]}")
+            messagebox.showerror("Error", f"Failed to process file: {message[1]}")
+            return
+        loaded = message[1]
         try:
-            # Clear previous results
-            self.canvas.delete("all")
-            self.dance_boxes = []
-            self.vertical_slots = []
-            self.status_var.set("Processing...")
-            self.root.update()
-            
-            # Load the Excel file
-            df = pd.read_excel(self.file_path)
-            
-            # Initialize a dictionary to store dance names and dancers
-            dance_roster = defaultdict(list)
-            
-            # Process each column
-            for column in df.columns:
-                # Skip unnamed columns
-                if 'Unnamed' in str(column):
-                    continue
-                
-                # Get the dance name from the column header
-                dance_name = str(column).strip()
-                
-                if not dance_name:
-                    continue
-                
-                # Get the dancer names from non-empty cells in this column
-                dancers = [str(name).strip() for name in df[column].dropna() if str(name).strip()]
-                
-                # Store dance and dancers in the dictionary
-                if dancers:
-                    dance_roster[dance_name] = dancers
-
-            dances, all_dancers = process_dances(dance_roster)
-            
             # Display the results
-            self.display_results(dances, all_dancers)
+            self.timed_roster = loaded.timed_roster
+            self.display_results(loaded.dances, loaded.dancers)
+            if loaded.saved_order:
+                self.apply_order(loaded.saved_order)
             
             # Update status
             self.save_button.config(state=tk.NORMAL)
+            self.compile_button.config(state=tk.NORMAL)
             self.reset_button.config(state=tk.NORMAL)
-            self.status_var.set(f"Successfully processed {Path(self.file_path).name}")
+            self.optimize_button.config(state=tk.NORMAL)
+            self.alternatives_button.config(state=tk.NORMAL)
+            cached = " (cached)" if loaded.from_cache else ""
+            self.status_var.set(f"Successfully processed {Path(self.file_path).name}{cached}")
 
         except Exception as e:
             self.status_var.set(f"Error: {str(e)}")
             messagebox.showerror("Error", f"Failed to process file: {str(e)}")
-
+    
     def display_results(self, dances: Set["Dance"], dancers: Dict[str, "Dancer"]):
         """Display dance objects as vertically ordered draggable boxes on the canvas"""
         # Clear any existing content
         self.canvas.delete("all")
         self.dance_boxes: list[DanceBox] = []
-        self.vertical_slots = []
+        self.free_boxes: list[DanceBox] = []
+        
+        # The order and slot positions live in the layout; only the slots in
+        # view get canvas items, which are recycled as the canvas scrolls
+        self.layout = ShowLayout(dances, self.margin_top, self.slot_height)
+        self.vertical_slots = [self.layout.slot_y(slot) for slot in range(len(self.layout))]
         
         # Display summary at the top
         self.canvas.create_text(
@@ -238,35 +321,76 @@ class DanceRosterApp:
         
         # Create guide line down the middle
         self.canvas.create_line(
-            50, self.margin_top, 50, self.margin_top + len(dances) * self.slot_height,
+            50, self.margin_top, 50, self.layout.total_height(),
             fill="#BBDEFB", width=2, dash=(4, 4)
         )
         
-        # Create dance boxes in vertical order
-        for i, dance in enumerate(dances):
-            # Set position property
-            dance.position = i
-            
-            # Calculate vertical position
-            y_position = self.margin_top + i * self.slot_height
-            self.vertical_slots.append(y_position)
-            
-            # Create the dance box
-            dance_box = DanceBox(self, self.canvas, y_position, dance)
-            self.dance_boxes.append(dance_box)
+        self.create_score_overlay(self.layout.order)
+        self.alternatives = []
+        self.alternatives_button.config(text="Alternatives")
         
         # Update canvas scroll region
-        total_height = self.margin_top + len(dances) * self.slot_height + 50
+        total_height = self.layout.total_height() + 50
         self.canvas.config(scrollregion=(0, 0, 550, total_height))
+        self.render_viewport()
         
         # Save the dance data for potential further processing
         self.dance_data = (dances, dancers)
     
+    def on_canvas_scroll(self, first, last):
+        """Keep the scrollbar in step with the canvas and draw the slots scrolled into view"""
+        self.v_scrollbar.set(first, last)
+        self.render_viewport()
+    
+    def render_viewport(self, event=None):
+        """Give every slot in view a dance box and marker, recycling those scrolled out of view"""
+        if self.layout is None:
+            return
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), int(self.canvas.cget("height")))
+        visible = self.layout.visible_slots(top, top + height)
+        
+        # A box being dragged stays bound to its dance wherever it is
+        dragged = [box for box in self.dance_boxes if box.drag_data["dragging"]]
+        shown = {box.dance.position for box in dragged}
+        boxes = list(dragged)
+        for box in self.dance_boxes:
+            if box.drag_data["dragging"]:
+                continue
+            if box.dance.position in visible and box.dance.position not in shown:
+                boxes.append(box)
+                shown.add(box.dance.position)
+            else:
+                box.hide()
+                self.free_boxes.append(box)
+        for slot in visible:
+            if slot in shown:
+                continue
+            dance = self.layout.order[slot]
+            if self.free_boxes:
+                box = self.free_boxes.pop()
+                box.show(dance, self.layout.slot_y(slot))
+            else:
+                box = DanceBox(self, self.canvas, self.layout.slot_y(slot), dance)
+            boxes.append(box)
+        self.dance_boxes = boxes
+        for box in dragged:
+            for item in box.all_items:
+                self.canvas.tag_raise(item)
+        
+        for slot in list(self.slot_markers):
+            if slot not in visible:
+                self.free_markers.append(self.slot_markers.pop(slot))
+        for slot in visible:
+            if slot not in self.slot_markers:
+                self.slot_markers[slot] = self.free_markers.pop() if self.free_markers else self.create_slot_marker()
+                self.place_slot_marker(slot)
+    
     def find_nearest_slot(self, dragged_box):
         """Find the nearest vertical slot to snap to and the corresponding position"""
         # Check if any slots are available
         if not self.vertical_slots:
-            return dragged_box.y, dragged_box.dance.position
+            return dragged_box.y, dragged_box.dance.position, dragged_box.dance.position
         
         # Initialize variables
         min_distance = float('inf')
@@ -275,16 +399,13 @@ class DanceRosterApp:
         position = dragged_box.dance.position
         old_position = position
         
-        # Create a list of available slots that are not occupied by locked boxes
-        locked_slots = set()
-        for box in self.dance_boxes:
-            if box.dance.locked and box != dragged_box:
-                locked_slots.add(box.vertical_slot)
+        # Create a list of available slots that are not occupied by locked dances
+        locked_slots = {self.vertical_slots[slot] for slot in self.layout.locked_slots(dragged_box.dance)}
         
         available_slots = [slot for slot in self.vertical_slots if slot not in locked_slots]
         if not available_slots:
             # If all slots are locked, keep original position
-            return dragged_box.vertical_slot, dragged_box.dance.position
+            return dragged_box.vertical_slot, dragged_box.dance.position, dragged_box.dance.position
         
         # Find the nearest available slot
         for i, slot in enumerate(available_slots):
@@ -296,29 +417,269 @@ class DanceRosterApp:
         
         return nearest_slot, position, old_position
     
-    def update_all_positions(self):
-        """Update all position indicators based on vertical order"""
-        # Sort dance boxes by vertical position
-        sorted_boxes = sorted(self.dance_boxes, key=lambda box: box.y)
+    def create_score_overlay(self, dances):
+        """Show the order's quick change and instant totals; markers beside each slot are drawn with the boxes"""
+        # The Roster built when the file was loaded, shared with the optimizer
+        # and the alternatives
+        self.score_graph = graph_of(dances)
+        order = self.dance_ids(dances)
+        self.score_timing = show_timing(self.score_graph, self.timed_roster)
+        self.live_score = LiveScore(self.score_graph, order, self.score_timing)
+        self.appearances = AppearanceIndex(self.score_graph, order)
+        self.score_bound = lower_bound(self.score_graph)
+        self.drop_preview = None
+        self.preview_scores = {}
+        self.slot_markers = {}
+        self.free_markers = []
+        self.score_text = self.canvas.create_text(
+            20, 50,
+            text="",
+            font=("Arial", 10, "bold"),
+            fill="#666666",
+            anchor="w"
+        )
+        self.draw_score_totals()
+    
+    def create_slot_marker(self):
+        circle = self.canvas.create_oval(517, -8, 533, 8, outline="")
+        label = self.canvas.create_text(525, 18, text="", font=("Arial", 8))
+        return circle, label
+    
+    def place_slot_marker(self, slot):
+        """Move a marker beside slot and colour it for that slot's score"""
+        circle, label = self.slot_markers[slot]
+        marker_y = self.layout.slot_y(slot) + 40
+        self.canvas.coords(circle, 517, marker_y - 8, 533, marker_y + 8)
+        self.canvas.coords(label, 525, marker_y + 18)
+        self.draw_slot_marker(slot)
+    
+    def draw_slot_marker(self, slot):
+        """Colour a slot's marker red for instants, orange for quick changes, green if clear"""
+        if slot not in self.slot_markers:
+            return
+        qcs, instants = self.preview_scores.get(slot, self.live_score.slots[slot])
+        circle, label = self.slot_markers[slot]
+        if instants:
+            color, text = "#F44336", f"{instants} inst"
+        elif qcs:
+            color, text = "#FF9800", f"{qcs} qc"
+        else:
+            color, text = "#C8E6C9", ""
+        self.canvas.itemconfig(circle, fill=color)
+        self.canvas.itemconfig(label, text=text, fill=color)
+    
+    def draw_score_totals(self, preview=None):
+        """Write the order's totals, and those of preview (qcs, instants, shortfall) if given"""
+        text = f"Quick changes: {self.live_score.qcs}   Instants: {self.live_score.instants}"
+        cost = weighted(self.live_score.qcs, self.live_score.instants)
+        text += f"   Gap to bound: {self.score_bound.describe_gap(cost)}"
+        if self.live_score.shortfall is not None:
+            text += f"   Change shortfall: {self.live_score.shortfall}s"
+        if preview is not None:
+            text += f"   (if dropped here: {preview[0]} quick changes, {preview[1]} instants"
+            if preview[2] is not None:
+                text += f", {preview[2]}s short"
+            text += ")"
+        self.canvas.itemconfig(self.score_text, text=text)
+    
+    def dance_ids(self, dances):
+        return [self.score_graph.dance_index[dance.name] for dance in dances]
+    
+    def preview_drop(self, dragged_box):
+        """Score the order the dragged box would give if dropped now, rescoring only the slots it changes"""
+        if self.live_score is None:
+            return
+        _, position, _ = self.find_nearest_slot(dragged_box)
+        if position == self.drop_preview:
+            return
+        self.drop_preview = position
+        order = self.dance_ids(self.layout.with_drop(dragged_box.dance, position))
+        qcs, instants, shortfall, rescored = self.live_score.preview(order)
+        
+        # Put back the slots the last preview changed, then show this one
+        changed = set(self.preview_scores)
+        self.preview_scores = dict(rescored)
+        for slot in changed.union(self.preview_scores):
+            self.draw_slot_marker(slot)
+        self.draw_score_totals((qcs, instants, shortfall) if rescored else None)
+    
+    def drop_box(self, dragged_box, position):
+        """Move dragged_box into the position-th unlocked slot, shifting the unlocked dances between"""
+        self.apply_order(self.layout.with_drop(dragged_box.dance, position))
+    
+    def apply_order(self, dances):
+        """Lay the dances out in the given order and redraw the boxes in view"""
+        self.layout.reorder(dances)
+        self.update_all_positions()
+        
+        if self.live_score is not None:
+            changed = set(self.live_score.update(self.dance_ids(dances)))
+            self.appearances.update(self.live_score.order)
+            changed.update(self.preview_scores)
+            self.drop_preview = None
+            self.preview_scores = {}
+            for slot in changed:
+                self.draw_slot_marker(slot)
+            self.draw_score_totals()
+    
+    def is_optimizing(self) -> bool:
+        """Whether a background search is running, so the order must not change under it"""
+        return self.optimize_job is not None or self.alternatives_job is not None
+    
+    def toggle_optimize(self):
+        """Start optimizing the current order in the background, or cancel a running search"""
+        if self.optimize_job is not None:
+            self.optimize_job.cancel()
+            self.optimize_button.config(state=tk.DISABLED)
+            self.status_var.set("Stopping optimizer...")
+            return
+        if not self.layout:
+            return
+        
+        try:
+            self.optimize_job = OptimizeJob(self.layout.order, time_limit=self.optimize_seconds,
+                                            timing=self.score_timing, graph=self.score_graph)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Cannot optimize this order: {str(e)}")
+            return
+        self.optimize_job.start()
         
-        # Update position indicators
-        for i, box in enumerate(sorted_boxes):
-            box.update_position_indicator(i)
+        for button in (self.upload_button, self.process_button, self.reset_button, self.alternatives_button):
+            button.config(state=tk.DISABLED)
+        self.optimize_button.config(text="Cancel")
+        self.status_var.set("Optimizing...")
+        self.root.after(self.poll_interval, self.poll_optimizer)
+    
+    def poll_optimizer(self):
+        """Report progress from the background search and apply its order once it finishes"""
+        job = self.optimize_job
+        improved = None
+        for message in job.poll():
+            if message[0] == "progress":
+                _, done, best_cost = message
+                self.status_var.set(f"Optimizing... {int(done * 100)}% (best cost so far: {best_cost})")
+            elif message[0] == "improved":
+                improved = message
+            elif message[0] == "done":
+                improved = None
+                _, cost, dances = message
+                self.apply_order(dances)
+                qcs, instants = order_costs(job.graph, [job.graph.dance_index[dance.name] for dance in dances])
+                stopped = "stopped early" if job.cancelled else "finished"
+                if job.timing is not None:
+                    self.status_var.set(
+                        f"Optimizer {stopped}: {qcs} quick changes, {instants} instants "
+                        f"(change shortfall {job.start_cost}s -> {cost}s)"
+                    )
+                else:
+                    self.status_var.set(
+                        f"Optimizer {stopped}: {qcs} quick changes, {instants} instants "
+                        f"(cost {job.start_cost} -> {cost}, gap to lower bound {job.bound.describe_gap(cost)})"
+                    )
+            else:
+                self.status_var.set(f"Error: {message[1]}")
+                messagebox.showerror("Error", f"Optimizer failed: {message[1]}")
+        
+        if improved is not None:
+            # Only the latest of the improvements since the last poll is drawn
+            self.apply_order(improved[2])
+        
+        if not job.finished:
+            self.root.after(self.poll_interval, self.poll_optimizer)
+            return
+        self.optimize_job = None
+        for button in (self.upload_button, self.process_button, self.reset_button, self.alternatives_button):
+            button.config(state=tk.NORMAL)
+        self.optimize_button.config(text="Optimize", state=tk.NORMAL)
+    
+    def locked_slots(self):
+        return tuple((position, dance.name) for position, dance in enumerate(self.layout.order) if dance.locked)
+    
+    def show_alternative(self):
+        """Switch to the next of several good, different orders, finding them first if the locks changed"""
+        if not self.layout or self.is_optimizing():
+            return
+        locks = self.locked_slots()
+        if self.alternatives and locks == self.alternatives_locks:
+            self.alternative_index = (self.alternative_index + 1) % len(self.alternatives)
+            self.display_alternative()
+            return
+        
+        graph = self.score_graph
+        locked = {position: dance for position, dance in enumerate(self.dance_ids(self.layout.order))
+                  if graph.dances[dance].locked}
+        try:
+            self.alternatives_job = AlternativesJob(graph, locked, self.alternative_count)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Cannot find alternatives: {str(e)}")
+            return
+        self.alternatives_locks = locks
+        self.alternatives_job.start()
+        
+        for button in (self.upload_button, self.process_button, self.reset_button, self.optimize_button,
+                       self.alternatives_button):
+            button.config(state=tk.DISABLED)
+        self.status_var.set("Finding alternative orders...")
+        self.root.after(self.poll_interval, self.poll_alternatives)
+    
+    def poll_alternatives(self):
+        """Show the first alternative once the background beam search finishes"""
+        job = self.alternatives_job
+        messages = job.poll()
+        if not job.finished:
+            self.root.after(self.poll_interval, self.poll_alternatives)
+            return
+        self.alternatives_job = None
+        for button in (self.upload_button, self.process_button, self.reset_button, self.optimize_button,
+                       self.alternatives_button):
+            button.config(state=tk.NORMAL)
+        
+        message = messages[0]
+        if message[0] == "error" or not message[1]:
+            self.alternatives = []
+            error = message[1] if message[0] == "error" else "no order fits the locked dances"
+            self.status_var.set(f"Error: {error}")
+            messagebox.showerror("Error", f"Cannot find alternatives: {error}")
+            return
+        self.alternatives = message[1]
+        self.alternative_index = 0
+        self.display_alternative()
+    
+    def display_alternative(self):
+        cost, dances = self.alternatives[self.alternative_index]
+        self.apply_order(dances)
+        shown, count = self.alternative_index + 1, len(self.alternatives)
+        self.alternatives_button.config(text=f"Alternative {shown}/{count}")
+        self.status_var.set(
+            f"Alternative {shown} of {count}: {self.live_score.qcs} quick changes, "
+            f"{self.live_score.instants} instants (cost {cost})"
+        )
+    
+    def update_all_positions(self):
+        """Move the boxes in view to their dances' slots and update their position indicators"""
+        for box in self.dance_boxes:
+            box.move_to(self.layout.slot_y(box.dance.position))
+            box.update_position_indicator(box.dance.position)
+        self.render_viewport()
     
     def save_order(self):
         """Save the current order of dances based on their vertical position"""
-        if not self.dance_boxes:
+        if not self.layout:
             messagebox.showinfo("Info", "No dances to save order for.")
             return
         
-        # Sort dance boxes by vertical position
-        sorted_boxes = sorted(self.dance_boxes, key=lambda box: box.y)
-        
         # Create a formatted order report
         order_report = "Dance Order:\n\n"
-        for i, box in enumerate(sorted_boxes, 1):
-            lock_status = "🔒 (Locked)" if box.dance.locked else "🔓 (Unlocked)"
-            order_report += f"{i}. {box.dance.name} - {len(box.dance.dancers)} dancers {lock_status}\n"
+        for i, dance in enumerate(self.layout.order, 1):
+            lock_status = "🔒 (Locked)" if dance.locked else "🔓 (Unlocked)"
+            order_report += f"{i}. {dance.name} - {len(dance.dancers)} dancers {lock_status}\n"
+            if self.appearances is not None:
+                instant = self.appearances.names(self.appearances.instant_dancers[i - 1])
+                quick_change = self.appearances.names(self.appearances.quick_change_dancers[i - 1])
+                if instant:
+                    order_report += f"    Instant: {', '.join(instant)}\n"
+                if quick_change:
+                    order_report += f"    Quick change: {', '.join(quick_change)}\n"
         
         # Show the order in a dialog
         order_window = tk.Toplevel(self.root)
@@ -333,6 +694,26 @@ class DanceRosterApp:
         
         self.status_var.set("Dance order saved.")
     
+    def compile_roster(self):
+        """Save the roster with the current order and locks as a compiled .rdtr file, which opens faster"""
+        if not self.layout:
+            return
+        path = filedialog.asksaveasfilename(
+            title="Save compiled roster",
+            defaultextension=".rdtr",
+            filetypes=(("Compiled rosters (.rdtr)", "*.rdtr"),)
+        )
+        if not path:
+            self.status_var.set("Compile cancelled.")
+            return
+        try:
+            compile_dances(path, self.layout.order, durations=getattr(self.timed_roster, "durations", None),
+                           change_times=getattr(self.timed_roster, "change_times", None))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to compile roster: {str(e)}")
+            return
+        self.status_var.set(f"Compiled roster saved to {Path(path).name}.")
+    
     def reset_layout(self):
         """Reset the layout of dance boxes to the original order"""
         if not self.dance_data:
@@ -0,0 +1,129 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Sequence
+
+from conflict_graph import ConflictGraph, iter_bits
+
+
+class AppearanceIndex:
+    """Every dancer's slots in an order, with each appearance linked to the one before and after it.
+
+    slots[dancer] is the sorted list of slots the dancer is in. previous[s]
+    and following[s] map each dancer of the dance in slot s to their slot
+    before and after it, or None, and instant_dancers[s] and
+    quick_change_dancers[s] are masks of the dancers going on at slot s
+    straight from slot s - 1 or s - 2, which qcs and instants total as
+    LiveScore does. So the gap before any appearance, and who is in an
+    instant or a quick change at a slot, are single lookups rather than a
+    walk over every dancer's time since their last dance.
+
+    update() takes a new order and only reindexes the dancers of the slots
+    that changed, so a swap costs the casts of two dances and a move the
+    casts of the dances it shifts.
+    """
+
+    def __init__(self, graph: ConflictGraph, order: Sequence[int]):
+        self.graph = graph
+        self.order = list(order)
+        self.slots: List[List[int]] = [[] for _ in graph.dancer_names]
+        for slot, dance in enumerate(self.order):
+            for dancer in iter_bits(graph.casts[dance]):
+                self.slots[dancer].append(slot)
+        self.previous: List[Dict[int, Optional[int]]] = [{} for _ in self.order]
+        self.following: List[Dict[int, Optional[int]]] = [{} for _ in self.order]
+        self.instant_dancers = [0] * len(self.order)
+        self.quick_change_dancers = [0] * len(self.order)
+        self.qcs = self.instants = 0
+        for dancer in range(len(self.slots)):
+            self._link(dancer)
+        for slot in range(len(self.order)):
+            self._mark(slot)
+
+    def _link(self, dancer: int) -> List[int]:
+        """Relink a dancer's appearances and return the slots whose previous appearance changed"""
+        slots = self.slots[dancer]
+        relinked = []
+        before = None
+        for index, slot in enumerate(slots):
+            if self.previous[slot].get(dancer, -1) != before:
+                relinked.append(slot)
+            self.previous[slot][dancer] = before
+            self.following[slot][dancer] = slots[index + 1] if index + 1 < len(slots) else None
+            before = slot
+        return relinked
+
+    def _mark(self, slot: int):
+        instants = quick_changes = 0
+        for dancer, before in self.previous[slot].items():
+            if before == slot - 1:
+                instants |= 1 << dancer
+            elif before == slot - 2:
+                quick_changes |= 1 << dancer
+        self.instants += instants.bit_count() - self.instant_dancers[slot].bit_count()
+        self.qcs += quick_changes.bit_count() - self.quick_change_dancers[slot].bit_count()
+        self.instant_dancers[slot] = instants
+        self.quick_change_dancers[slot] = quick_changes
+
+    def update(self, order: Sequence[int]) -> List[int]:
+        """Switch to order and return the slots whose instants or quick changes were remarked"""
+        if len(order) != len(self.order):
+            raise ValueError("New order has a different number of dances")
+        casts = self.graph.casts
+        changed = [slot for slot, dance in enumerate(order) if dance != self.order[slot]]
+        dancers = set()
+        for slot in changed:
+            for dancer in iter_bits(casts[self.order[slot]]):
+                slots = self.slots[dancer]
+                del slots[bisect_left(slots, slot)]
+                dancers.add(dancer)
+            self.previous[slot] = {}
+            self.following[slot] = {}
+        for slot in changed:
+            for dancer in iter_bits(casts[order[slot]]):
+                insort(self.slots[dancer], slot)
+                dancers.add(dancer)
+        self.order = list(order)
+
+        remark = set(changed)
+        for dancer in dancers:
+            remark.update(self._link(dancer))
+        for slot in remark:
+            self._mark(slot)
+        return sorted(remark)
+
+    def swap(self, i: int, j: int) -> List[int]:
+        order = list(self.order)
+        order[i], order[j] = order[j], order[i]
+        return self.update(order)
+
+    def move(self, source: int, target: int) -> List[int]:
+        """Take the dance out of slot source and put it back in slot target, shifting those between"""
+        order = list(self.order)
+        order.insert(target, order.pop(source))
+        return self.update(order)
+
+    def previous_slot(self, dancer: int, slot: int) -> Optional[int]:
+        """The slot of dancer's number before the one in slot, which they must be in"""
+        return self.previous[slot][dancer]
+
+    def next_slot(self, dancer: int, slot: int) -> Optional[int]:
+        return self.following[slot][dancer]
+
+    def gap(self, dancer: int, slot: int) -> Optional[int]:
+        """Numbers between dancer's previous one and the one in slot, or None if it is their first"""
+        before = self.previous[slot][dancer]
+        return slot - before - 1 if before is not None else None
+
+    def shared(self, slot: int, other: int) -> int:
+        """Mask of the dancers in both slots"""
+        return self.graph.casts[self.order[slot]] & self.graph.casts[self.order[other]]
+
+    def changing(self, slot: int) -> int:
+        """Mask of the dancers going on at slot from an instant or a quick change"""
+        return self.instant_dancers[slot] | self.quick_change_dancers[slot]
+
+    def slot_costs(self, slot: int):
+        """(quick changes, instants) at slot, as Dance.qcs counts them"""
+        return self.quick_change_dancers[slot].bit_count(), self.instant_dancers[slot].bit_count()
+
+    def names(self, mask: int) -> List[str]:
+        return [self.graph.dancer_names[dancer] for dancer in iter_bits(mask)]
@@ -0,0 +1,214 @@
+"""Schedule many rosters in one pass, without the app.
+
+    python batch.py rosters/ --engine anneal --time-limit 5 --workers 4 --output orders.json
+    python batch.py 2024.xlsx 2025.xlsx --engine exact --output orders.csv
+    python batch.py rosters/ --engine anneal --time-limit 60 --deadline 10
+
+Arguments are roster files (.txt, .csv, .xlsx or compiled .rdtr) or
+directories of them. A roster's show constraints are read from a
+<roster name>.constraints.json file next to it when there is one, in the
+form ShowConstraints.to_dict() writes; instead, an "acts" entry in the form
+ActPlan.to_dict() writes splits the show into acts. The output format follows the
+suffix of --output; rosters that fail are reported with their error and
+make the exit status 1. Rosters with running and change times are also
+scored in seconds; see README.md. With --deadline, each roster keeps the
+best order found within that many seconds of starting.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from acts import ActBound, ActPlan, schedule_acts
+from anytime import solve_anytime
+from constraints import ShowConstraints
+from engines import ENGINES, check_engine, run_engine
+from instrumentation import Instruments
+from lower_bound import lower_bound
+from roster_io import ROSTER_SUFFIXES, RosterCache, load_timed_graph
+from show_cost import cost_cache, order_costs, weighted
+
+CSV_FIELDS = ("roster", "engine", "dances", "dancers", "quick_changes", "instants", "cost", "lower_bound",
+              "instants_lower_bound", "gap", "relative_gap", "trivial_bound", "shortfall_seconds", "running_time", "seconds",
+              "deadline_reached", "order", "error")
+
+
+def roster_paths(paths: Iterable) -> List[Path]:
+    """The roster files named in paths, with directories expanded to the rosters in them"""
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(sorted(child for child in path.iterdir()
+                                if child.suffix.lower() in ROSTER_SUFFIXES))
+        else:
+            found.append(path)
+    return found
+
+
+def constraints_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.stem + ".constraints.json")
+
+
+def read_show_spec(path) -> Tuple[Optional[ShowConstraints], Optional[ActPlan]]:
+    """The show constraints and act plan saved next to the roster in path, if any"""
+    spec_path = constraints_path(path)
+    if not spec_path.exists():
+        return None, None
+    with open(spec_path, encoding="utf-8") as file:
+        spec = json.load(file)
+    plan = ActPlan.from_dict(spec.pop("acts")) if "acts" in spec else None
+    constraints = ShowConstraints.from_dict(spec)
+    if plan is not None and constraints:
+        raise ValueError(f"{spec_path} has show constraints and acts; give the constraints of each act instead")
+    return constraints, plan
+
+
+def schedule_roster(path, engine: str = "greedy", time_limit: float = 1.0, seed: int = 0,
+                    use_cache: bool = False, acts: Optional[int] = None, workers: Optional[int] = 1,
+                    deadline: Optional[float] = None) -> Dict:
+    """Order one roster with engine and return the order with its costs, optimality gap and counters.
+
+    With acts, or an act plan saved next to the roster, the show is split
+    into acts that are ordered separately on up to workers processes, and
+    the lower bound is the sum of the acts' bounds. A roster with running
+    and change times is annealed for the seconds dancers are short for
+    their changes, and the result adds those seconds and the running time.
+
+    With a deadline, the engine's improvements are streamed and the search
+    stops deadline seconds after the roster was started, keeping the best
+    order so far; acts are searched for at most deadline seconds each.
+    """
+    check_engine(engine)
+    started = time.perf_counter()
+    graph, timing = load_timed_graph(path, RosterCache() if use_cache else None)
+    constraints, plan = read_show_spec(path)
+    if plan is None and acts is not None:
+        plan = ActPlan(acts)
+    instruments = Instruments()
+
+    result = {"roster": str(path), "engine": engine, "dances": len(graph), "dancers": len(graph.dancer_names)}
+    if plan is None:
+        bound = lower_bound(graph)
+        if deadline is None:
+            _, order = run_engine(graph, engine, time_limit=time_limit, seed=seed, constraints=constraints,
+                                  instruments=instruments, timing=timing)
+        else:
+            for order, _, _ in solve_anytime(graph, engine, time_limit=time_limit, seed=seed,
+                                             constraints=constraints,
+                                             deadline=deadline - (time.perf_counter() - started),
+                                             instruments=instruments, timing=timing):
+                pass
+        qcs, instants = order_costs(graph, order)
+        act_orders = [order]
+        cost_cache(graph).report(instruments)
+    else:
+        act_time_limit = time_limit if deadline is None else min(time_limit, deadline)
+        _, act_orders = schedule_acts(graph, plan, engine, act_time_limit, seed, workers, timing)
+        bound = ActBound([lower_bound(graph, act) for act in act_orders])
+        order = [dance for act in act_orders for dance in act]
+        qcs = instants = 0
+        for act in act_orders:
+            act_qcs, act_instants = order_costs(graph, act)
+            qcs += act_qcs
+            instants += act_instants
+        result["acts"] = [[graph.dance_names[dance] for dance in act] for act in act_orders]
+    if timing is not None:
+        result["shortfall_seconds"] = sum(timing.order_shortfall(act) for act in act_orders)
+        result["running_time"] = timing.running_time(order)
+
+    cost = weighted(qcs, instants)
+    result.update({
+        "order": [graph.dance_names[dance] for dance in order],
+        "quick_changes": qcs,
+        "instants": instants,
+        "cost": cost,
+        **bound.to_dict(cost),
+        "seconds": time.perf_counter() - started,
+        "counters": instruments.counters,
+    })
+    if deadline is not None:
+        result["deadline_reached"] = result["seconds"] >= deadline
+    return result
+
+
+def _schedule(path, engine: str, time_limit: float, seed: int, use_cache: bool, acts: Optional[int],
+              workers: Optional[int], deadline: Optional[float]) -> Dict:
+    try:
+        return schedule_roster(path, engine, time_limit, seed, use_cache, acts, workers, deadline)
+    except Exception as error:
+        # Readers raise their own errors for corrupt files (zipfile.BadZipFile, openpyxl's), and
+        # one bad roster must not lose the results of the others
+        return {"roster": str(path), "engine": engine, "error": f"{type(error).__name__}: {error}"}
+
+
+def schedule_rosters(paths: Iterable, engine: str = "greedy", time_limit: float = 1.0, seed: int = 0,
+                     workers: Optional[int] = None, use_cache: bool = False,
+                     acts: Optional[int] = None, deadline: Optional[float] = None) -> List[Dict]:
+    """schedule_roster for every roster in paths across a process pool, in the order given.
+
+    A roster that cannot be read or scheduled gives a result with an
+    error message instead of an order. A single roster split into acts
+    uses the pool for its acts instead.
+    """
+    check_engine(engine)
+    paths = roster_paths(paths)
+    if workers == 1 or len(paths) <= 1:
+        return [_schedule(path, engine, time_limit, seed, use_cache, acts, workers, deadline) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_schedule, path, engine, time_limit, seed, use_cache, acts, 1, deadline)
+                   for path in paths]
+        return [future.result() for future in futures]
+
+
+def write_results(results: List[Dict], path):
+    """Write results as JSON, or as one CSV row per roster when path ends in .csv"""
+    if Path(path).suffix.lower() == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for result in results:
+                writer.writerow(dict(result, order=" | ".join(result.get("order", []))))
+    else:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Schedule many rosters and write their orders and costs")
+    parser.add_argument("paths", nargs="+", help="roster files or directories of them")
+    parser.add_argument("--engine", choices=ENGINES, default="greedy")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="seconds per roster for anneal and exact")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="processes to use; defaults to one per CPU")
+    parser.add_argument("--cache", action="store_true", help="reuse parsed rosters from the roster cache")
+    parser.add_argument("--acts", type=int, help="split each show into this many acts, unless it has an act plan")
+    parser.add_argument("--deadline", type=float,
+                        help="seconds per roster after which its best order so far is kept")
+    parser.add_argument("--output", default="orders.json", help="a .json or .csv file")
+    args = parser.parse_args(argv)
+
+    results = schedule_rosters(args.paths, args.engine, args.time_limit, args.seed, args.workers, args.cache,
+                               args.acts, args.deadline)
+    write_results(results, args.output)
+
+    for result in results:
+        if "error" in result:
+            print(f"{result['roster']}: {result['error']}")
+        else:
+            shortfall = (f", {result['shortfall_seconds']}s short for changes"
+                         if "shortfall_seconds" in result else "")
+            gap = ("trivial lower bound" if result["trivial_bound"] and result["cost"]
+                   else f"gap {result['gap']} to the lower bound")
+            print(f"{result['roster']}: {result['quick_changes']} quick changes, "
+                  f"{result['instants']} instants{shortfall}, {gap}, in {result['seconds']:.2f}s")
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
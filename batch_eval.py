@@ -0,0 +1,82 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from conflict_graph import ConflictGraph, iter_bits
+from show_cost import INSTANT_WEIGHT
+
+# Bound on orders x slots x dancers per chunk, about 64 MB of int64 intermediates
+MAX_CHUNK_CELLS = 1 << 23
+
+
+class BatchEvaluator:
+    """Scores many show orders at once from a dance x dancer incidence matrix.
+
+    Orders are rows of an N x n array of dance indices, where a dance's index
+    is its position in self.dances (or in the graph it was built from).
+    """
+
+    def __init__(self, dances: Iterable, dancers: Dict[str, object]):
+        self.dances = list(dances)
+        self.dancer_names = list(dancers)
+        dancer_index = {name: i for i, name in enumerate(self.dancer_names)}
+        self.incidence = np.zeros((len(self.dances), len(self.dancer_names)), dtype=bool)
+        for row, dance in enumerate(self.dances):
+            for dancer in dance.dancers:
+                self.incidence[row, dancer_index[dancer.name]] = True
+
+    @classmethod
+    def from_graph(cls, graph: ConflictGraph) -> 'BatchEvaluator':
+        evaluator = cls.__new__(cls)
+        evaluator.dances = list(graph.dances) or list(graph.dance_names)
+        evaluator.dancer_names = list(graph.dancer_names)
+        evaluator.incidence = np.zeros((len(graph), len(graph.dancer_names)), dtype=bool)
+        for row, cast in enumerate(graph.casts):
+            evaluator.incidence[row, list(iter_bits(cast))] = True
+        return evaluator
+
+    def score(self, orders, chunk_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Quick changes, instants and per-dancer minimum gap for every order.
+
+        Returns arrays of shape (N,), (N,) and (N, dancers). A dancer's minimum
+        gap is the fewest slots between two of their appearances, or 0 if they
+        appear at most once. Orders are scored chunk_size at a time to bound
+        the size of the N x n x dancers intermediate; by default a chunk
+        holds about MAX_CHUNK_CELLS cells.
+        """
+        orders = np.asarray(orders, dtype=np.intp)
+        if orders.ndim == 1:
+            orders = orders[None, :]
+        if chunk_size is None:
+            chunk_size = max(1, MAX_CHUNK_CELLS // max(1, orders.shape[1] * len(self.dancer_names)))
+        qcs = np.empty(len(orders), dtype=np.int64)
+        instants = np.empty(len(orders), dtype=np.int64)
+        min_gaps = np.empty((len(orders), len(self.dancer_names)), dtype=np.int64)
+        for start in range(0, len(orders), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            qcs[chunk], instants[chunk], min_gaps[chunk] = self._score_chunk(orders[chunk])
+        return qcs, instants, min_gaps
+
+    def _score_chunk(self, orders: np.ndarray):
+        casts = self.incidence[orders]
+        slots = orders.shape[1]
+
+        # Same definitions as Dance.qcs: in the previous dance is an instant,
+        # in the one before that but not the previous is a quick change
+        instants = (casts[:, 1:] & casts[:, :-1]).sum(axis=(1, 2))
+        qcs = (casts[:, 2:] & casts[:, :-2] & ~casts[:, 1:-1]).sum(axis=(1, 2))
+
+        never = -slots
+        positions = np.arange(slots)[None, :, None]
+        last_seen = np.maximum.accumulate(np.where(casts, positions, never), axis=1)
+        seen_before = np.concatenate(
+            [np.full_like(last_seen[:, :1], never), last_seen[:, :-1]], axis=1)
+        gaps = np.where(casts & (seen_before >= 0), positions - seen_before, slots)
+        min_gaps = gaps.min(axis=1)
+        min_gaps[min_gaps == slots] = 0
+        return qcs, instants, min_gaps
+
+    def costs(self, orders) -> np.ndarray:
+        """Weighted cost of every order, as show_cost.order_cost computes it"""
+        qcs, instants, _ = self.score(orders)
+        return qcs + INSTANT_WEIGHT * instants
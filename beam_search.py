@@ -0,0 +1,191 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from conflict_graph import ConflictGraph, iter_bits
+from constraints import compile_constraints
+from instrumentation import Instruments, phase
+from show_cost import cost_cache
+
+
+def positional_distance(order: Sequence, other: Sequence) -> int:
+    """Number of slots at which two orders of the same dances differ"""
+    return sum(1 for dance, other_dance in zip(order, other) if dance != other_dance)
+
+
+class BeamSearch:
+    """Builds show orders slot by slot, keeping the width best partial shows at every step.
+
+    Partial shows are costed with the same quick changes and instants as
+    every other engine, and kept in a bounded heap. Two partial shows with
+    the same dances placed and the same last two dances have the same best
+    completion, so only the cheaper is kept. Dances that share no one with
+    the last two are free to place; each show takes at most branch of them,
+    most connected first, and only scores the conflicting dances when there
+    are fewer free ones. Between partial shows of equal cost, the one with
+    fewer conflicts left among the dances still to place is kept, as the
+    degree greedy scheduler places the most connected dances first.
+
+    alternatives() runs the search once per order wanted. Each run breaks
+    ties away from the slots the orders already found put dances in, and a
+    result is kept only if it differs from all of them in at least
+    min_distance slots. Positions in locked, and the show constraints, are
+    kept as in LocalSearch.
+    """
+
+    def __init__(self, graph: ConflictGraph, dances: Optional[Iterable[int]] = None,
+                 locked: Optional[Dict[int, int]] = None, width: int = 32, branch: int = 8,
+                 constraints=None, instruments: Optional[Instruments] = None):
+        if width < 1 or branch < 1:
+            raise ValueError("Beam width and branching must be at least 1")
+        self.graph = graph
+        self.dances = list(range(len(graph)) if dances is None else dances)
+        self.width = width
+        self.branch = branch
+        self.instruments = instruments
+        self.window_cost = cost_cache(graph).window_cost
+        self.constraints = compile_constraints(constraints, graph, self.dances)
+        self.locked = dict(locked or {})
+        if self.constraints is not None:
+            self.locked.update(self.constraints.pinned())
+
+        # Dances are numbered by rank, most connected first, so the lowest set
+        # bit of a mask of ranks is the next dance to try
+        self.by_rank = sorted(self.dances, key=lambda dance: (-graph.degree(dance), dance))
+        rank = {dance: index for index, dance in enumerate(self.by_rank)}
+        self.rank_nbrs = [0] * len(self.by_rank)
+        for dance in self.by_rank:
+            for nbr in iter_bits(graph.nbrs[dance]):
+                if nbr in rank:
+                    self.rank_nbrs[rank[dance]] |= 1 << rank[nbr]
+        self.locked_ranks = {position: rank[dance] for position, dance in self.locked.items()}
+        self.movable = (1 << len(self.by_rank)) - 1
+        for locked_rank in self.locked_ranks.values():
+            self.movable &= ~(1 << locked_rank)
+
+    def _candidates(self, position: int, remaining: int, prev: Optional[int], before_prev: Optional[int],
+                    avoid: Set[Tuple[int, int]]) -> List[Tuple[int, bool]]:
+        """(rank, whether it conflicts) to try in position after the given last two ranks"""
+        if position in self.locked_ranks:
+            return [(self.locked_ranks[position], True)]
+        allowed = self._allowed(position, remaining, prev)
+        remaining &= self.movable
+        conflicts = 0
+        for last in (prev, before_prev):
+            if last is not None:
+                conflicts |= self.rank_nbrs[last]
+        conflicts &= remaining
+
+        chosen, repeats = [], []
+        for candidate in iter_bits(remaining & ~conflicts):
+            if not allowed(candidate):
+                continue
+            if (position, candidate) in avoid:
+                repeats.append(candidate)
+                continue
+            chosen.append((candidate, False))
+            if len(chosen) == self.branch:
+                return chosen
+        chosen.extend((candidate, False) for candidate in repeats[:self.branch - len(chosen)])
+        if len(chosen) < self.branch:
+            chosen.extend((candidate, True) for candidate in iter_bits(conflicts) if allowed(candidate))
+        return chosen
+
+    def _allowed(self, position: int, remaining: int, prev: Optional[int]):
+        """Test of whether a rank may go in position, given the ranks still to place"""
+        if self.constraints is None:
+            return lambda candidate: True
+        by_rank = self.by_rank
+        placed = 0
+        for rank in iter_bits(((1 << len(by_rank)) - 1) & ~remaining):
+            placed |= 1 << by_rank[rank]
+        last = by_rank[prev] if prev is not None else None
+        return lambda candidate: self.constraints.allowed(by_rank[candidate], position, placed, last)
+
+    def search(self, avoid: Iterable[Sequence[int]] = ()) -> List[Tuple[int, List[int]]]:
+        """The complete orders left in the beam as (cost, order), best first.
+
+        Ties go to the order sharing fewest slots with the orders in avoid.
+        Raises ValueError if no order gets past the show constraints.
+        """
+        with phase(self.instruments, "beam"):
+            return self._search(avoid)
+
+    def _search(self, avoid: Iterable[Sequence[int]]) -> List[Tuple[int, List[int]]]:
+        by_rank = self.by_rank
+        rank = {dance: index for index, dance in enumerate(by_rank)}
+        avoid = {(position, rank[dance]) for order in avoid for position, dance in enumerate(order)}
+        window_cost = self.window_cost
+        expanded = 0
+        sequence = 0
+
+        # A state is (cost, repeats, edges, sequence, remaining ranks, prev, before_prev, path),
+        # where edges counts the conflicts left among the dances still to place; path
+        # links back through (rank, parent path) so states share their prefixes
+        edges = sum(mask.bit_count() for mask in self.rank_nbrs) // 2
+        beam = [(0, 0, edges, 0, (1 << len(by_rank)) - 1, None, None, None)]
+        for position in range(len(by_rank)):
+            best: Dict[Tuple[int, Optional[int], Optional[int]], Tuple] = {}
+            heap: List[Tuple] = []
+            for cost, repeats, edges, _, remaining, prev, before_prev, path in beam:
+                expanded += 1
+                for candidate, conflicts in self._candidates(position, remaining, prev, before_prev, avoid):
+                    child_cost = cost
+                    if conflicts:
+                        child_cost += window_cost(by_rank[before_prev] if before_prev is not None else None,
+                                                  by_rank[prev] if prev is not None else None,
+                                                  by_rank[candidate])
+                    child_repeats = repeats + ((position, candidate) in avoid)
+                    signature = (remaining & ~(1 << candidate), candidate, prev)
+                    known = best.get(signature)
+                    if known is not None and (known[0], known[1]) <= (child_cost, child_repeats):
+                        continue
+                    sequence += 1
+                    child_edges = edges - (self.rank_nbrs[candidate] & signature[0]).bit_count()
+                    child = (child_cost, child_repeats, child_edges, sequence, signature[0], candidate, prev,
+                             (candidate, path))
+                    best[signature] = child
+                    # Bounded max-heap of the width cheapest children
+                    entry = (-child_cost, -child_repeats, -child_edges, -sequence, child)
+                    if len(heap) < self.width:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+            beam = sorted(child for *_, child in heap if best[child[4:7]] is child)
+            if not beam:
+                raise ValueError(f"No order of these dances fills slot {position + 1} under the show constraints")
+
+        if self.instruments is not None:
+            self.instruments.count("beam_states_expanded", expanded)
+        results = []
+        for cost, *_, path in beam:
+            order = []
+            while path is not None:
+                candidate, path = path
+                order.append(by_rank[candidate])
+            results.append((cost, order[::-1]))
+        return results
+
+    def alternatives(self, k: int = 5, min_distance: Optional[int] = None) -> List[Tuple[int, List[int]]]:
+        """Up to k orders as (cost, order), cheapest first, each min_distance slots from the others.
+
+        min_distance defaults to a fifth of the show, and at least two.
+        """
+        if min_distance is None:
+            min_distance = max(2, len(self.dances) // 5)
+        found: List[Tuple[int, List[int]]] = []
+        for _ in range(k):
+            orders = [order for _, order in found]
+            for cost, order in self.search(orders):
+                if all(positional_distance(order, other) >= min_distance for other in orders):
+                    found.append((cost, order))
+                    break
+            else:
+                break
+        return sorted(found, key=lambda result: result[0])
+
+
+def beam_search(graph: ConflictGraph, dances: Optional[Iterable[int]] = None, k: int = 5, width: int = 32,
+                min_distance: Optional[int] = None, locked: Optional[Dict[int, int]] = None,
+                constraints=None, instruments: Optional[Instruments] = None) -> List[Tuple[int, List[int]]]:
+    return BeamSearch(graph, dances, locked, width, constraints=constraints,
+                      instruments=instruments).alternatives(k, min_distance)
@@ -0,0 +1,255 @@
+"""Time every stage of the show-order pipeline on synthetic rosters.
+
+    python benchmark.py --sizes 20 200 2000 --output benchmark.json
+    python benchmark.py --baseline benchmark.json --output new.json
+
+With --baseline, a stage regresses when it takes more than tolerance times
+its baseline time (and more than min-seconds longer); the thresholds and
+any regressions are written to the output and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from batch_eval import BatchEvaluator
+from conflict_graph import ConflictGraph, add_edges
+from dance import Dance
+from dancer import Dancer
+from dances import process_dances
+from exact_solver import solve_exact
+from local_search import LocalSearch
+from lower_bound import lower_bound
+from roster_io import read_roster, write_roster
+from scheduler import degree_weight, quick_change_weight, schedule_greedy
+from show_cost import order_cost
+from synthetic import synthetic_roster
+
+# Sizes the exact solver is still timed at
+EXACT_LIMIT = 10
+
+
+class HeadlessCanvas:
+    """Just enough of tk.Canvas for DanceRosterApp to lay out boxes without a display"""
+
+    def __init__(self, height: int = 500):
+        self.items: Dict[int, Dict] = {}
+        self.height = height
+        self.top = 0
+
+    def _create(self, *coords, **options) -> int:
+        item = len(self.items) + 1
+        self.items[item] = dict(options, coords=list(coords))
+        return item
+
+    create_rectangle = create_text = create_oval = create_line = _create
+
+    def itemconfig(self, item, **options):
+        self.items[item].update(options)
+
+    def coords(self, item, *coords):
+        self.items[item]["coords"] = list(coords)
+
+    def move(self, item, dx, dy):
+        coords = self.items[item]["coords"]
+        self.items[item]["coords"] = [value + (dy if i % 2 else dx) for i, value in enumerate(coords)]
+
+    def delete(self, *items):
+        self.items.clear()
+
+    def tag_bind(self, *args):
+        pass
+
+    def tag_raise(self, *args):
+        pass
+
+    def config(self, **options):
+        pass
+
+    def canvasy(self, y):
+        return self.top + y
+
+    def winfo_height(self):
+        return self.height
+
+    def cget(self, option):
+        return str(self.height)
+
+
+class HeadlessButton:
+    """Stands in for the Tk buttons the display code relabels"""
+
+    def __init__(self):
+        self.options: Dict = {}
+
+    def config(self, **options):
+        self.options.update(options)
+
+
+def headless_app():
+    """A DanceRosterApp drawing on a HeadlessCanvas, with none of its Tk widgets"""
+    from app import DanceRosterApp
+
+    app = DanceRosterApp.__new__(DanceRosterApp)
+    app.init_state()
+    app.canvas = HeadlessCanvas()
+    app.alternatives_button = HeadlessButton()
+    return app
+
+
+def best_time(stage: Callable, repeat: int, setup: Optional[Callable] = None) -> float:
+    """Fastest of repeat runs of stage, in seconds.
+
+    With setup, each run is stage(setup()) and only the stage is timed.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        arguments = (setup(),) if setup is not None else ()
+        started = time.perf_counter()
+        stage(*arguments)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def legacy_dances(roster: Dict[str, List[str]]) -> List[Dance]:
+    all_dancers = {}
+    dances = []
+    for name, dancer_names in roster.items():
+        for dancer in dancer_names:
+            all_dancers.setdefault(dancer, Dancer(dancer))
+        dances.append(Dance(name, {all_dancers[dancer] for dancer in dancer_names}))
+    return dances
+
+
+def bench_size(dances: int, args, directory: str) -> Dict:
+    roster = synthetic_roster(dances, round(args.dancers_per_dance * dances), args.cast_mean,
+                              args.cast_spread, args.overlap, seed=args.seed)
+    graph = ConflictGraph(roster.items())
+    stages: Dict[str, float] = {}
+    costs: Dict[str, int] = {}
+
+    for suffix in ("txt", "csv", "xlsx"):
+        path = os.path.join(directory, f"roster_{dances}.{suffix}")
+        write_roster(roster, path)
+        stages[f"parse_{suffix}"] = best_time(lambda: read_roster(path), args.repeat)
+
+    stages["process_dances"] = best_time(lambda: process_dances(roster), args.repeat)
+    stages["conflict_graph"] = best_time(lambda: ConflictGraph(roster.items()), args.repeat)
+    stages["add_edges"] = best_time(add_edges, args.repeat, setup=lambda: legacy_dances(roster))
+
+    # The greedy loops of textbased.py and textbased_greedy.py
+    for stage, weight in (("greedy_degree", degree_weight), ("greedy_quick_change", quick_change_weight)):
+        stages[stage] = best_time(lambda: schedule_greedy(graph, weight=weight), args.repeat)
+        costs[stage] = order_cost(graph, schedule_greedy(graph, weight=weight))
+
+    start = schedule_greedy(graph)
+    anneal_result = []
+    stages["anneal"] = best_time(lambda: anneal_result.append(
+        LocalSearch(graph, start, seed=args.seed).run(iterations=args.anneal_iterations)), args.repeat)
+    costs["anneal"] = anneal_result[-1][0]
+
+    if dances <= EXACT_LIMIT:
+        exact_result = []
+        stages["exact"] = best_time(lambda: exact_result.append(solve_exact(graph)), args.repeat)
+        costs["exact"] = exact_result[-1][0]
+
+    rng = random.Random(args.seed)
+    orders = [rng.sample(range(dances), dances) for _ in range(args.batch_orders)]
+    evaluator = BatchEvaluator.from_graph(graph)
+    stages["batch_eval"] = best_time(lambda: evaluator.costs(orders), args.repeat)
+    stages["lower_bound"] = best_time(lambda: lower_bound(graph), args.repeat)
+
+    app = headless_app()
+    dance_set, dancer_map = process_dances(roster)
+    stages["display_results"] = best_time(lambda: app.display_results(dance_set, dancer_map), args.repeat)
+
+    def find_slots():
+        box = app.dance_boxes[0]
+        original = box.y
+        for y in range(0, app.layout.total_height(), max(1, app.layout.total_height() // args.slot_queries)):
+            box.y = y
+            app.find_nearest_slot(box)
+        box.y = original
+    stages["find_nearest_slot"] = best_time(find_slots, args.repeat) / args.slot_queries
+
+    return {
+        "dances": dances,
+        "dancers": len(graph.dancer_names),
+        "edges": sum(1 for _ in graph.edges()),
+        "stages": stages,
+        "costs": costs,
+        "lower_bound": lower_bound(graph).cost,
+    }
+
+
+def check_regressions(results: List[Dict], baseline: Dict, tolerance: float, min_seconds: float) -> List[Dict]:
+    """Add a threshold to every stage that has a baseline, and return the stages over it"""
+    baseline_sizes = {result["dances"]: result["stages"] for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = baseline_sizes.get(result["dances"], {})
+        thresholds = {}
+        for stage, seconds in result["stages"].items():
+            if stage not in before:
+                continue
+            thresholds[stage] = max(before[stage] * tolerance, before[stage] + min_seconds)
+            if seconds > thresholds[stage]:
+                regressions.append({"dances": result["dances"], "stage": stage, "seconds": seconds,
+                                    "baseline": before[stage], "threshold": thresholds[stage]})
+        result["thresholds"] = thresholds
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time each stage of the show-order pipeline on synthetic rosters")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000], help="numbers of dances")
+    parser.add_argument("--dancers-per-dance", type=float, default=1.6)
+    parser.add_argument("--cast-mean", type=float, default=6.0)
+    parser.add_argument("--cast-spread", type=float, default=2.5)
+    parser.add_argument("--overlap", type=float, default=0.3,
+                        help="chance a cast place goes to one of the busiest tenth of the dancers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is kept")
+    parser.add_argument("--anneal-iterations", type=int, default=20000)
+    parser.add_argument("--batch-orders", type=int, default=64)
+    parser.add_argument("--slot-queries", type=int, default=200)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", help="earlier output to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--min-seconds", type=float, default=0.001)
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for dances in args.sizes:
+            results.append(bench_size(dances, args, directory))
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        report["regressions"] = check_regressions(results, baseline, args.tolerance, args.min_seconds)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    for result in results:
+        stages = ", ".join(f"{stage} {seconds * 1000:.2f}ms" for stage, seconds in result["stages"].items())
+        print(f"{result['dances']} dances: {stages}")
+    for regression in report.get("regressions", []):
+        print(f"REGRESSION {regression['dances']} dances {regression['stage']}: "
+              f"{regression['seconds']:.4f}s > {regression['threshold']:.4f}s")
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
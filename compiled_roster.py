@@ -0,0 +1,214 @@
+import mmap
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from conflict_graph import ConflictGraph, iter_bits
+from roster_model import graph_of
+
+MAGIC = b"RDTR"
+FORMAT_VERSION = 2
+
+# magic, version, dance count, dancer count, saved order count, then the
+# byte offsets of the string offsets, string data, casts, nbrs, times and orders
+HEADER = struct.Struct("<4sHIII6Q")
+
+# Stored for a dance or dancer the roster gives no time
+NO_TIME = 0xFFFFFFFF
+
+
+def _row_size(bits: int) -> int:
+    return (bits + 7) // 8
+
+
+def write_compiled_roster(path, graph: ConflictGraph,
+                          orders: Optional[Dict[str, Tuple[Sequence[int], Dict[int, int]]]] = None,
+                          durations: Optional[Dict[str, int]] = None, change_times: Optional[Dict[str, int]] = None):
+    """Write graph, and any saved orders and times, as a compiled roster file.
+
+    orders maps a name to (order, locked), where locked maps show slots to
+    the dances locked there, as LocalSearch takes them. durations and
+    change_times are seconds by dance and dancer name, as in a TimedRoster.
+
+    Layout, all little-endian: the header; one u32 offset per string (dance
+    names, then dancer names, then order names) plus an end offset; the UTF-8
+    string data; one cast bitset row per dance; one conflict bitset row per
+    dance; a u32 running time per dance and change time per dancer, NO_TIME
+    where there is none; then per saved order a u32 dance ID per slot and a
+    bitset row of the locked dances.
+    """
+    orders = orders or {}
+    durations = durations or {}
+    change_times = change_times or {}
+    dance_count, dancer_count = len(graph), len(graph.dancer_names)
+    cast_row, dance_row = _row_size(dancer_count), _row_size(dance_count)
+
+    strings = [name.encode("utf-8") for name in graph.dance_names + graph.dancer_names + list(orders)]
+    string_offsets = [0]
+    for string in strings:
+        string_offsets.append(string_offsets[-1] + len(string))
+
+    offsets_start = HEADER.size
+    strings_start = offsets_start + 4 * len(string_offsets)
+    casts_start = strings_start + string_offsets[-1]
+    nbrs_start = casts_start + cast_row * dance_count
+    times_start = nbrs_start + dance_row * dance_count
+    orders_start = times_start + 4 * (dance_count + dancer_count)
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, dance_count, dancer_count, len(orders),
+                               offsets_start, strings_start, casts_start, nbrs_start, times_start, orders_start))
+        file.write(struct.pack(f"<{len(string_offsets)}I", *string_offsets))
+        file.write(b"".join(strings))
+        for cast in graph.casts:
+            file.write(cast.to_bytes(cast_row, "little"))
+        for nbrs in graph.nbrs:
+            file.write(nbrs.to_bytes(dance_row, "little"))
+        file.write(struct.pack(f"<{dance_count + dancer_count}I",
+                               *[durations.get(name, NO_TIME) for name in graph.dance_names],
+                               *[change_times.get(name, NO_TIME) for name in graph.dancer_names]))
+        for name, (order, locked) in orders.items():
+            if sorted(order) != list(range(dance_count)):
+                raise ValueError(f"Saved order {name!r} is not an order of all {dance_count} dances")
+            locked_mask = 0
+            for slot, dance in locked.items():
+                if order[slot] != dance:
+                    raise ValueError(f"Saved order {name!r} has {graph.dance_names[dance]} locked "
+                                     f"at slot {slot}, where it is not")
+                locked_mask |= 1 << dance
+            file.write(struct.pack(f"<{dance_count}I", *order))
+            file.write(locked_mask.to_bytes(dance_row, "little"))
+
+
+class CompiledRoster:
+    """Read-only view of a compiled roster file through mmap.
+
+    Nothing is decoded up front: names, casts and conflict rows are read
+    from the mapping the first time they are asked for, so opening a large
+    roster to look at one saved order or a few dances stays cheap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is empty, not a compiled roster")
+        if len(self.data) < HEADER.size or self.data[:4] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a compiled roster")
+        (_, version, self.dance_count, self.dancer_count, self.order_count, self.offsets_start,
+         self.strings_start, self.casts_start, self.nbrs_start, self.times_start,
+         self.orders_start) = HEADER.unpack_from(self.data)
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} is compiled roster format {version}, expected {FORMAT_VERSION}")
+        self.cast_row = _row_size(self.dancer_count)
+        self.dance_row = _row_size(self.dance_count)
+        self.order_size = 4 * self.dance_count + self.dance_row
+        self._strings: Dict[int, str] = {}
+        self._dance_index: Optional[Dict[str, int]] = None
+        self._order_index: Optional[Dict[str, int]] = None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.dance_count
+
+    def _string(self, index: int) -> str:
+        string = self._strings.get(index)
+        if string is None:
+            start, end = struct.unpack_from("<2I", self.data, self.offsets_start + 4 * index)
+            string = self.data[self.strings_start + start:self.strings_start + end].decode("utf-8")
+            self._strings[index] = string
+        return string
+
+    def dance_name(self, dance: int) -> str:
+        return self._string(dance)
+
+    def dancer_name(self, dancer: int) -> str:
+        return self._string(self.dance_count + dancer)
+
+    def order_name(self, order: int) -> str:
+        return self._string(self.dance_count + self.dancer_count + order)
+
+    def dance_id(self, name: str) -> int:
+        if self._dance_index is None:
+            self._dance_index = {self.dance_name(dance): dance for dance in range(self.dance_count)}
+        return self._dance_index[name]
+
+    def _row(self, start: int, size: int, index: int) -> int:
+        return int.from_bytes(self.data[start + size * index:start + size * (index + 1)], "little")
+
+    def cast(self, dance: int) -> int:
+        return self._row(self.casts_start, self.cast_row, dance)
+
+    def dancers(self, dance: int) -> List[str]:
+        return [self.dancer_name(dancer) for dancer in iter_bits(self.cast(dance))]
+
+    def nbrs(self, dance: int) -> int:
+        return self._row(self.nbrs_start, self.dance_row, dance)
+
+    def _times(self, start: int, count: int, name) -> Dict[str, int]:
+        times = struct.unpack_from(f"<{count}I", self.data, start)
+        return {name(index): time for index, time in enumerate(times) if time != NO_TIME}
+
+    def durations(self) -> Dict[str, int]:
+        """Running time in seconds of every dance that has one, by name"""
+        return self._times(self.times_start, self.dance_count, self.dance_name)
+
+    def change_times(self) -> Dict[str, int]:
+        """Costume-change time in seconds of every dancer that has one, by name"""
+        return self._times(self.times_start + 4 * self.dance_count, self.dancer_count, self.dancer_name)
+
+    def order_names(self) -> List[str]:
+        return [self.order_name(order) for order in range(self.order_count)]
+
+    def saved_order(self, name: str) -> Tuple[List[int], Dict[int, int]]:
+        """The saved order called name, as (order, {slot: locked dance})"""
+        if self._order_index is None:
+            self._order_index = {self.order_name(order): order for order in range(self.order_count)}
+        if name not in self._order_index:
+            raise ValueError(f"No saved order called {name!r} in {self.path}")
+        start = self.orders_start + self.order_size * self._order_index[name]
+        order = list(struct.unpack_from(f"<{self.dance_count}I", self.data, start))
+        locked_mask = self._row(start + 4 * self.dance_count, self.dance_row, 0)
+        return order, {slot: dance for slot, dance in enumerate(order) if locked_mask >> dance & 1}
+
+    def roster(self) -> Dict[str, List[str]]:
+        """{dance: [dancers]}, as the Excel reader gives it"""
+        return {self.dance_name(dance): self.dancers(dance) for dance in range(self.dance_count)}
+
+    def to_graph(self, graph_type=ConflictGraph) -> ConflictGraph:
+        """Decode everything into a ConflictGraph, or a subclass such as Roster, reusing the stored conflict rows"""
+        return graph_type.from_casts(
+            [self.cast(dance) for dance in range(self.dance_count)],
+            self.dancer_count,
+            [self.dance_name(dance) for dance in range(self.dance_count)],
+            [self.dancer_name(dancer) for dancer in range(self.dancer_count)],
+            [self.nbrs(dance) for dance in range(self.dance_count)],
+        )
+
+
+def read_compiled_roster(path) -> Tuple[ConflictGraph, Dict[str, Tuple[List[int], Dict[int, int]]]]:
+    """The graph and every saved order in a compiled roster file"""
+    with CompiledRoster(path) as roster:
+        return roster.to_graph(), {name: roster.saved_order(name) for name in roster.order_names()}
+
+
+def compile_dances(path, dances: Iterable, order_name: str = "current",
+                   durations: Optional[Dict[str, int]] = None, change_times: Optional[Dict[str, int]] = None):
+    """Write Dance objects to a compiled roster, saving their positions and locks as order_name"""
+    graph = graph_of(dances)
+    order = sorted(range(len(graph)), key=lambda dance: graph.dances[dance].position)
+    locked = {slot: dance for slot, dance in enumerate(order) if graph.dances[dance].locked}
+    write_compiled_roster(path, graph, {order_name: (order, locked)}, durations, change_times)
@@ -0,0 +1,125 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield the index of every set bit in mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def popcount(mask: int) -> int:
+    return mask.bit_count()
+
+
+class ConflictGraph:
+    """Integer view of a roster: interned dancers, cast bitmasks and conflict edges.
+
+    Dances and dancers are numbered in the order they are first seen. casts[d]
+    has bit i set when dancer i is in dance d, appearances[i] lists the dances
+    dancer i is in, and nbrs[d] has bit e set when dances d and e share a dancer.
+    """
+
+    def __init__(self, roster: Iterable[Tuple[str, Iterable[str]]]):
+        self.dance_names: List[str] = []
+        self.dance_index: Dict[str, int] = {}
+        self.dancer_names: List[str] = []
+        self.dancer_index: Dict[str, int] = {}
+        self.casts: List[int] = []
+        self.appearances: List[List[int]] = []
+        self.dances: List = []
+
+        for name, dancer_names in roster:
+            dance_id = len(self.dance_names)
+            self.dance_names.append(name)
+            self.dance_index[name] = dance_id
+            cast = 0
+            for dancer_name in dancer_names:
+                dancer_id = self.intern_dancer(dancer_name)
+                if not cast >> dancer_id & 1:
+                    self.appearances[dancer_id].append(dance_id)
+                cast |= 1 << dancer_id
+            self.casts.append(cast)
+
+        self.nbrs: List[int] = self._build_nbrs()
+
+    @classmethod
+    def from_casts(cls, casts: Iterable[int], dancer_count: int,
+                   dance_names: Optional[List[str]] = None, dancer_names: Optional[List[str]] = None,
+                   nbrs: Optional[List[int]] = None) -> 'ConflictGraph':
+        """Build a graph straight from cast bitmasks; names default to placeholders.
+
+        nbrs can be passed when the conflict edges are already known.
+        """
+        graph = cls(())
+        graph.casts = list(casts)
+        graph.dance_names = list(dance_names or [str(dance_id) for dance_id in range(len(graph.casts))])
+        graph.dance_index = {name: dance_id for dance_id, name in enumerate(graph.dance_names)}
+        graph.dancer_names = list(dancer_names or [str(dancer_id) for dancer_id in range(dancer_count)])
+        graph.dancer_index = {name: dancer_id for dancer_id, name in enumerate(graph.dancer_names)}
+        graph.appearances = [[] for _ in range(dancer_count)]
+        for dance_id, cast in enumerate(graph.casts):
+            for dancer_id in iter_bits(cast):
+                graph.appearances[dancer_id].append(dance_id)
+        graph.nbrs = list(nbrs) if nbrs is not None else graph._build_nbrs()
+        return graph
+
+    @classmethod
+    def from_dances(cls, dances: Iterable) -> 'ConflictGraph':
+        """Build a graph from Dance objects, keeping their iteration order"""
+        dances = list(dances)
+        graph = cls((dance.name, [dancer.name for dancer in dance.dancers]) for dance in dances)
+        graph.dances = dances
+        return graph
+
+    def intern_dancer(self, name: str) -> int:
+        dancer_id = self.dancer_index.get(name)
+        if dancer_id is None:
+            dancer_id = len(self.dancer_names)
+            self.dancer_names.append(name)
+            self.dancer_index[name] = dancer_id
+            self.appearances.append([])
+        return dancer_id
+
+    def _build_nbrs(self) -> List[int]:
+        # One mask per dancer of the dances they appear in, then OR those
+        # masks together per dance; no pair of dances is ever compared directly
+        dancer_dances = []
+        for dance_ids in self.appearances:
+            mask = 0
+            for dance_id in dance_ids:
+                mask |= 1 << dance_id
+            dancer_dances.append(mask)
+
+        nbrs = []
+        for dance_id, cast in enumerate(self.casts):
+            mask = 0
+            for dancer_id in iter_bits(cast):
+                mask |= dancer_dances[dancer_id]
+            nbrs.append(mask & ~(1 << dance_id))
+        return nbrs
+
+    def __len__(self):
+        return len(self.dance_names)
+
+    def degree(self, dance_id: int) -> int:
+        return popcount(self.nbrs[dance_id])
+
+    def shared(self, dance_1: int, dance_2: int) -> int:
+        """Number of dancers two dances have in common"""
+        return popcount(self.casts[dance_1] & self.casts[dance_2])
+
+    def edges(self) -> Iterator[Tuple[int, int]]:
+        for dance_id, mask in enumerate(self.nbrs):
+            for nbr in iter_bits(mask >> (dance_id + 1)):
+                yield dance_id, dance_id + 1 + nbr
+
+
+def add_edges(dances: Iterable) -> ConflictGraph:
+    """Link every pair of Dance objects that share a dancer through add_nbr"""
+    graph = ConflictGraph.from_dances(dances)
+    for dance, mask in zip(graph.dances, graph.nbrs):
+        for nbr in iter_bits(mask):
+            dance.add_nbr(graph.dances[nbr])
+    return graph
@@ -0,0 +1,193 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from conflict_graph import ConflictGraph, iter_bits
+
+
+class ShowConstraints:
+    """Placement rules for a show, given by dance name.
+
+    Slots count from 0, like Dance.position. pinned maps a dance to the slot it
+    has to be in, opener and closer name the first and last dance, before holds
+    (earlier, later) pairs and not_adjacent holds pairs that must not be
+    back-to-back.
+    """
+
+    def __init__(self, pinned: Optional[Dict[str, int]] = None, opener: Optional[str] = None,
+                 closer: Optional[str] = None, before: Iterable[Tuple[str, str]] = (),
+                 not_adjacent: Iterable[Tuple[str, str]] = ()):
+        self.pinned = dict(pinned or {})
+        self.opener = opener
+        self.closer = closer
+        self.before = [tuple(pair) for pair in before]
+        self.not_adjacent = [tuple(pair) for pair in not_adjacent]
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'ShowConstraints':
+        return cls(spec.get("pinned"), spec.get("opener"), spec.get("closer"),
+                   spec.get("before", ()), spec.get("not_adjacent", ()))
+
+    def to_dict(self) -> Dict:
+        return {
+            "pinned": self.pinned,
+            "opener": self.opener,
+            "closer": self.closer,
+            "before": [list(pair) for pair in self.before],
+            "not_adjacent": [list(pair) for pair in self.not_adjacent],
+        }
+
+    def __bool__(self):
+        return bool(self.pinned or self.opener or self.closer or self.before or self.not_adjacent)
+
+    def compile(self, graph: ConflictGraph, dances: Optional[Iterable[int]] = None,
+                first_slot: int = 0) -> 'CompiledConstraints':
+        """Resolve names against graph for dances filling slots from first_slot on.
+
+        Raises ValueError naming the problem if the rules cannot all hold.
+        """
+        if dances is None:
+            dances = range(len(graph))
+        dances = list(dances)
+        last_slot = first_slot + len(dances) - 1
+
+        def dance_id(name):
+            if name not in graph.dance_index or graph.dance_index[name] not in dances:
+                raise ValueError(f"Unknown dance {name!r} in show constraints")
+            return graph.dance_index[name]
+
+        def relative(slot, name):
+            if not 0 <= slot < len(dances):
+                raise ValueError(f"{name} is pinned to slot {slot}, outside slots 0-{len(dances) - 1}")
+            return first_slot + slot
+
+        compiled = CompiledConstraints(graph, dances, first_slot)
+        fixed = dict((dance_id(name), relative(slot, name)) for name, slot in self.pinned.items())
+        if self.opener is not None:
+            fixed[dance_id(self.opener)] = first_slot
+        if self.closer is not None:
+            fixed[dance_id(self.closer)] = last_slot
+        for dance, slot in fixed.items():
+            compiled.domains[dance] &= 1 << slot
+        for earlier, later in self.before:
+            earlier, later = dance_id(earlier), dance_id(later)
+            compiled.predecessors[later] |= 1 << earlier
+            compiled.successors[earlier] |= 1 << later
+        for dance_1, dance_2 in self.not_adjacent:
+            dance_1, dance_2 = dance_id(dance_1), dance_id(dance_2)
+            compiled.apart[dance_1] |= 1 << dance_2
+            compiled.apart[dance_2] |= 1 << dance_1
+        compiled.propagate()
+        return compiled
+
+
+class CompiledConstraints:
+    """ShowConstraints as slot bitmasks over dance IDs, narrowed by propagation.
+
+    domains[d] has bit s set when dance d may still go in show slot s.
+    predecessors[d] and successors[d] are the dances that must come before and
+    after d, and apart[d] the dances that must not be next to it.
+    """
+
+    def __init__(self, graph: ConflictGraph, dances: Sequence[int], first_slot: int = 0):
+        self.graph = graph
+        self.dances = list(dances)
+        self.first_slot = first_slot
+        all_slots = ((1 << len(self.dances)) - 1) << first_slot
+        self.domains: Dict[int, int] = {dance: all_slots for dance in self.dances}
+        self.predecessors: Dict[int, int] = {dance: 0 for dance in self.dances}
+        self.successors: Dict[int, int] = {dance: 0 for dance in self.dances}
+        self.apart: Dict[int, int] = {dance: 0 for dance in self.dances}
+
+    def earliest(self, dance: int) -> int:
+        domain = self.domains[dance]
+        return (domain & -domain).bit_length() - 1
+
+    def latest(self, dance: int) -> int:
+        return self.domains[dance].bit_length() - 1
+
+    def pinned(self) -> Dict[int, int]:
+        """Slots that only one dance can fill, as {slot: dance}"""
+        return {self.earliest(dance): dance for dance, domain in self.domains.items()
+                if domain & (domain - 1) == 0}
+
+    def propagate(self):
+        """Narrow every domain to a fixpoint, raising ValueError if one empties"""
+        changed = True
+        while changed:
+            changed = False
+            for dance in self.dances:
+                domain = self.domains[dance]
+                for other in iter_bits(self.predecessors[dance]):
+                    domain &= ~((1 << (self.earliest(other) + 1)) - 1)
+                for other in iter_bits(self.successors[dance]):
+                    domain &= (1 << self.latest(other)) - 1
+                for other in iter_bits(self.apart[dance]):
+                    # Apart rules may name dances outside these, see restricted()
+                    other_domain = self.domains.get(other, 0)
+                    if other_domain and other_domain & (other_domain - 1) == 0:
+                        domain &= ~(other_domain << 1 | other_domain >> 1)
+                for other, other_domain in self.domains.items():
+                    if other != dance and other_domain and other_domain & (other_domain - 1) == 0:
+                        domain &= ~other_domain
+                if not domain:
+                    raise ValueError(f"No slot left for {self.graph.dance_names[dance]} under the show constraints")
+                if domain != self.domains[dance]:
+                    self.domains[dance] = domain
+                    changed = True
+
+            # A slot that only one dance can still go in belongs to that dance
+            for slot in range(self.first_slot, self.first_slot + len(self.dances)):
+                holders = [dance for dance in self.dances if self.domains[dance] >> slot & 1]
+                if not holders:
+                    raise ValueError(f"No dance can fill slot {slot} under the show constraints")
+                if len(holders) == 1 and self.domains[holders[0]] != 1 << slot:
+                    self.domains[holders[0]] = 1 << slot
+                    changed = True
+
+    def restricted(self, dances: Sequence[int], first_slot: int) -> 'CompiledConstraints':
+        """The rules for some of the dances, filling the slots from first_slot on.
+
+        The other dances have to be placed around them already, so the
+        orderings with those are dropped; apart rules are kept, as the dance
+        just before first_slot may be one of them.
+        """
+        restricted = CompiledConstraints(self.graph, dances, first_slot)
+        inside = sum(1 << dance for dance in restricted.dances)
+        slots = ((1 << len(restricted.dances)) - 1) << first_slot
+        for dance in restricted.dances:
+            restricted.domains[dance] = self.domains[dance] & slots
+            restricted.predecessors[dance] = self.predecessors[dance] & inside
+            restricted.successors[dance] = self.successors[dance] & inside
+            restricted.apart[dance] = self.apart[dance]
+        restricted.propagate()
+        return restricted
+
+    def allowed(self, dance: int, slot: int, placed: int, last=None) -> bool:
+        """Whether dance may go in slot after the dances in the placed mask, right after last"""
+        return bool(self.domains[dance] >> slot & 1
+                    and not self.predecessors[dance] & ~placed
+                    and (last is None or not self.apart[dance] >> last & 1))
+
+    def violations(self, order: Sequence[int]) -> List[str]:
+        """Human-readable list of the rules a full order of self.dances breaks"""
+        names = self.graph.dance_names
+        position = {dance: self.first_slot + i for i, dance in enumerate(order)}
+        problems = []
+        for dance in self.dances:
+            slot = position[dance]
+            if not self.domains[dance] >> slot & 1:
+                problems.append(f"{names[dance]} cannot be in slot {slot}")
+            for other in iter_bits(self.predecessors[dance]):
+                if position[other] > slot:
+                    problems.append(f"{names[other]} has to come before {names[dance]}")
+            for other in iter_bits(self.apart[dance]):
+                if other > dance and other in position and abs(position[other] - slot) == 1:
+                    problems.append(f"{names[dance]} and {names[other]} cannot be back-to-back")
+        return problems
+
+
+def compile_constraints(constraints, graph: ConflictGraph, dances: Optional[Iterable[int]] = None,
+                        first_slot: int = 0) -> Optional[CompiledConstraints]:
+    """Accept ShowConstraints, already compiled constraints or None"""
+    if constraints is None or isinstance(constraints, CompiledConstraints):
+        return constraints
+    return constraints.compile(graph, dances, first_slot)
@@ -1,6 +1,8 @@
 from dancer import Dancer
 
 class Dance:
+    __slots__ = ("nbrs", "degree", "name", "dancers", "weight", "locked", "position")
+
     def __init__(self, name, dancers: set['Dancer']):
         self.nbrs: set['Dance'] = set()
         self.degree = 0
@@ -45,18 +47,11 @@ class Dance:
         return qcs, instants
 
     def schedule_dance(self):
-        print(f"Scheduled: {self}")
         for dancer in self.dancers:
             dancer.schedule_dance()
         for nbr in self.nbrs:
             nbr.remove_nbr(self)
 
-    def __hash__(self):
-        return hash(self.name)
-
-    def __eq__(self, other: 'Dance'):
-        return self.weight == other.weight
-    
     def __gt__(self, other: 'Dance'):
         return self.weight > other.weight
     
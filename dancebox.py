@@ -89,7 +89,7 @@ class DanceBox:
                           self.lock_button, self.lock_icon, self.position_indicator]
     
     def on_press(self, event):
-        if self.dance.locked:
+        if self.dance.locked or self.app.is_optimizing():
             return
         
         self.drag_data["x"] = event.x
@@ -121,6 +121,9 @@ class DanceBox:
         
         # Update drag data
         self.drag_data["y"] = event.y
+        
+        # Score the order this box would give if dropped here
+        self.app.preview_drop(self)
     
     def on_release(self, event):
         if not self.drag_data["dragging"] or self.dance.locked:
@@ -131,27 +134,9 @@ class DanceBox:
         # Reset appearance
         self.canvas.itemconfig(self.box, fill=self.box_color, outline="#2196F3", width=2)
         
-        # Find nearest slot and snap to it
-        nearest_slot, position, old_position = self.app.find_nearest_slot(self)
-
-        print(nearest_slot, position, old_position)
-        
-        # Move to the nearest slot
-        dy = nearest_slot - self.y
-        for item in self.all_items:
-            self.canvas.move(item, 0, dy)
-        
-        # Update positions
-        self.lock_y += dy
-        self.y = nearest_slot
-        self.vertical_slot = nearest_slot
-        self.dance.position = position
-        
-        # Update position indicator
-        self.canvas.itemconfig(self.position_indicator, text=str(position + 1))
-        
-        # Update all position indicators
-        self.app.update_all_positions()
+        # Find nearest slot and drop the dance there, shifting the unlocked dances in between
+        _, position, _ = self.app.find_nearest_slot(self)
+        self.app.drop_box(self, position)
     
     def on_enter(self, event):
         if not self.dance.locked:
@@ -161,9 +146,39 @@ class DanceBox:
         if not self.dance.locked and not self.drag_data["dragging"]:
             self.canvas.itemconfig(self.box, fill=self.box_color)
     
+    def move_to(self, y_position):
+        """Move the whole box to the slot at y_position"""
+        dy = y_position - self.y
+        for item in self.all_items:
+            self.canvas.move(item, 0, dy)
+        self.lock_y += dy
+        self.y = y_position
+        self.vertical_slot = y_position
+    
+    def show(self, dance: Dance, y_position):
+        """Reuse this box's canvas items for dance, in the slot at y_position"""
+        self.dance = dance
+        self.canvas.itemconfig(self.title, text=dance.name)
+        self.canvas.itemconfig(self.dancer_count, text=f"Dancers: {[dancer.name for dancer in dance.dancers]}")
+        self.canvas.itemconfig(self.box, fill=self.box_color, outline="#2196F3", width=2)
+        self.draw_lock()
+        self.move_to(y_position)
+        self.update_position_indicator(dance.position)
+        for item in self.all_items:
+            self.canvas.itemconfig(item, state="normal")
+    
+    def hide(self):
+        """Hide the box until it is reused for another dance"""
+        for item in self.all_items:
+            self.canvas.itemconfig(item, state="hidden")
+    
     def toggle_lock(self, event):
+        if self.app.is_optimizing():
+            return
         self.dance.locked = not self.dance.locked
-        
+        self.draw_lock()
+    
+    def draw_lock(self):
         if self.dance.locked:
             self.canvas.itemconfig(self.lock_button, fill="#FF9800")
             self.canvas.itemconfig(self.lock_icon, text="🔒")
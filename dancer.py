@@ -1,4 +1,6 @@
 class Dancer:
+    __slots__ = ("name", "dances", "dances_done", "time_since_last_dance")
+
     def __init__(self, name: str):
         self.name = name
         self.dances = 1
@@ -1,22 +1,14 @@
 from typing import Dict, List, Set, Tuple
-from dance import Dance
-from dancer import Dancer
+from roster_model import DanceView, DancerView, Roster
 
-def process_dances(dances: Dict[str, List[str]]) -> Tuple[Set['Dance'], Dict[str, 'Dancer']]:
-    all_dancers = {}
-    all_dances = set()
-    
-    for dance in dances.items():
-        [name, dancer_names] = dance
-        
-        dancers = set()
-        for dancer in dancer_names:
-            if dancer in all_dancers:
-                all_dancers[dancer].add_dance()
-            else:
-                all_dancers[dancer] = Dancer(dancer)
-            dancers.add(all_dancers[dancer])
-        dance = Dance(name, dancers)
-        all_dances.add(dance)
+def process_dances(dances: Dict[str, List[str]]) -> Tuple[Set['DanceView'], Dict[str, 'DancerView']]:
+    """Build the roster model; the set of dances iterates in roster order"""
+    return roster_views(Roster(dances.items()))
+
+
+def roster_views(roster: Roster) -> Tuple[Set['DanceView'], Dict[str, 'DancerView']]:
+    """The dances and dancers of a Roster already built, as process_dances gives them"""
+    all_dances = set(roster.dance_views)
+    all_dancers = {dancer.name: dancer for dancer in roster.dancer_views}
 
     return (all_dances, all_dancers)
\ No newline at end of file
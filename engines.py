@@ -0,0 +1,67 @@
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from beam_search import BeamSearch
+from conflict_graph import ConflictGraph
+from constraints import compile_constraints
+from exact_solver import solve_exact
+from instrumentation import Instruments
+from local_search import LocalSearch
+from lower_bound import lower_bound
+from parallel import parallel_search
+from scheduler import degree_weight, quick_change_weight, schedule_greedy
+from show_cost import order_cost
+from show_timing import ShowTiming
+
+ENGINES = ("greedy", "degree", "anneal", "exact", "beam", "parallel")
+
+
+def check_engine(engine: str):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {', '.join(ENGINES)}")
+
+
+def run_engine(graph: ConflictGraph, engine: str = "greedy", dances: Optional[Iterable[int]] = None,
+               time_limit: float = 1.0, seed: int = 0, constraints=None,
+               instruments: Optional[Instruments] = None,
+               timing: Optional[ShowTiming] = None,
+               on_improve: Optional[Callable[[List[int], int], None]] = None,
+               should_stop: Optional[Callable[[], bool]] = None,
+               workers: Optional[int] = None) -> Tuple[int, List[int]]:
+    """Order dances (all of graph by default) with one engine and return (cost, order).
+
+    greedy and degree are the greedy schedulers of textbased_greedy.py and
+    textbased.py; anneal improves the greedy order for time_limit seconds
+    and exact searches for at most that long. Both stop at the lower bound.
+    beam returns the best order of a beam search. parallel anneals restarts
+    from randomly tie-broken greedy orders on workers processes at once (see
+    parallel_search), each for time_limit seconds, and keeps the best.
+    With a ShowTiming of graph, anneal minimises the seconds dancers are
+    short for their changes instead, and returns that as the cost.
+    anneal, exact and parallel call on_improve with every new best order
+    and its cost, and stop early once should_stop returns True.
+    """
+    check_engine(engine)
+    if dances is None:
+        dances = range(len(graph))
+    dances = list(dances)
+    if engine == "parallel":
+        # The workers compile the constraints against their own copy of the roster
+        cost, order, _ = parallel_search(graph, time_limit=time_limit, workers=workers, seed=seed,
+                                         constraints=constraints, dances=dances, timing=timing,
+                                         on_improve=on_improve, should_stop=should_stop)
+        return cost, order
+    constraints = compile_constraints(constraints, graph, dances)
+
+    if engine == "beam":
+        return BeamSearch(graph, dances, constraints=constraints, instruments=instruments).search()[0]
+    if engine == "exact":
+        return solve_exact(graph, dances, time_limit=time_limit, constraints=constraints,
+                           instruments=instruments, on_improve=on_improve, should_stop=should_stop)
+    weight = degree_weight if engine == "degree" else quick_change_weight
+    order = schedule_greedy(graph, dances, weight=weight, constraints=constraints, instruments=instruments)
+    if engine == "anneal":
+        search = LocalSearch(graph, order, seed=seed, constraints=constraints, instruments=instruments,
+                             timing=timing)
+        return search.run(time_limit, should_stop=should_stop, on_improve=on_improve,
+                          target=lower_bound(graph, dances).cost if timing is None else None)
+    return order_cost(graph, order), order
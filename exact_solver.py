@@ -0,0 +1,436 @@
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from conflict_graph import ConflictGraph, iter_bits
+from constraints import compile_constraints
+from instrumentation import Instruments, phase, tracing
+from layered_dp import LayerLimit, cheapest_split
+from lower_bound import LowerBound, clique_cover, spacing_penalty
+from scheduler import schedule_greedy
+from show_cost import INSTANT_WEIGHT, cost_cache, order_cost
+
+
+# Seconds of branch and bound before handing the proof to cheapest_split
+SPLIT_AFTER = 1.0
+
+
+class SearchTimeout(Exception):
+    """Unwinds the search when time runs out, carrying the cost-to-go bound proven so far"""
+
+    def __init__(self, bound: float = 0):
+        super().__init__(bound)
+        self.bound = bound
+
+
+class ExactSolver:
+    """Branch-and-bound over show orders with memoized cost-to-go bounds.
+
+    A state is (unscheduled dances, dance before last, last dance): the cost of
+    everything still to come depends on nothing else. For every state searched
+    the memo keeps either its exact cost-to-go or a proven lower bound, so a
+    state reached again through a different prefix is never expanded twice for
+    the same budget.
+
+    The admissible bound is the largest of several relaxations: the cheapest
+    slot each unscheduled dance could get, the spacing forced on each dancer's
+    dances and on a clique cover of the conflict graph, and the instants forced
+    on dances that conflict with everything left. States whose scheduled
+    dances share nobody with what is left share a memo entry too.
+
+    A search still running after SPLIT_AFTER seconds hands over to
+    cheapest_split, which settles a roster of 20-odd dances by meeting in
+    the middle, pinned dances and constraints included, when its best order
+    is free of instants.
+    """
+
+    def __init__(self, graph: ConflictGraph, instruments: Optional[Instruments] = None):
+        self.graph = graph
+        self.instruments = instruments
+        self.window = cost_cache(graph).window
+        self.memo: Dict[Tuple[int, Optional[int], Optional[int]], Tuple[float, bool, Optional[int]]] = {}
+        self.nodes = 0
+        self.memo_hits = 0
+        self.prunes = 0
+        self.incumbents = 0
+        self.cheapest_slots: Dict[int, List[Tuple[int, int, int]]] = {}
+        self.structures: Dict[int, Tuple] = {}
+
+    def cost(self, before_prev, prev, dance) -> int:
+        qcs, instants = self.window(before_prev, prev, dance)
+        return qcs + INSTANT_WEIGHT * instants
+
+    def solve(self, dances: Iterable[int], previous: Sequence[int] = (),
+              pinned: Optional[Dict[int, int]] = None,
+              time_limit: Optional[float] = None,
+              initial: Optional[Sequence[int]] = None, constraints=None,
+              on_improve: Optional[Callable[[List[int], int], None]] = None,
+              should_stop: Optional[Callable[[], bool]] = None) -> Tuple[int, List[int]]:
+        """Return the minimum cost and an order achieving it for dances after previous.
+
+        initial is a known order of dances to start from when it beats the
+        greedy one. With a time_limit the best order found so far is returned
+        once it runs out; proven is then False and lower_bound says how far
+        off it can be. constraints are ShowConstraints for the slots after
+        previous; branches that break them are never entered, and a dance
+        whose last allowed slot has passed ends its branch at once.
+
+        on_improve is called with every new incumbent order and its cost,
+        the starting one included, and should_stop ends the search like the
+        time limit does once it returns True.
+        """
+        self.on_improve = on_improve
+        self.should_stop = should_stop
+        with phase(self.instruments, "exact"):
+            result = self._solve(dances, previous, pinned, time_limit, initial, constraints)
+        if self.instruments is not None:
+            self.instruments.count("nodes_expanded", self.nodes)
+            self.instruments.count("memo_hits", self.memo_hits)
+            self.instruments.count("bound_prunes", self.prunes)
+            self.instruments.count("incumbents", self.incumbents)
+        return result
+
+    def _solve(self, dances, previous, pinned, time_limit, initial, constraints) -> Tuple[int, List[int]]:
+        self.trace = tracing(self.instruments)
+        dances = list(dances)
+        self.total = len(dances)
+        self.previous = list(previous)
+        self.pinned = dict(pinned or {})
+        self.constraints = compile_constraints(constraints, self.graph, dances, len(previous))
+        self.due: Dict[int, int] = {}
+        self.overdue: Dict[int, int] = {}
+        if self.constraints is not None:
+            self.pinned.update(self.constraints.pinned())
+            for slot in range(len(previous), len(previous) + len(dances)):
+                self.due[slot] = self.overdue[slot] = 0
+            for dance in dances:
+                latest = self.constraints.latest(dance)
+                self.due[latest] |= 1 << dance
+                for slot in range(latest + 1, len(previous) + len(dances)):
+                    self.overdue[slot] |= 1 << dance
+        self.pinned_mask = 0
+        for dance in self.pinned.values():
+            self.pinned_mask |= 1 << dance
+
+        remaining = 0
+        for dance in dances:
+            remaining |= 1 << dance
+        self._prepare_bounds(dances, previous)
+        self.dancer_dances = [0] * len(self.graph.dancer_names)
+        for dancer, dances_in in enumerate(self.graph.appearances):
+            for dance in dances_in:
+                self.dancer_dances[dancer] |= 1 << dance
+
+        # The better of the greedy and initial orders is the first incumbent;
+        # the search only has to beat or prove it
+        try:
+            self.best_order = schedule_greedy(self.graph, dances, previous, self.pinned,
+                                              constraints=self.constraints, instruments=self.instruments)
+            self.best_cost = order_cost(self.graph, self.best_order, previous)
+        except ValueError:
+            # Greedy can paint itself into a corner under constraints
+            self.best_order = None
+            self.best_cost = float('inf')
+        if (initial is not None and order_cost(self.graph, initial, previous) < self.best_cost
+                and (self.constraints is None or not self.constraints.violations(initial))):
+            self.best_order = list(initial)
+            self.best_cost = order_cost(self.graph, initial, previous)
+        self.path = []
+        self.deadline = time.monotonic() + time_limit if time_limit is not None else None
+        if self.on_improve is not None and self.best_order is not None:
+            self.on_improve(list(self.best_order), self.best_cost)
+
+        prev = previous[-2] if len(previous) >= 2 else None
+        last = previous[-1] if previous else None
+        # Leaving out previous only makes the show cheaper, so the whole-show
+        # bound on these dances holds after it as well
+        self.lower_bound = min(max(self.bound(remaining, prev, last), LowerBound(self.graph, dances).cost),
+                               self.best_cost)
+        try:
+            if self.lower_bound < self.best_cost:
+                with phase(self.instruments, "exact_search"):
+                    self._search_root(remaining, prev, last)
+            self.proven = True
+            self.lower_bound = self.best_cost
+        except SearchTimeout as timeout:
+            self.proven = False
+            self.lower_bound = max(self.lower_bound, min(timeout.bound, self.best_cost))
+        if self.best_order is None:
+            raise ValueError("No order satisfies the show constraints")
+        return self.best_cost, list(self.best_order)
+
+    def _prepare_bounds(self, dances: List[int], previous: Sequence[int]):
+        # For every dance, all (cost, prev, before_prev) it could ever be
+        # scheduled after, cheapest first
+        candidates = dances + list(previous[-2:])
+        for dance in dances:
+            slots = []
+            for prev in candidates:
+                if prev == dance:
+                    continue
+                for before_prev in candidates:
+                    if before_prev != dance and before_prev != prev:
+                        slots.append((self.cost(before_prev, prev, dance), prev, before_prev))
+            slots.sort()
+            self.cheapest_slots[dance] = slots
+
+    def _structure(self, remaining: int):
+        """Per-dancer dance counts and a clique cover of remaining, cached per set"""
+        structure = self.structures.get(remaining)
+        if structure is not None:
+            return structure
+        slots = remaining.bit_count()
+        sizes = {}
+        dancer_total = 0
+        for dancer, dances in enumerate(self.dancer_dances):
+            size = (dances & remaining).bit_count()
+            if size:
+                sizes[dancer] = size
+                dancer_total += spacing_penalty(size - 1, slots - 1)
+
+        cliques = [(clique, clique.bit_count()) for clique in clique_cover(self.graph.nbrs, remaining)]
+
+        structure = slots, sizes, dancer_total, cliques
+        self.structures[remaining] = structure
+        return structure
+
+    def dancer_bound(self, remaining: int, prev, last) -> int:
+        # A dancer's dances all conflict with each other and with any
+        # scheduled dance the dancer was in, which has to keep its distance too
+        slots, sizes, total, _ = self._structure(remaining)
+        last_cast = self.graph.casts[last] if last is not None else 0
+        prev_cast = self.graph.casts[prev] & ~last_cast if prev is not None else 0
+        for dancer in iter_bits(last_cast):
+            size = sizes.get(dancer)
+            if size:
+                total += spacing_penalty(size, slots) - spacing_penalty(size - 1, slots - 1)
+        for dancer in iter_bits(prev_cast):
+            size = sizes.get(dancer)
+            if size:
+                total += spacing_penalty(size, slots + 1) - spacing_penalty(size - 1, slots - 1)
+        return total
+
+    def clique_bound(self, remaining: int, prev, last) -> int:
+        # Cliques of the conflict graph are charged only at the slots of
+        # their own members, so the penalties of a clique cover add up
+        slots, _, _, cliques = self._structure(remaining)
+        nbrs = self.graph.nbrs
+        last_nbrs = nbrs[last] if last is not None else 0
+        prev_nbrs = nbrs[prev] if prev is not None else 0
+        total = 0
+        for clique, size in cliques:
+            if not clique & ~last_nbrs:
+                total += spacing_penalty(size, slots)
+            elif not clique & ~prev_nbrs:
+                total += spacing_penalty(size, slots + 1)
+            else:
+                total += spacing_penalty(size - 1, slots - 1)
+        return total
+
+    def successor_bound(self, remaining: int) -> int:
+        # Every unscheduled dance but the final one is followed by another
+        # unscheduled dance, so it pays for the cheapest instant it can cause
+        nbrs = self.graph.nbrs
+        total = 0
+        worst = 0
+        for dance in iter_bits(remaining):
+            others = remaining & ~(1 << dance)
+            if not others or others & ~nbrs[dance]:
+                continue
+            cheapest = min(self.graph.shared(dance, other) for other in iter_bits(others)) * INSTANT_WEIGHT
+            total += cheapest
+            worst = max(worst, cheapest)
+        return total - worst
+
+    def bound(self, remaining: int, prev, last) -> int:
+        return max(self.pair_bound(remaining, prev, last), self.dancer_bound(remaining, prev, last),
+                   self.clique_bound(remaining, prev, last), self.successor_bound(remaining))
+
+    def pair_bound(self, remaining: int, prev, last) -> int:
+        if last is None or prev is None:
+            return 0
+        prev_allowed = remaining | (1 << last)
+        before_prev_allowed = prev_allowed | (1 << prev)
+        total = 0
+        for dance in iter_bits(remaining):
+            for cost, slot_prev, slot_before_prev in self.cheapest_slots[dance]:
+                if prev_allowed >> slot_prev & 1 and before_prev_allowed >> slot_before_prev & 1:
+                    total += cost
+                    break
+        return total
+
+    def _candidates(self, remaining: int, last) -> Iterable[int]:
+        slot = len(self.previous) + self._scheduled(remaining)
+        pinned = self.pinned.get(slot)
+        if pinned is not None:
+            return [pinned] if remaining >> pinned & 1 else []
+        free = remaining & ~self.pinned_mask
+        if self.constraints is None:
+            return iter_bits(free)
+        if remaining & self.overdue[slot]:
+            return []
+        due = free & self.due[slot]
+        if due:
+            free = due
+        placed = ~remaining
+        return [dance for dance in iter_bits(free) if self.constraints.allowed(dance, slot, placed, last)]
+
+    def _scheduled(self, remaining: int) -> int:
+        return self.total - remaining.bit_count()
+
+    def _search_root(self, remaining: int, prev, last):
+        deadline = self.deadline
+        split_at = time.monotonic() + SPLIT_AFTER
+        if deadline is None or split_at < deadline:
+            self.deadline = split_at
+            try:
+                self._search(remaining, prev, last, 0, self.best_cost)
+                return
+            except SearchTimeout:
+                if self.should_stop is not None and self.should_stop():
+                    raise
+                self.path = []
+            finally:
+                self.deadline = deadline
+            if self._split(remaining):
+                return
+        self._search(remaining, prev, last, 0, self.best_cost)
+
+    def _split(self, remaining: int) -> bool:
+        """Settle the search with cheapest_split, looking only at orders free of instants.
+
+        Returns False, with a raised lower bound if nothing was found, when
+        the optimum may still have instants.
+        """
+        # Orders with instants are too many to lay out
+        cap = min(self.best_cost - 1, INSTANT_WEIGHT)
+        try:
+            with phase(self.instruments, "exact_split"):
+                split = cheapest_split(self.graph, list(iter_bits(remaining)), self.previous, cap,
+                                       self.deadline, self.should_stop, self.pinned, self.constraints)
+        except LayerLimit:
+            return False
+        if split is None and cap < self.best_cost - 1:
+            self.lower_bound = max(self.lower_bound, cap + 1)
+            return False
+        if split is not None:
+            # Each half is small enough to rebuild by plain branch and bound
+            end = len(self.previous) + len(split.head)
+            _, head = self._solve_part(split.head, self.previous,
+                                       {end - 2: split.head_end[0], end - 1: split.head_end[1]})
+            _, tail = self._solve_part([dance for dance in split.tail if dance not in split.tail_start],
+                                       self.previous + head + split.tail_start, {})
+            order = head + split.tail_start + tail
+            self._improve(order_cost(self.graph, order, self.previous), order)
+        return True
+
+    def _solve_part(self, dances: List[int], previous: List[int], pinned: Dict[int, int]) -> Tuple[int, List[int]]:
+        """Solve dances after previous, keeping this search's pins and constraints on them"""
+        pinned = dict(pinned)
+        pinned.update((slot, dance) for slot, dance in self.pinned.items() if dance in dances)
+        constraints = None
+        if self.constraints is not None:
+            constraints = self.constraints.restricted(dances, len(previous))
+        return ExactSolver(self.graph).solve(dances, previous, pinned, constraints=constraints)
+
+    def _key(self, remaining: int, prev, last) -> Tuple[int, Optional[int], Optional[int]]:
+        # A scheduled dance sharing nobody with what is left can't change its
+        # cost, though the constraints may still care which dance came last
+        nbrs = self.graph.nbrs
+        if prev is not None and not nbrs[prev] & remaining:
+            prev = None
+        if last is not None and self.constraints is None and not nbrs[last] & remaining:
+            last = None
+        return remaining, prev, last
+
+    def _search(self, remaining: int, prev, last, spent: int, budget: float) -> Tuple[float, bool]:
+        """Cost-to-go of a state: exact, or a lower bound that is at least budget"""
+        if not remaining:
+            if spent < self.best_cost:
+                self._improve(spent, list(self.path))
+            return 0, True
+        key = self._key(remaining, prev, last)
+        budget = min(budget, self.best_cost - spent)
+        known = self.memo.get(key)
+        if known is not None:
+            value, exact, _ = known
+            self.memo_hits += 1
+            if exact and spent + value < self.best_cost:
+                self._improve(spent + value, self.path + self._path(remaining, prev, last))
+            if exact or value >= budget:
+                return value, exact
+
+        self.nodes += 1
+        lower = self.bound(remaining, prev, last)
+        if known is not None:
+            lower = max(lower, known[0])
+        if not self.nodes % 1024 and (self.deadline is not None and time.monotonic() > self.deadline
+                                      or self.should_stop is not None and self.should_stop()):
+            raise SearchTimeout(lower)
+        if lower >= budget:
+            self.prunes += 1
+            self.memo[key] = (lower, False, None)
+            return lower, False
+
+        children = sorted((self.cost(prev, last, dance), dance) for dance in self._candidates(remaining, last))
+
+        best_exact = float('inf')
+        best_dance = None
+        lowest = float('inf')
+        for index, (cost, dance) in enumerate(children):
+            threshold = min(best_exact, budget, self.best_cost - spent)
+            if cost >= threshold:
+                lowest = min(lowest, cost)
+                break
+            self.path.append(dance)
+            try:
+                value, exact = self._search(remaining & ~(1 << dance), last, dance, spent + cost, threshold - cost)
+            except SearchTimeout as timeout:
+                # Children are cheapest first, so the ones not reached yet
+                # cost at least as much as the next
+                unreached = children[index + 1][0] if index + 1 < len(children) else float('inf')
+                timeout.bound = max(lower, min(best_exact, lowest, cost + timeout.bound, unreached))
+                raise
+            self.path.pop()
+            value += cost
+            if not exact:
+                lowest = min(lowest, value)
+            elif value < best_exact:
+                best_exact = value
+                best_dance = dance
+
+        if best_exact <= lowest:
+            self.memo[key] = (best_exact, True, best_dance)
+            return best_exact, True
+        lowest = max(lowest, lower)
+        self.memo[key] = (lowest, False, None)
+        return lowest, False
+
+    def _improve(self, cost: int, order: List[int]):
+        self.best_cost = cost
+        self.best_order = order
+        self.incumbents += 1
+        if self.trace:
+            self.instruments.step("incumbent", cost=cost, nodes=self.nodes)
+        if self.on_improve is not None:
+            self.on_improve(list(order), cost)
+
+    def _path(self, remaining: int, prev, last) -> List[int]:
+        order = []
+        while remaining:
+            _, _, dance = self.memo[self._key(remaining, prev, last)]
+            order.append(dance)
+            remaining &= ~(1 << dance)
+            prev, last = last, dance
+        return order
+
+
+def solve_exact(graph: ConflictGraph, dances: Optional[Iterable[int]] = None,
+                previous: Sequence[int] = (), pinned: Optional[Dict[int, int]] = None,
+                time_limit: Optional[float] = None, initial: Optional[Sequence[int]] = None,
+                constraints=None, instruments: Optional[Instruments] = None,
+                on_improve: Optional[Callable[[List[int], int], None]] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> Tuple[int, List[int]]:
+    if dances is None:
+        dances = [dance for dance in range(len(graph)) if dance not in previous]
+    return ExactSolver(graph, instruments).solve(dances, previous, pinned, time_limit, initial, constraints,
+                                                 on_improve, should_stop)
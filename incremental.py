@@ -0,0 +1,381 @@
+"""Re-optimize a saved show after its roster changes, without starting over.
+
+    python incremental.py show.rdtr roster.xlsx
+    python incremental.py show.rdtr roster.xlsx --output new.rdtr --polish 2
+
+The roster is diffed against the compiled one by name, only the conflict
+edges of the dances that changed are patched, and the saved order is kept
+with every change repaired in place, so small edits leave the rest of the
+running order and its locks where they were. The other orders saved in the
+file are carried over to the new roster unrepaired, and so are its running
+and change times unless the edited roster gives times of its own. A file
+compiled without any order, as write_roster leaves it, starts from the
+greedy order of the compiled roster.
+"""
+import argparse
+import bisect
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from compiled_roster import CompiledRoster, write_compiled_roster
+from conflict_graph import ConflictGraph, iter_bits
+from local_search import LocalSearch
+from lower_bound import lower_bound
+from roster_io import TimedRoster, read_roster
+from scheduler import schedule_greedy
+
+
+class RosterDiff:
+    """Dances added, removed and recast between two versions of a roster, by name.
+
+    recast maps a dance to the (joined, left) dancers of its cast.
+    """
+
+    def __init__(self, added: Dict[str, List[str]], removed: List[str],
+                 recast: Dict[str, Tuple[List[str], List[str]]]):
+        self.added = added
+        self.removed = removed
+        self.recast = recast
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.recast)
+
+    def summary(self) -> str:
+        if not self:
+            return "no changes"
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.recast)} recast"
+
+
+def diff_roster(graph: ConflictGraph, roster: Dict[str, List[str]]) -> RosterDiff:
+    """How roster, as read_roster gives it, differs from graph"""
+    added = {}
+    recast = {}
+    for name, dancers in roster.items():
+        dance = graph.dance_index.get(name)
+        if dance is None:
+            added[name] = list(dancers)
+            continue
+        cast = 0
+        for dancer in dancers:
+            cast |= 1 << graph.dancer_index.get(dancer, len(graph.dancer_names))
+        if cast != graph.casts[dance]:
+            old = {graph.dancer_names[dancer] for dancer in iter_bits(graph.casts[dance])}
+            recast[name] = (sorted(set(dancers) - old), sorted(old - set(dancers)))
+    removed = [name for name in graph.dance_names if name not in roster]
+    return RosterDiff(added, removed, recast)
+
+
+class GraphPatch:
+    """Applies a RosterDiff to a copy of a ConflictGraph, touching only the edges that change.
+
+    A removed dance or dancer is replaced by the last one, so only that
+    one's ID changes. Recast and added dances get their conflict rows
+    rebuilt from their dancers' appearances, and the dances that gained or
+    lost them as neighbours have one bit flipped. moved maps every old
+    dance ID that survives to its new ID.
+    """
+
+    def __init__(self, graph: ConflictGraph):
+        self.graph = ConflictGraph(())
+        self.graph.dance_names = list(graph.dance_names)
+        self.graph.dance_index = dict(graph.dance_index)
+        self.graph.dancer_names = list(graph.dancer_names)
+        self.graph.dancer_index = dict(graph.dancer_index)
+        self.graph.casts = list(graph.casts)
+        self.graph.nbrs = list(graph.nbrs)
+        self.graph.appearances = [list(dances) for dances in graph.appearances]
+        self.old_ids = list(range(len(graph)))
+        self.touched: Set[int] = set()
+
+    def apply(self, diff: RosterDiff) -> Tuple[ConflictGraph, Dict[int, int]]:
+        for name in diff.removed:
+            self.remove_dance(self.graph.dance_index[name])
+        for name, (joined, left) in diff.recast.items():
+            dance = self.graph.dance_index[name]
+            for dancer_name in joined:
+                self._join(dance, self.graph.intern_dancer(dancer_name))
+            for dancer_name in left:
+                self._leave(dance, self.graph.dancer_index[dancer_name])
+            self.touched.add(dance)
+        for name, dancer_names in diff.added.items():
+            dance = self._add_dance(name)
+            for dancer_name in dancer_names:
+                self._join(dance, self.graph.intern_dancer(dancer_name))
+            self.touched.add(dance)
+
+        for dance in self.touched:
+            self._relink(dance)
+        for dancer in reversed(range(len(self.graph.dancer_names))):
+            if not self.graph.appearances[dancer]:
+                self.remove_dancer(dancer)
+        moved = {old: new for new, old in enumerate(self.old_ids) if old is not None}
+        return self.graph, moved
+
+    def _join(self, dance: int, dancer: int):
+        graph = self.graph
+        if not graph.casts[dance] >> dancer & 1:
+            graph.casts[dance] |= 1 << dancer
+            bisect.insort(graph.appearances[dancer], dance)
+
+    def _leave(self, dance: int, dancer: int):
+        graph = self.graph
+        graph.casts[dance] &= ~(1 << dancer)
+        graph.appearances[dancer].remove(dance)
+
+    def _add_dance(self, name: str) -> int:
+        graph = self.graph
+        dance = len(graph.dance_names)
+        graph.dance_names.append(name)
+        graph.dance_index[name] = dance
+        graph.casts.append(0)
+        graph.nbrs.append(0)
+        self.old_ids.append(None)
+        return dance
+
+    def _relink(self, dance: int):
+        """Rebuild one dance's conflict row and flip its bit in the rows that changed"""
+        graph = self.graph
+        row = 0
+        for dancer in iter_bits(graph.casts[dance]):
+            for other in graph.appearances[dancer]:
+                row |= 1 << other
+        row &= ~(1 << dance)
+        bit = 1 << dance
+        for other in iter_bits(row ^ graph.nbrs[dance]):
+            graph.nbrs[other] ^= bit
+        graph.nbrs[dance] = row
+
+    def remove_dance(self, dance: int):
+        graph = self.graph
+        bit = 1 << dance
+        for other in iter_bits(graph.nbrs[dance]):
+            graph.nbrs[other] &= ~bit
+        for dancer in iter_bits(graph.casts[dance]):
+            graph.appearances[dancer].remove(dance)
+        del graph.dance_index[graph.dance_names[dance]]
+
+        last = len(graph.dance_names) - 1
+        if dance != last:
+            last_bit = 1 << last
+            for other in iter_bits(graph.nbrs[last]):
+                graph.nbrs[other] = graph.nbrs[other] & ~last_bit | bit
+            for dancer in iter_bits(graph.casts[last]):
+                graph.appearances[dancer].pop()
+                bisect.insort(graph.appearances[dancer], dance)
+            graph.casts[dance] = graph.casts[last]
+            graph.nbrs[dance] = graph.nbrs[last]
+            graph.dance_names[dance] = graph.dance_names[last]
+            graph.dance_index[graph.dance_names[dance]] = dance
+            self.old_ids[dance] = self.old_ids[last]
+        graph.casts.pop()
+        graph.nbrs.pop()
+        graph.dance_names.pop()
+        self.old_ids.pop()
+
+    def remove_dancer(self, dancer: int):
+        graph = self.graph
+        del graph.dancer_index[graph.dancer_names[dancer]]
+        last = len(graph.dancer_names) - 1
+        if dancer != last:
+            bit, last_bit = 1 << dancer, 1 << last
+            for dance in graph.appearances[last]:
+                graph.casts[dance] = graph.casts[dance] & ~last_bit | bit
+            graph.appearances[dancer] = graph.appearances[last]
+            graph.dancer_names[dancer] = graph.dancer_names[last]
+            graph.dancer_index[graph.dancer_names[dancer]] = dancer
+        graph.appearances.pop()
+        graph.dancer_names.pop()
+
+
+def patch_graph(graph: ConflictGraph, diff: RosterDiff) -> Tuple[ConflictGraph, Dict[int, int]]:
+    """A copy of graph with diff applied, and {old dance ID: new dance ID} for the dances kept"""
+    return GraphPatch(graph).apply(diff)
+
+
+def carry_order(graph: ConflictGraph, order: Sequence[int], locked: Dict[int, int],
+                moved: Dict[int, int]) -> Tuple[List[int], Dict[int, int]]:
+    """The previous order and locks in the IDs of the patched graph.
+
+    Locked dances that are still in the show keep their slots while those
+    exist; the other dances keep their running order around them, and
+    added dances go at the end of it for repair to place.
+    """
+    locked = {slot: moved[dance] for slot, dance in locked.items() if dance in moved and slot < len(graph)}
+    locked_dances = set(locked.values())
+    kept = [moved[dance] for dance in order if dance in moved]
+    added = sorted(set(range(len(graph))) - set(kept))
+    rest = iter([dance for dance in kept + added if dance not in locked_dances])
+    new_order = [locked[slot] if slot in locked else next(rest) for slot in range(len(graph))]
+    return new_order, locked
+
+
+def repair_targets(search: LocalSearch, dance: int, limit: int) -> List[int]:
+    """The nearest limit unlocked slots to move dance to, preferring ones where it conflicts with no neighbour"""
+    order, nbrs = search.order, search.graph.nbrs[dance]
+    position = search.position[dance]
+    nearest = []
+    clean = []
+    for distance in range(1, len(order)):
+        for target in (position - distance, position + distance):
+            if not 0 <= target < len(order) or target in search.locked:
+                continue
+            if len(nearest) < limit:
+                nearest.append(target)
+            if not any(nbrs >> other & 1 for other in order[max(0, target - 2):target + 2]):
+                clean.append(target)
+                if len(clean) == limit:
+                    return clean
+    return clean or nearest
+
+
+def repair(search: LocalSearch, focus: Iterable[int], limit: int = 64, rounds: int = 4) -> Tuple[int, List[int]]:
+    """Move only the focus dances of a LocalSearch, each to its best nearby place, while that lowers the cost.
+
+    Every focus dance tries a swap and an insert at each of its
+    repair_targets, costed in O(1) by LocalSearch, so a few changed dances
+    are repaired in milliseconds, and only strict improvements are kept so
+    nothing else moves for nothing.
+    """
+    focus = [dance for dance in focus if search.position[dance] not in search.locked]
+    for _ in range(rounds):
+        improved = False
+        for dance in focus:
+            position = search.position[dance]
+            best = (0, None)
+            for target in repair_targets(search, dance, limit):
+                moves = [("swap", (min(position, target), max(position, target)))]
+                if position < target:
+                    moves.append(("rotate", (position, target + 1, 1)))
+                else:
+                    moves.append(("rotate", (target, position + 1, position - target)))
+                for kind, args in moves:
+                    if kind == "rotate" and search._has_lock(args[0], args[1]):
+                        continue
+                    if not search.allowed(kind, args):
+                        continue
+                    delta = search.swap_delta(*args) if kind == "swap" else search.rotate_delta(*args)
+                    if delta < best[0]:
+                        best = (delta, (kind, args))
+            if best[1] is not None:
+                kind, args = best[1]
+                if kind == "swap":
+                    search.swap(*args)
+                else:
+                    search.rotate(*args)
+                search.cost += best[0]
+                improved = True
+        if not improved:
+            break
+    return search.cost, list(search.order)
+
+
+def focus_dances(graph: ConflictGraph, order: Sequence[int], moved: Dict[int, int], touched: Iterable[int],
+                 previous_order: Sequence[int]) -> Set[int]:
+    """Dances worth moving after an edit: those recast or added, and the ones next to any change"""
+    focus = set(touched)
+    position = {dance: slot for slot, dance in enumerate(order)}
+    for dance in list(focus):
+        focus.update(order[max(0, position[dance] - 2):position[dance] + 3])
+    # Dances that were next to a removed dance now have new neighbours
+    for slot, dance in enumerate(previous_order):
+        if dance not in moved:
+            for other in previous_order[max(0, slot - 2):slot + 3]:
+                if other in moved:
+                    focus.add(moved[other])
+    return focus
+
+
+class Reoptimized:
+    """The result of reoptimize: the patched graph, the repaired order and its locks.
+
+    moved maps the old dance IDs kept in the show to their new ones.
+    """
+
+    def __init__(self, graph: ConflictGraph, diff: RosterDiff, moved: Dict[int, int], cost: int,
+                 order: List[int], locked: Dict[int, int], start_cost: int, seconds: float):
+        self.graph = graph
+        self.diff = diff
+        self.moved = moved
+        self.cost = cost
+        self.order = order
+        self.locked = locked
+        self.start_cost = start_cost
+        self.seconds = seconds
+
+    def moved_dances(self, previous: ConflictGraph, previous_order: Sequence[int]) -> int:
+        """Fewest dances kept in the show that had to move to turn the old running order into the new one"""
+        slots = {self.graph.dance_names[dance]: slot for slot, dance in enumerate(self.order)}
+        kept = [slots[name] for name in (previous.dance_names[dance] for dance in previous_order) if name in slots]
+        # Everything off a longest increasing run of new slots moved
+        tails: List[int] = []
+        for slot in kept:
+            index = bisect.bisect_left(tails, slot)
+            tails[index:index + 1] = [slot]
+        return len(kept) - len(tails)
+
+    def saved_orders(self, orders: Dict[str, Tuple[Sequence[int], Dict[int, int]]],
+                     name: str) -> Dict[str, Tuple[List[int], Dict[int, int]]]:
+        """Every saved order of the previous graph in the new one: name's is the repaired order, the rest carry over"""
+        return {other: (self.order, self.locked) if other == name
+                else carry_order(self.graph, order, locked, self.moved)
+                for other, (order, locked) in orders.items()}
+
+
+def reoptimize(graph: ConflictGraph, order: Sequence[int], locked: Dict[int, int],
+               roster: Dict[str, List[str]], constraints=None, polish: float = 0.0, seed=None) -> Reoptimized:
+    """Carry a show order over to an edited roster and repair it around the changes.
+
+    With polish, a LocalSearch then runs for that many seconds from the
+    repaired order, which can move any unlocked dance.
+    """
+    started = time.perf_counter()
+    diff = diff_roster(graph, roster)
+    patch = GraphPatch(graph)
+    new_graph, moved = patch.apply(diff)
+    new_order, new_locked = carry_order(new_graph, order, locked, moved)
+    search = LocalSearch(new_graph, new_order, new_locked, constraints=constraints)
+    start_cost = search.cost
+    cost, new_order = repair(search, focus_dances(new_graph, new_order, moved, patch.touched, order))
+    if polish > 0:
+        cost, new_order = LocalSearch(new_graph, new_order, new_locked, seed, constraints=constraints).run(
+            polish, target=lower_bound(new_graph).cost)
+    return Reoptimized(new_graph, diff, moved, cost, new_order, new_locked, start_cost,
+                       time.perf_counter() - started)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Carry a compiled show order over to an edited roster")
+    parser.add_argument("compiled", help="the previous .rdtr file")
+    parser.add_argument("roster", help="the edited roster (.txt, .csv or .xlsx)")
+    parser.add_argument("--order", default="current", help="saved order to start from")
+    parser.add_argument("--output", help="compiled file to write; defaults to overwriting the previous one")
+    parser.add_argument("--polish", type=float, default=0.0, help="seconds of annealing after the repair")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    with CompiledRoster(args.compiled) as compiled:
+        graph = compiled.to_graph()
+        orders = {name: compiled.saved_order(name) for name in compiled.order_names()}
+        times = TimedRoster(durations=compiled.durations(), change_times=compiled.change_times())
+    if args.order not in orders:
+        if orders:
+            parser.error(f"no saved order called {args.order!r} in {args.compiled} "
+                         f"(it has {', '.join(sorted(orders))})")
+        orders[args.order] = (schedule_greedy(graph), {})
+    order, locked = orders[args.order]
+    edited = read_roster(args.roster)
+    result = reoptimize(graph, order, locked, edited, polish=args.polish, seed=args.seed)
+    # The edited roster's times replace the compiled ones, unless it gives none
+    if edited.timed:
+        times = edited
+    write_compiled_roster(args.output or args.compiled, result.graph, result.saved_orders(orders, args.order),
+                          times.durations, times.change_times)
+
+    print(f"{result.diff.summary()}; {result.moved_dances(graph, order)} dances moved; "
+          f"cost {result.start_cost} -> {result.cost} in {result.seconds * 1000:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
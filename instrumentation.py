@@ -0,0 +1,76 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional
+
+Hook = Callable[[str, Dict], None]
+
+
+class Instruments:
+    """Counters, per-phase timers and optional per-step traces from the scheduling engines.
+
+    Engines count in plain attributes and locals and add their totals here
+    when they finish, so counting costs nothing extra in their inner loops.
+    Per-step events are only built while tracing is on: trace=True keeps
+    them in steps, and every hook is called with (event, data) as they
+    happen.
+    """
+
+    def __init__(self, trace: bool = False):
+        self.trace = trace
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, float] = {}
+        self.steps: List[Dict] = []
+        self.hooks: List[Hook] = []
+
+    @property
+    def tracing(self) -> bool:
+        return self.trace or bool(self.hooks)
+
+    def add_hook(self, hook: Hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Hook):
+        self.hooks.remove(hook)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def phase(self, name: str):
+        """Add the time spent inside the block to the timer called name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - started
+
+    def step(self, event: str, **data):
+        if self.trace:
+            self.steps.append(dict(data, event=event))
+        for hook in self.hooks:
+            hook(event, data)
+
+    def to_dict(self) -> Dict:
+        report = {"counters": dict(self.counters), "timers": dict(self.timers)}
+        if self.trace:
+            report["steps"] = list(self.steps)
+        return report
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+def phase(instruments: Optional[Instruments], name: str):
+    """instruments.phase(name), or a no-op block when there are no instruments"""
+    return instruments.phase(name) if instruments is not None else nullcontext()
+
+
+def tracing(instruments: Optional[Instruments]) -> bool:
+    return instruments is not None and instruments.tracing
+
+
+def print_steps(event: str, data: Dict):
+    """A hook that prints every traced step, for watching an engine work"""
+    print(event, " ".join(f"{key}={value}" for key, value in data.items()))
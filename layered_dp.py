@@ -0,0 +1,224 @@
+import copy
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from conflict_graph import ConflictGraph, iter_bits
+from show_cost import INSTANT_WEIGHT, cost_cache
+
+# Bound on the states kept per layer, about 14 bytes each
+STATE_LIMIT = 1 << 23
+# First halves joined to their second halves at a time
+JOIN_ROWS = 1 << 16
+
+
+class LayerLimit(Exception):
+    """The layers outgrew STATE_LIMIT, or the time ran out while building them"""
+
+
+class Split(NamedTuple):
+    """The cheapest order found by cheapest_split, cut in the middle.
+
+    head holds the first dances (after previous) and ends with head_end;
+    tail holds the rest and starts with tail_start. head_cost and tail_cost
+    are what each costs on its own, the tail as if it opened the show.
+    """
+    cost: int
+    head: List[int]
+    head_end: List[int]
+    head_cost: int
+    tail: List[int]
+    tail_start: List[int]
+    tail_cost: int
+
+
+class _Rules:
+    """Pins and compiled constraints over the local dance indices of cheapest_split.
+
+    slots[d, s] says whether dance d may go in the s-th slot after
+    previous; before[d] and after[d] are the local masks of the dances that
+    must come before and after d, and apart[c, d] whether d must not follow
+    the dance or context code c.
+    """
+
+    def __init__(self, dances: List[int], codes: int, first_slot: int, pinned: Optional[Dict[int, int]],
+                 constraints):
+        count = len(dances)
+        local = {dance: index for index, dance in enumerate(dances)}
+        self.slots = np.ones((count, count), dtype=bool)
+        for slot, dance in (pinned or {}).items():
+            self.slots[:, slot - first_slot] = False
+            self.slots[local[dance], :] = False
+            self.slots[local[dance], slot - first_slot] = True
+        self.before = [0] * count
+        self.after = [0] * count
+        self.apart = np.zeros((codes, count), dtype=bool)
+        if constraints is None:
+            return
+
+        def local_mask(dance_mask: int) -> int:
+            return sum(1 << local[other] for other in iter_bits(dance_mask) if other in local)
+
+        for dance, index in local.items():
+            for slot in range(count):
+                if not constraints.domains[dance] >> (first_slot + slot) & 1:
+                    self.slots[index, slot] = False
+            self.before[index] = local_mask(constraints.predecessors[dance])
+            self.after[index] = local_mask(constraints.successors[dance])
+            for other in iter_bits(constraints.apart[dance]):
+                if other in local:
+                    self.apart[local[other], index] = True
+
+
+class _Layers:
+    """Every (dances, prev, last) state of a show prefix whose cost is at most cap.
+
+    Built one slot at a time with numpy, keeping the cheapest cost of each
+    state. Dances are the columns of the window table (local indices), and
+    prev and last may also be one of the context codes after them. With
+    rules, a dance only goes in a slot the rules allow, after the dances it
+    requires, and not right after a dance it must be apart from; backwards
+    layers fill the show from its last slot.
+    """
+
+    def __init__(self, windows: np.ndarray, prev: int, last: int, cap: int,
+                 deadline: Optional[float], should_stop: Optional[Callable[[], bool]],
+                 rules: Optional['_Rules'] = None, backwards: bool = False):
+        self.windows = windows
+        self.cap = cap
+        self.deadline = deadline
+        self.should_stop = should_stop
+        self.rules = rules
+        self.backwards = backwards
+        self.depth = 0
+        self.mask = np.zeros(1, dtype=np.int64)
+        self.prev = np.full(1, prev, dtype=np.int8)
+        self.last = np.full(1, last, dtype=np.int8)
+        self.cost = np.zeros(1, dtype=np.int32)
+
+    def extend(self):
+        count = self.windows.shape[2]
+        slot = count - 1 - self.depth if self.backwards else self.depth
+        self.depth += 1
+        masks, prevs, lasts, costs = [self.mask[:0]], [self.prev[:0]], [self.last[:0]], [self.cost[:0]]
+        size = 0
+        for dance in range(count):
+            if (self.deadline is not None and time.monotonic() > self.deadline
+                    or self.should_stop is not None and self.should_stop()):
+                raise LayerLimit()
+            free = (self.mask >> dance & 1) == 0
+            if self.rules is not None:
+                if not self.rules.slots[dance, slot]:
+                    continue
+                required = self.rules.after[dance] if self.backwards else self.rules.before[dance]
+                if required:
+                    free &= (self.mask & required) == required
+                free &= ~self.rules.apart[self.last, dance]
+            cost = self.cost[free] + self.windows[self.prev[free], self.last[free], dance]
+            keep = cost <= self.cap
+            mask = self.mask[free][keep] | (1 << dance)
+            prev = self.last[free][keep]
+            cost = cost[keep]
+            # States ending in different dances never coincide, so each
+            # dance's new states are deduplicated on their own
+            order = np.lexsort((cost, prev, mask))
+            mask, prev, cost = mask[order], prev[order], cost[order]
+            first = np.ones(len(mask), dtype=bool)
+            first[1:] = (mask[1:] != mask[:-1]) | (prev[1:] != prev[:-1])
+            size += int(first.sum())
+            if size > STATE_LIMIT:
+                raise LayerLimit()
+            masks.append(mask[first])
+            prevs.append(prev[first])
+            lasts.append(np.full(len(masks[-1]), dance, dtype=np.int8))
+            costs.append(cost[first])
+        self.mask = np.concatenate(masks)
+        self.prev = np.concatenate(prevs)
+        self.last = np.concatenate(lasts)
+        self.cost = np.concatenate(costs)
+
+    def state(self, index: int):
+        return int(self.mask[index]), int(self.prev[index]), int(self.last[index]), int(self.cost[index])
+
+
+def cheapest_split(graph: ConflictGraph, dances: Sequence[int], previous: Sequence[int] = (), cap: int = 0,
+                   deadline: Optional[float] = None,
+                   should_stop: Optional[Callable[[], bool]] = None,
+                   pinned: Optional[Dict[int, int]] = None, constraints=None) -> Optional[Split]:
+    """The cheapest order of dances after previous if it costs at most cap, else None.
+
+    Meet in the middle: every cheap enough first half is built forwards, and
+    every cheap enough second half too, backwards, which costs the same since
+    show costs don't depend on direction. Each pair of halves covering all the
+    dances is then scored across the cut. Raises LayerLimit if a layer grows
+    past STATE_LIMIT or the deadline passes first.
+
+    pinned maps show slots (counting previous) to the dances that must fill
+    them, as in ExactSolver, and constraints are CompiledConstraints of
+    dances after previous; only orders keeping both are considered.
+    """
+    dances = list(dances)
+    count = len(dances)
+    if count < 4 or count > 62:
+        raise LayerLimit()
+    window = cost_cache(graph).window
+    # Local dance indices, then None and the last two previous dances
+    nothing, before_last, last = count, count + 1, count + 2
+    codes = dances + [None] + [previous[-2] if len(previous) >= 2 else None, previous[-1] if previous else None]
+    windows = np.zeros((len(codes), len(codes), count), dtype=np.int32)
+    for a, before_prev in enumerate(codes):
+        for b, prev in enumerate(codes):
+            for d, dance in enumerate(dances):
+                qcs, instants = window(before_prev, prev, dance)
+                windows[a, b, d] = qcs + INSTANT_WEIGHT * instants
+
+    rules = None
+    if pinned or constraints is not None:
+        rules = _Rules(dances, len(codes), len(previous), pinned, constraints)
+
+    half = count // 2
+    heads = _Layers(windows, before_last, last, cap, deadline, should_stop, rules)
+    # Without rules, a show and its reverse are alike, so with nothing before
+    # them the first halves double as the second
+    tails = heads if not previous and rules is None else _Layers(
+        windows, nothing, nothing, cap, deadline, should_stop, rules, backwards=True)
+    for _ in range(half):
+        heads.extend()
+    # extend() replaces the arrays, so a shallow copy keeps this layer
+    head = copy.copy(heads)
+    for _ in range(count - half - (half if tails is heads else 0)):
+        tails.extend()
+
+    # A tail state (dances, prev, last) read backwards starts with last, prev
+    by_mask = np.argsort(tails.mask, kind='stable')
+    sorted_masks = tails.mask[by_mask]
+    full = (1 << count) - 1
+    best = None
+    for start in range(0, len(head.mask), JOIN_ROWS):
+        wanted = full ^ head.mask[start:start + JOIN_ROWS]
+        low = np.searchsorted(sorted_masks, wanted, 'left')
+        matches = np.searchsorted(sorted_masks, wanted, 'right') - low
+        heads_at = np.repeat(np.arange(start, start + len(wanted)), matches)
+        if not len(heads_at):
+            continue
+        offsets = np.arange(len(heads_at)) - np.repeat(np.cumsum(matches) - matches, matches)
+        tails_at = by_mask[np.repeat(low, matches) + offsets]
+        a, b = head.prev[heads_at], head.last[heads_at]
+        x, y = tails.last[tails_at], tails.prev[tails_at]
+        # The tail's second dance now follows the head's last, not nothing
+        totals = (head.cost[heads_at] + tails.cost[tails_at] + windows[a, b, x] + windows[b, x, y]
+                  - windows[nothing, x, y])
+        if rules is not None:
+            totals[rules.apart[b, x]] = cap + 1
+        pick = int(np.argmin(totals))
+        if totals[pick] <= cap and (best is None or totals[pick] < best[0]):
+            best = int(totals[pick]), int(heads_at[pick]), int(tails_at[pick])
+    if best is None:
+        return None
+
+    cost, head_at, tail_at = best
+    head_mask, a, b, head_cost = head.state(head_at)
+    tail_mask, y, x, tail_cost = tails.state(tail_at)
+    return Split(cost, [dances[i] for i in range(count) if head_mask >> i & 1], [dances[a], dances[b]], head_cost,
+                 [dances[i] for i in range(count) if tail_mask >> i & 1], [dances[x], dances[y]], tail_cost)
@@ -0,0 +1,81 @@
+from typing import List, Optional, Sequence, Tuple
+
+from conflict_graph import ConflictGraph
+from show_cost import cost_cache
+from show_timing import ShowTiming
+
+
+class LiveScore:
+    """Per-slot quick changes and instants for an order that is edited one move at a time.
+
+    A slot's score depends only on the dance there and the two before it, so
+    after a move only the slots whose (before_prev, prev, dance) triple
+    changed are rescored. Dragging a box across the show touches two or
+    three slots at each end of the move, plus two after each locked dance
+    the others shift around.
+
+    With a ShowTiming of graph, the seconds each slot's dancers are short
+    for their changes are kept too, with their total in shortfall. They
+    depend on the timing's reach dances before each slot, so a move then
+    rescores that many slots after it.
+    """
+
+    def __init__(self, graph: ConflictGraph, order: Sequence[int], timing: Optional[ShowTiming] = None):
+        self.graph = graph
+        self.window = cost_cache(graph).window
+        self.timing = timing
+        self.reach = max(2, timing.reach) if timing is not None else 2
+        self.order = list(order)
+        self.slots: List[Tuple[int, int]] = [self._score(self.order, slot) for slot in range(len(self.order))]
+        self.qcs = sum(qcs for qcs, _ in self.slots)
+        self.instants = sum(instants for _, instants in self.slots)
+        self.shortfalls: List[int] = [self._shortfall(self.order, slot) for slot in range(len(self.order))]
+        self.shortfall = sum(self.shortfalls) if timing is not None else None
+
+    def _score(self, order: Sequence[int], slot: int) -> Tuple[int, int]:
+        before_prev = order[slot - 2] if slot >= 2 else None
+        prev = order[slot - 1] if slot >= 1 else None
+        return self.window(before_prev, prev, order[slot])
+
+    def _shortfall(self, order: Sequence[int], slot: int) -> int:
+        return self.timing.slot_shortfall(order, slot) if self.timing is not None else 0
+
+    def changed_slots(self, order: Sequence[int]) -> List[int]:
+        """Slots whose score can differ between the current order and order"""
+        if len(order) != len(self.order):
+            raise ValueError("New order has a different number of dances")
+        moved = [slot for slot, dance in enumerate(order) if dance != self.order[slot]]
+        if not moved:
+            return []
+        changed = set()
+        for slot in range(moved[0], min(moved[-1] + self.reach + 1, len(order))):
+            start = max(0, slot - self.reach)
+            if order[start:slot + 1] != self.order[start:slot + 1]:
+                changed.add(slot)
+        return sorted(changed)
+
+    def _rescore(self, order: Sequence[int]) -> List[Tuple[int, Tuple[int, int], int]]:
+        return [(slot, self._score(order, slot), self._shortfall(order, slot)) for slot in self.changed_slots(order)]
+
+    def preview(self, order: Sequence[int]) -> Tuple[int, int, Optional[int], List[Tuple[int, Tuple[int, int]]]]:
+        """(qcs, instants, shortfall) totals for order and its new (slot, (qcs, instants)) scores, unapplied"""
+        return self._totals(self._rescore(order))
+
+    def _totals(self, rescored: List[Tuple[int, Tuple[int, int], int]]):
+        qcs, instants, shortfall = self.qcs, self.instants, self.shortfall
+        for slot, score, short in rescored:
+            qcs += score[0] - self.slots[slot][0]
+            instants += score[1] - self.slots[slot][1]
+            if shortfall is not None:
+                shortfall += short - self.shortfalls[slot]
+        return qcs, instants, shortfall, [(slot, score) for slot, score, _ in rescored]
+
+    def update(self, order: Sequence[int]) -> List[int]:
+        """Switch to order and return the slots whose score was recomputed"""
+        rescored = self._rescore(order)
+        self.qcs, self.instants, self.shortfall, _ = self._totals(rescored)
+        for slot, score, short in rescored:
+            self.slots[slot] = score
+            self.shortfalls[slot] = short
+        self.order = list(order)
+        return [slot for slot, _, _ in rescored]
@@ -0,0 +1,279 @@
+import math
+import random
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from conflict_graph import ConflictGraph, iter_bits
+from constraints import compile_constraints
+from instrumentation import Instruments, phase, tracing
+from lower_bound import lower_bound
+from roster_model import graph_of
+from show_cost import INSTANT_WEIGHT, cost_cache
+from show_timing import ShowTiming
+
+
+class LocalSearch:
+    """Simulated annealing over a full show order with swap, insert and block moves.
+
+    A slot's cost depends only on the dance there and the two before it, so a
+    move is costed from the few slots next to the places where it cuts the
+    order. Insert and block moves are both rotations of a stretch of the
+    order, which cut it in at most three places. Positions in locked, and
+    dances pinned by the show constraints, never move; other moves that would
+    break the constraints are rejected before they are costed.
+
+    With a ShowTiming the cost is the seconds dancers are short for their
+    changes instead, and a slot depends on the timing's reach dances before
+    it rather than two.
+    """
+
+    def __init__(self, graph: ConflictGraph, order: Sequence[int],
+                 locked: Optional[Dict[int, int]] = None, seed=None, max_block: int = 4,
+                 constraints=None, instruments: Optional[Instruments] = None,
+                 timing: Optional[ShowTiming] = None):
+        self.graph = graph
+        self.timing = timing
+        self.reach = timing.reach if timing is not None else 2
+        self.instruments = instruments
+        self.order = list(order)
+        self.locked = dict(locked or {})
+        self.random = random.Random(seed)
+        self.max_block = max_block
+        self.window = cost_cache(graph).window
+        self.constraints = compile_constraints(constraints, graph, self.order)
+        if self.constraints is not None:
+            problems = self.constraints.violations(self.order)
+            if problems:
+                raise ValueError(f"Starting order breaks the show constraints: {problems[0]}")
+            self.locked.update(self.constraints.pinned())
+
+        for position, dance in self.locked.items():
+            if self.order[position] != dance:
+                raise ValueError(f"{graph.dance_names[dance]} is locked at position {position + 1}")
+        self.free = [position for position in range(len(self.order)) if position not in self.locked]
+        # locked_before[p] is the number of locked positions before p
+        self.locked_before = [0]
+        for position in range(len(self.order)):
+            self.locked_before.append(self.locked_before[-1] + (position in self.locked))
+        self.position = {dance: position for position, dance in enumerate(self.order)}
+
+        self.cost = sum(self.slot(self.order.__getitem__, position) for position in range(len(self.order)))
+        self.best_cost = self.cost
+        self.best_order = list(self.order)
+
+    def triple_cost(self, before_prev, prev, dance) -> int:
+        qcs, instants = self.window(before_prev, prev, dance)
+        return qcs + INSTANT_WEIGHT * instants
+
+    def slot(self, at, position: int) -> int:
+        if self.timing is not None:
+            return self.timing.window_cost(tuple(at(p) for p in range(max(0, position - self.reach), position + 1)))
+        before_prev = at(position - 2) if position >= 2 else None
+        prev = at(position - 1) if position >= 1 else None
+        return self.triple_cost(before_prev, prev, at(position))
+
+    def _slots_cost(self, at, positions: Iterable[int]) -> int:
+        size = len(self.order)
+        return sum(self.slot(at, position) for position in set(positions) if position < size)
+
+    def _swapped(self, i: int, j: int):
+        order = self.order
+
+        def at(position):
+            if position == i:
+                return order[j]
+            if position == j:
+                return order[i]
+            return order[position]
+        return at
+
+    def _rotated(self, start: int, end: int, shift: int):
+        order = self.order
+        length = end - start
+
+        def at(position):
+            if start <= position < end:
+                return order[start + (position - start + shift) % length]
+            return order[position]
+        return at
+
+    @staticmethod
+    def _runs(positions: Iterable[int], length: int) -> List[int]:
+        """The length slots starting at each of positions"""
+        return [position + offset for position in positions for offset in range(length)]
+
+    def swap_delta(self, i: int, j: int) -> int:
+        touched = self._runs((i, j), self.reach + 1)
+        return self._slots_cost(self._swapped(i, j), touched) - self._slots_cost(self.order.__getitem__, touched)
+
+    def rotate_delta(self, start: int, end: int, shift: int) -> int:
+        """Cost change of order[start:end] becoming order[start + shift:end] + order[start:start + shift]"""
+        new_touched = self._runs((start, end - shift, end), self.reach)
+        old_touched = self._runs((start, start + shift, end), self.reach)
+        return (self._slots_cost(self._rotated(start, end, shift), new_touched)
+                - self._slots_cost(self.order.__getitem__, old_touched))
+
+    def allowed(self, kind: str, args: Tuple[int, ...]) -> bool:
+        """Whether a move keeps the order within the show constraints"""
+        if self.constraints is None:
+            return True
+        if kind == "swap":
+            i, j = args
+            at = self._swapped(i, j)
+            moved = (i, j)
+            joins = (i, i + 1, j, j + 1)
+        else:
+            start, end, shift = args
+            at = self._rotated(start, end, shift)
+            moved = range(start, end)
+            joins = (start, end - shift, end)
+
+        constraints = self.constraints
+        moved_to = {at(position): position for position in moved}
+        for dance, position in moved_to.items():
+            if not constraints.domains[dance] >> position & 1:
+                return False
+            for other in iter_bits(constraints.predecessors[dance]):
+                if moved_to.get(other, self.position[other]) > position:
+                    return False
+            for other in iter_bits(constraints.successors[dance]):
+                if moved_to.get(other, self.position[other]) < position:
+                    return False
+        for position in joins:
+            if 0 < position < len(self.order) and constraints.apart[at(position)] >> at(position - 1) & 1:
+                return False
+        return True
+
+    def swap(self, i: int, j: int):
+        self.order[i], self.order[j] = self.order[j], self.order[i]
+        self.position[self.order[i]] = i
+        self.position[self.order[j]] = j
+
+    def rotate(self, start: int, end: int, shift: int):
+        self.order[start:end] = self.order[start + shift:end] + self.order[start:start + shift]
+        for position in range(start, end):
+            self.position[self.order[position]] = position
+
+    def _has_lock(self, start: int, end: int) -> bool:
+        return self.locked_before[end] != self.locked_before[start]
+
+    def propose(self):
+        """A random move as (kind, args), or None if it would move a locked position"""
+        size = len(self.order)
+        kind = self.random.random()
+        if kind < 0.4:
+            i, j = sorted(self.random.sample(self.free, 2))
+            return "swap", (i, j)
+        length = 1 if kind < 0.7 else self.random.randint(1, self.max_block)
+        source = self.random.randrange(size - length + 1)
+        target = self.random.randrange(size - length + 1)
+        if source == target:
+            return None
+        if source < target:
+            start, end, shift = source, target + length, length
+        else:
+            start, end, shift = target, source + length, source - target
+        if self._has_lock(start, end):
+            return None
+        return "rotate", (start, end, shift)
+
+    def run(self, time_limit: float = 1.0, iterations: Optional[int] = None,
+            start_temperature: float = 2.0, end_temperature: float = 0.05,
+            progress: Optional[Callable[[float, int], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None,
+            check_every: int = 256, target: Optional[int] = None,
+            on_improve: Optional[Callable[[List[int], int], None]] = None) -> Tuple[int, List[int]]:
+        """Anneal until time_limit seconds or iterations moves, and return the best order seen.
+
+        Every check_every moves, progress is called with the fraction of the
+        run done and the best cost so far, and the run ends early once
+        should_stop returns True. It also ends as soon as the best cost
+        reaches target, such as a LowerBound's cost, since nothing can beat it.
+        on_improve is called with every new best order and its cost, starting
+        with the order the search starts from.
+        """
+        if on_improve is not None:
+            on_improve(list(self.best_order), self.best_cost)
+        if len(self.free) < 2 or target is not None and self.best_cost <= target:
+            return self.best_cost, list(self.best_order)
+        with phase(self.instruments, "anneal"):
+            return self._run(time_limit, iterations, start_temperature, end_temperature,
+                             progress, should_stop, check_every, target, on_improve)
+
+    def _run(self, time_limit, iterations, start_temperature, end_temperature,
+             progress, should_stop, check_every, target, on_improve) -> Tuple[int, List[int]]:
+        trace = tracing(self.instruments)
+        proposed = blocked = accepted = improved = 0
+        started = time.monotonic()
+        step = 0
+        temperature = start_temperature
+        while True:
+            if iterations is not None:
+                if step >= iterations:
+                    break
+                done = step / iterations
+            else:
+                done = (time.monotonic() - started) / time_limit
+                if done >= 1:
+                    break
+            if step and step % check_every == 0:
+                if progress is not None:
+                    progress(done, self.best_cost)
+                if should_stop is not None and should_stop():
+                    break
+            temperature = start_temperature * (end_temperature / start_temperature) ** done
+            step += 1
+
+            move = self.propose()
+            if move is None:
+                continue
+            proposed += 1
+            kind, args = move
+            if not self.allowed(kind, args):
+                blocked += 1
+                continue
+            delta = self.swap_delta(*args) if kind == "swap" else self.rotate_delta(*args)
+            if delta > 0 and self.random.random() >= math.exp(-delta / temperature):
+                continue
+            if kind == "swap":
+                self.swap(*args)
+            else:
+                self.rotate(*args)
+            self.cost += delta
+            accepted += 1
+            if self.cost < self.best_cost:
+                self.best_cost = self.cost
+                self.best_order = list(self.order)
+                improved += 1
+                if trace:
+                    self.instruments.step("new_best", step=step, cost=self.cost, temperature=temperature)
+                if on_improve is not None:
+                    on_improve(list(self.best_order), self.best_cost)
+                if target is not None and self.cost <= target:
+                    break
+        if self.instruments is not None:
+            self.instruments.count("moves_proposed", proposed)
+            self.instruments.count("moves_blocked", blocked)
+            self.instruments.count("moves_accepted", accepted)
+            self.instruments.count("moves_improved", improved)
+        return self.best_cost, list(self.best_order)
+
+
+def anneal(graph: ConflictGraph, order: Sequence[int], locked: Optional[Dict[int, int]] = None,
+           time_limit: float = 1.0, seed=None, constraints=None) -> Tuple[int, List[int]]:
+    return LocalSearch(graph, order, locked, seed, constraints=constraints).run(
+        time_limit, target=lower_bound(graph).cost)
+
+
+def optimize_dances(dances: Iterable, time_limit: float = 1.0, seed=None, constraints=None) -> List:
+    """Improve the order given by each Dance.position, keeping locked dances where they are.
+
+    Positions are rewritten to the new order, which is returned as a list.
+    """
+    graph = graph_of(dances)
+    order = sorted(range(len(graph)), key=lambda dance: graph.dances[dance].position)
+    locked = {graph.dances[dance].position: dance for dance in order if graph.dances[dance].locked}
+    _, order = anneal(graph, order, locked, time_limit, seed, constraints)
+    for position, dance in enumerate(order):
+        graph.dances[dance].position = position
+    return [graph.dances[dance] for dance in order]
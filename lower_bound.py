@@ -0,0 +1,127 @@
+from typing import Dict, Iterable, List, Optional
+
+from conflict_graph import ConflictGraph, iter_bits
+from show_cost import INSTANT_WEIGHT
+
+
+def forced_instants(gaps: int, span: int) -> int:
+    """Fewest instants among gaps between mutually conflicting dances that fit in span slots.
+
+    A gap that is not an instant is at least two slots long, so once the
+    gaps need more than two slots each on average some must be one slot.
+    """
+    return max(0, 2 * gaps - span)
+
+
+def spacing_penalty(gaps: int, span: int) -> int:
+    """Least cost of gaps between mutually conflicting dances that fit in span slots.
+
+    Penalty-free gaps are at least three slots long. A gap of two costs at
+    least one quick change and a gap of one at least one instant, so every
+    missing slot costs at least one and missing more than one per gap forces
+    instants.
+    """
+    short = 3 * gaps - span
+    if short <= 0:
+        return 0
+    return short + (INSTANT_WEIGHT - 2) * forced_instants(gaps, span)
+
+
+def clique_cover(nbrs: List[int], pool: int) -> List[int]:
+    """Split the dances in pool into cliques of the conflict graph, largest found first"""
+    cliques = []
+    while pool:
+        start = max(iter_bits(pool), key=lambda dance: (nbrs[dance] & pool).bit_count())
+        clique = 1 << start
+        candidates = nbrs[start] & pool
+        while candidates:
+            dance = max(iter_bits(candidates), key=lambda dance: (nbrs[dance] & candidates).bit_count())
+            clique |= 1 << dance
+            candidates &= nbrs[dance]
+        pool &= ~clique
+        cliques.append(clique)
+    return cliques
+
+
+class Bound:
+    """A weighted cost and a number of instants that no order of a show can beat, and how to report them"""
+
+    def __init__(self, cost: int, instants: int):
+        self.cost = cost
+        self.instants = instants
+
+    @property
+    def trivial(self) -> bool:
+        """No relaxation forces any cost, as on rosters with room to space every dancer out"""
+        return self.cost == 0
+
+    def gap(self, cost: int) -> int:
+        return max(0, cost - self.cost)
+
+    def relative_gap(self, cost: int) -> float:
+        """The gap as a fraction of cost: 0 means cost is proven optimal"""
+        return self.gap(cost) / cost if cost else 0.0
+
+    def to_dict(self, cost: Optional[int] = None) -> Dict:
+        report = {"lower_bound": self.cost, "instants_lower_bound": self.instants, "trivial_bound": self.trivial}
+        if cost is not None:
+            report["gap"] = self.gap(cost)
+            report["relative_gap"] = self.relative_gap(cost)
+        return report
+
+    def describe_gap(self, cost: int) -> str:
+        """The gap for a status line, or why a trivial bound gives none worth showing"""
+        if self.trivial and cost:
+            return "unknown (trivial bound)"
+        return str(self.gap(cost))
+
+    def describe(self, cost: int) -> str:
+        if self.trivial and cost:
+            return f"cost {cost}, lower bound 0 (trivial: nothing forces a cost, so the gap is unknown)"
+        return f"cost {cost}, lower bound {self.cost} (gap {self.gap(cost)}, {self.relative_gap(cost):.1%})"
+
+
+class LowerBound(Bound):
+    """Weighted cost and instants that no order of a show can beat.
+
+    Each is the largest of three relaxations: every dancer's own numbers
+    have to be spaced out (which forces instants on anyone in more than
+    half of them), so do the numbers in each clique of a clique cover of
+    the conflict graph, and a number that conflicts with every other one
+    causes an instant whatever follows it.
+    """
+
+    def __init__(self, graph: ConflictGraph, dances: Optional[Iterable[int]] = None):
+        dances = list(range(len(graph)) if dances is None else dances)
+        pool = 0
+        for dance in dances:
+            pool |= 1 << dance
+        span = len(dances) - 1
+
+        self.dancer_cost = self.dancer_instants = 0
+        for dancer in range(len(graph.dancer_names)):
+            size = sum(1 for dance in graph.appearances[dancer] if pool >> dance & 1)
+            if size > 1:
+                self.dancer_cost += spacing_penalty(size - 1, span)
+                self.dancer_instants += forced_instants(size - 1, span)
+
+        self.clique_cost = self.clique_instants = 0
+        for clique in clique_cover(graph.nbrs, pool):
+            size = clique.bit_count()
+            self.clique_cost += spacing_penalty(size - 1, span)
+            self.clique_instants += forced_instants(size - 1, span)
+
+        # Charged at the slot after each such dance, so all but the last add up
+        successors = []
+        for dance in iter_bits(pool):
+            others = pool & ~(1 << dance)
+            if others and not others & ~graph.nbrs[dance]:
+                successors.append(min(graph.shared(dance, other) for other in iter_bits(others)))
+        self.successor_instants = sum(successors) - max(successors, default=0)
+
+        super().__init__(max(self.dancer_cost, self.clique_cost, INSTANT_WEIGHT * self.successor_instants),
+                         max(self.dancer_instants, self.clique_instants, self.successor_instants))
+
+
+def lower_bound(graph: ConflictGraph, dances: Optional[Iterable[int]] = None) -> LowerBound:
+    return LowerBound(graph, dances)
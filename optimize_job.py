@@ -0,0 +1,182 @@
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from beam_search import BeamSearch
+from compiled_roster import CompiledRoster
+from conflict_graph import ConflictGraph
+from dances import process_dances, roster_views
+from instrumentation import Instruments
+from local_search import LocalSearch
+from lower_bound import lower_bound
+from roster_io import RosterCache, TimedRoster, load_roster
+from roster_model import Roster, graph_of
+from show_timing import ShowTiming
+
+
+class OptimizeJob:
+    """Anneals a show order in a background thread and reports back through a queue.
+
+    The search only sees a ConflictGraph taken before the thread starts, so
+    the caller's Dance objects are never touched off the main thread: graph,
+    by default the Roster the dances are views of (see graph_of), must hold
+    exactly these dances. poll() drains the messages posted since the last
+    call: ("progress", fraction done, best cost) and ("improved", cost,
+    dances in the new best order) as the search goes, then one of ("done",
+    cost, dances in their new order) or ("error", message). The search stops
+    early if it reaches the lower bound in bound. Hooks on instruments are
+    called from the search thread.
+
+    With a ShowTiming (of any graph of the same roster) the costs are the
+    seconds dancers are short for their changes, and the search runs for
+    its whole time limit since the bound only covers the untimed cost.
+    """
+
+    def __init__(self, dances: Iterable, time_limit: float = 10.0, seed=None, constraints=None,
+                 instruments: Optional[Instruments] = None, timing: Optional[ShowTiming] = None,
+                 graph: Optional[ConflictGraph] = None):
+        self.graph = graph if graph is not None else graph_of(dances)
+        self.timing = timing.for_graph(self.graph) if timing is not None else None
+        order = sorted(range(len(self.graph)), key=lambda dance: self.graph.dances[dance].position)
+        locked = {position: dance for position, dance in enumerate(order) if self.graph.dances[dance].locked}
+        self.search = LocalSearch(self.graph, order, locked, seed, constraints=constraints,
+                                  instruments=instruments, timing=self.timing)
+        self.start_cost = self.search.cost
+        self.bound = lower_bound(self.graph)
+        self.time_limit = time_limit
+        self.messages: queue.Queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.finished = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Ask the search to stop; it still reports the best order found so far"""
+        self.stop_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.stop_event.is_set()
+
+    def _run(self):
+        try:
+            cost, order = self.search.run(
+                self.time_limit,
+                progress=lambda done, best: self.messages.put(("progress", done, best)),
+                should_stop=self.stop_event.is_set,
+                on_improve=lambda order, cost: self.messages.put(
+                    ("improved", cost, [self.graph.dances[dance] for dance in order])),
+                target=self.bound.cost if self.timing is None else None,
+            )
+            self.messages.put(("done", cost, [self.graph.dances[dance] for dance in order]))
+        except Exception as e:
+            self.messages.put(("error", str(e)))
+
+    def poll(self) -> List[Tuple]:
+        messages = []
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                return messages
+            if message[0] in ("done", "error"):
+                self.finished = True
+            messages.append(message)
+
+
+class BackgroundJob:
+    """Runs work() once in a background thread and hands its result back through a queue.
+
+    poll() returns ("done", result) or ("error", message) once work() ends,
+    and nothing before; the caller polls it from the Tk event loop.
+    """
+
+    def __init__(self):
+        self.messages: queue.Queue = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.finished = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def work(self):
+        raise NotImplementedError
+
+    def _run(self):
+        try:
+            self.messages.put(("done", self.work()))
+        except Exception as e:
+            self.messages.put(("error", str(e)))
+
+    def poll(self) -> List[Tuple]:
+        try:
+            message = self.messages.get_nowait()
+        except queue.Empty:
+            return []
+        self.finished = True
+        return [message]
+
+
+class AlternativesJob(BackgroundJob):
+    """Finds several good, different orders by beam search in a background thread.
+
+    Like OptimizeJob, the search only sees graph, and locked maps show
+    positions to the dances that must stay there. The result is a list of
+    (cost, dances in order), best first.
+    """
+
+    def __init__(self, graph: ConflictGraph, locked: Optional[Dict[int, int]] = None, count: int = 5):
+        super().__init__()
+        self.graph = graph
+        self.search = BeamSearch(graph, locked=locked)
+        self.count = count
+
+    def work(self) -> List[Tuple[int, List]]:
+        return [(cost, [self.graph.dances[dance] for dance in order])
+                for cost, order in self.search.alternatives(self.count)]
+
+
+class LoadedRoster(NamedTuple):
+    dances: Set
+    dancers: Dict
+    timed_roster: TimedRoster
+    saved_order: Optional[List]  # The order saved in a compiled roster, if any
+    from_cache: bool
+
+
+class LoadRosterJob(BackgroundJob):
+    """Reads a roster file and builds its dances in a background thread.
+
+    A compiled roster decodes straight into the model, conflict rows
+    included, with the order and locks saved in it; any other file is read
+    with dancer names normalized, or reused from cache. The result is a
+    LoadedRoster, whose dances nothing else has seen yet.
+    """
+
+    def __init__(self, path, cache: Optional[RosterCache] = None):
+        super().__init__()
+        self.path = path
+        self.cache = cache
+
+    def work(self) -> LoadedRoster:
+        if Path(self.path).suffix.lower() != ".rdtr":
+            hits = self.cache.hits if self.cache is not None else 0
+            timed_roster = load_roster(self.path, self.cache)
+            from_cache = self.cache is not None and self.cache.hits > hits
+            return LoadedRoster(*process_dances(timed_roster), timed_roster, None, from_cache)
+
+        saved_order = None
+        with CompiledRoster(self.path) as compiled:
+            roster = compiled.to_graph(Roster)
+            if "current" in compiled.order_names():
+                order, locked = compiled.saved_order("current")
+                saved_order = [roster.dance(dance) for dance in order]
+                for dance in locked.values():
+                    roster.dance(dance).locked = True
+            timed_roster = TimedRoster(durations=compiled.durations(), change_times=compiled.change_times())
+        return LoadedRoster(*roster_views(roster), timed_roster, saved_order, False)
@@ -0,0 +1,138 @@
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from conflict_graph import ConflictGraph
+from constraints import compile_constraints
+from local_search import LocalSearch
+from lower_bound import lower_bound
+from scheduler import schedule_greedy
+from show_cost import order_cost
+from show_timing import ShowTiming
+
+SEARCHES = ("greedy", "anneal")
+
+# Set in each worker process by _attach
+_graph: Optional[ConflictGraph] = None
+
+
+def _row_size(graph: ConflictGraph) -> int:
+    return (len(graph.dancer_names) + 7) // 8
+
+
+def share_roster(graph: ConflictGraph) -> shared_memory.SharedMemory:
+    """Copy the cast bitsets into shared memory, one packed row of dancer bits per dance"""
+    row_size = _row_size(graph)
+    memory = shared_memory.SharedMemory(create=True, size=max(1, row_size * len(graph)))
+    for dance, cast in enumerate(graph.casts):
+        memory.buf[dance * row_size:(dance + 1) * row_size] = cast.to_bytes(row_size, "little")
+    return memory
+
+
+def read_roster(buffer, dance_names: List[str], dancer_count: int) -> ConflictGraph:
+    """Decode the rows written by share_roster into a graph of this process's own"""
+    row_size = (dancer_count + 7) // 8
+    casts = [int.from_bytes(buffer[dance * row_size:(dance + 1) * row_size], "little")
+             for dance in range(len(dance_names))]
+    return ConflictGraph.from_casts(casts, dancer_count, dance_names)
+
+
+def _attach(name: str, dance_names: List[str], dancer_count: int):
+    global _graph
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        _graph = read_roster(memory.buf, dance_names, dancer_count)
+    finally:
+        memory.close()
+
+
+def run_search(graph: ConflictGraph, search: str, seed: int, locked: Dict[int, int],
+               time_limit: float, constraints=None, target: Optional[int] = None,
+               dances: Optional[List[int]] = None, timing: Optional[ShowTiming] = None) -> Tuple[int, List[int]]:
+    """One seeded search: greedy with random tie-breaks, optionally annealed until it reaches target"""
+    rng = random.Random(seed)
+    tiebreak = [rng.random() for _ in range(len(graph))]
+    compiled = compile_constraints(constraints, graph, dances)
+    try:
+        order = schedule_greedy(graph, dances, pinned=locked, tiebreak=tiebreak, constraints=compiled)
+    except ValueError:
+        # These tie-breaks led greedy into a dead end under the constraints
+        return float('inf'), []
+    if search == "anneal":
+        return LocalSearch(graph, order, locked, seed=rng.random(), constraints=compiled, timing=timing).run(
+            time_limit, target=target)
+    if timing is not None:
+        return timing.order_shortfall(order), order
+    return order_cost(graph, order), order
+
+
+def _run_search(search: str, seed: int, locked: Dict[int, int], time_limit: float,
+                constraints, target: Optional[int], dances: Optional[List[int]], timing: Optional[ShowTiming]):
+    cost, order = run_search(_graph, search, seed, locked, time_limit, constraints, target, dances, timing)
+    return cost, order, seed
+
+
+def parallel_search(graph: ConflictGraph, restarts: int = 16, search: str = "anneal",
+                    locked: Optional[Dict[int, int]] = None, time_limit: float = 1.0,
+                    workers: Optional[int] = None, seed: int = 0, constraints=None,
+                    dances: Optional[Iterable[int]] = None, timing: Optional[ShowTiming] = None,
+                    on_improve: Optional[Callable[[List[int], int], None]] = None,
+                    should_stop: Optional[Callable[[], bool]] = None) -> Tuple[int, List[int], int]:
+    """Run restarts seeded searches across a process pool and return the best (cost, order, seed).
+
+    Orders dances (all of graph by default). locked maps show positions to
+    the dances that must stay there, and constraints are the show
+    constraints every search has to keep. Each worker decodes the roster
+    once from a shared-memory copy of the cast bitsets, so no Dance or
+    Dancer objects are pickled; it is a copy, not a view, since the searches
+    need the casts as ints. With a ShowTiming of graph the searches
+    minimise the seconds dancers are short for their changes instead.
+    Once a search reaches the lower bound, or should_stop returns True, the
+    searches that have not started yet are cancelled and the best order so
+    far is returned. on_improve is called with every new best order.
+    """
+    if search not in SEARCHES:
+        raise ValueError(f"Unknown search {search!r}, expected one of {', '.join(SEARCHES)}")
+    locked = locked or {}
+    dances = list(dances) if dances is not None else None
+    # Fail here rather than once per worker
+    compile_constraints(constraints, graph, dances)
+    seeds = [seed + restart for restart in range(restarts)]
+    target = lower_bound(graph, dances).cost if timing is None else None
+    memory = share_roster(graph)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_attach,
+            initargs=(memory.name, graph.dance_names, len(graph.dancer_names)),
+        ) as pool:
+            futures = [pool.submit(_run_search, search, restart_seed, locked, time_limit, constraints, target,
+                                   dances, timing)
+                       for restart_seed in seeds]
+            results = []
+            best_cost = float('inf')
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=futures.index):
+                    results.append(future.result())
+                    cost, order, _ = results[-1]
+                    if cost < best_cost:
+                        best_cost = cost
+                        if on_improve is not None:
+                            on_improve(order, cost)
+                # Keep going until some search has finished, so there is an order to return
+                if results and (target is not None and best_cost <= target
+                                or should_stop is not None and should_stop()):
+                    for future in pending:
+                        future.cancel()
+                    break
+    finally:
+        memory.close()
+        memory.unlink()
+    best = min(results, key=lambda result: (result[0], result[2]))
+    if not best[1]:
+        raise ValueError("No search found an order that satisfies the show constraints")
+    return best
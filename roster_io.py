@@ -0,0 +1,360 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from openpyxl import Workbook, load_workbook
+
+from compiled_roster import CompiledRoster, write_compiled_roster
+from conflict_graph import ConflictGraph
+from show_timing import ShowTiming, show_timing
+
+# Bump when parsing changes so older cache entries are ignored
+CACHE_VERSION = 3
+
+ROSTER_SUFFIXES = (".txt", ".csv", ".xlsx", ".rdtr")
+
+# Dancer names in one cell or line are split on commas and semicolons, and
+# on a full stop followed by a space ("Lila Saenz. Sarah Carlebach") unless
+# it ends an initial ("Chloe P. Smith")
+_SEPARATORS = re.compile(r"[,;]|(?<=\w\w)\.\s+")
+
+# An optional time in seconds or minutes:seconds after a dance name (its
+# running time) or a dancer name (their costume-change time): "Tap [3:05]"
+_TIMING = re.compile(r"\s*\[\s*(\d+)(?::(\d{1,2}))?\s*\]\s*$")
+
+# "Dance name: dancers" with any [m:ss] running time kept in the name
+_TEXT_LINE = re.compile(r"((?:[^:\[]|\[[^\]]*\])*):(.*)", re.DOTALL)
+
+
+def clean_name(name) -> str:
+    """Trim a name and collapse the whitespace inside it"""
+    return " ".join(str(name).split())
+
+
+def name_key(name: str) -> str:
+    """What two spellings of one person's name share: no accents, case or extra spaces"""
+    decomposed = unicodedata.normalize("NFKD", clean_name(name))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def parse_timing(text: str) -> Tuple[str, Optional[int]]:
+    """Split a trailing "[m:ss]" or "[seconds]" off a name, as (name, seconds or None)"""
+    match = _TIMING.search(text)
+    if match is None:
+        return text, None
+    minutes_or_seconds, seconds = match.groups()
+    total = int(minutes_or_seconds) * 60 + int(seconds) if seconds is not None else int(minutes_or_seconds)
+    return text[:match.start()], total
+
+
+def format_timing(name: str, seconds: Optional[int]) -> str:
+    """name with a "[m:ss]" time after it, as parse_timing reads back"""
+    if seconds is None:
+        return name
+    return f"{name} [{seconds // 60}:{seconds % 60:02d}]"
+
+
+class TimedRoster(dict):
+    """{dance: [dancers]} as every reader returns it, plus any running and change times it gave.
+
+    durations maps dances to their running time and change_times maps
+    dancers to the time they need to change costume, both in seconds and
+    both empty when the roster has no times.
+    """
+
+    def __init__(self, roster=(), durations: Optional[Dict[str, int]] = None,
+                 change_times: Optional[Dict[str, int]] = None):
+        super().__init__(roster)
+        self.durations = dict(durations or {})
+        self.change_times = dict(change_times or {})
+
+    @property
+    def timed(self) -> bool:
+        return bool(self.durations or self.change_times)
+
+
+def split_names(text) -> List[str]:
+    """Dancer names in one cell or line, with stray separators and blanks dropped"""
+    names = []
+    for part in _SEPARATORS.split(str(text)):
+        name = clean_name(part).strip(" .")
+        if name:
+            names.append(name)
+    return names
+
+
+class NameTable:
+    """Merges spellings of the same dancer's name.
+
+    Every spelling with the same name_key is one dancer, shown with the
+    spelling used most often (the first one seen on a tie).
+    """
+
+    def __init__(self):
+        self.spellings: Dict[str, Counter] = {}
+
+    def add(self, name: str) -> str:
+        key = name_key(name)
+        self.spellings.setdefault(key, Counter())[clean_name(name)] += 1
+        return key
+
+    def canonical(self, key: str) -> str:
+        return self.spellings[key].most_common(1)[0][0]
+
+
+def _build_roster(entries: Iterable[Tuple[str, Iterable[str], Optional[int]]]) -> TimedRoster:
+    """A TimedRoster from (dance, raw dancer cells, running time), with names merged across the whole roster.
+
+    A dancer given several change times keeps the longest.
+    """
+    names = NameTable()
+    keyed: Dict[str, List[str]] = {}
+    durations: Dict[str, int] = {}
+    change_times: Dict[str, int] = {}
+    for dance_name, cells, duration in entries:
+        keys = keyed.setdefault(dance_name, [])
+        if duration is not None:
+            durations[dance_name] = duration
+        for cell in cells:
+            for name in split_names(cell):
+                name, change_time = parse_timing(name)
+                key = names.add(name)
+                if key not in keys:
+                    keys.append(key)
+                if change_time is not None:
+                    change_times[key] = max(change_time, change_times.get(key, 0))
+    return TimedRoster(
+        {dance_name: [names.canonical(key) for key in keys] for dance_name, keys in keyed.items() if keys},
+        {dance_name: duration for dance_name, duration in durations.items() if keyed[dance_name]},
+        {names.canonical(key): change_time for key, change_time in change_times.items()},
+    )
+
+
+def _column_entries(rows: Iterator[Sequence]) -> Iterator[Tuple[str, List[str], Optional[int]]]:
+    """(dance, cells, running time) per column of a sheet whose first row names the dances"""
+    header = next(rows, ())
+    columns: Dict[int, str] = {}
+    durations: Dict[str, Optional[int]] = {}
+    seen: Dict[str, int] = {}
+    for column, cell in enumerate(header):
+        dance_name, duration = parse_timing(clean_name(cell) if cell is not None else "")
+        if not dance_name:
+            continue
+        if dance_name in seen:
+            seen[dance_name] += 1
+            dance_name = f"{dance_name}.{seen[dance_name]}"
+        else:
+            seen[dance_name] = 0
+        columns[column] = dance_name
+        durations[dance_name] = duration
+
+    cells: Dict[str, List[str]] = {dance_name: [] for dance_name in columns.values()}
+    for row in rows:
+        for column, dance_name in columns.items():
+            if column < len(row) and row[column] is not None:
+                cells[dance_name].append(str(row[column]))
+    return ((dance_name, dance_cells, durations[dance_name]) for dance_name, dance_cells in cells.items())
+
+
+def read_excel_roster(path) -> TimedRoster:
+    """Read {dance: [dancers]} from the first sheet, one row at a time.
+
+    The first row holds dance names and each column lists that dance's
+    dancers below it. Columns without a name, and dances without dancers,
+    are skipped. A repeated dance name gets a ".1", ".2", ... suffix. Any
+    name can end in a "[m:ss]" running or change time.
+    """
+    if Path(path).suffix.lower() == ".xls":
+        raise ValueError("Old .xls workbooks are not supported, save the file as .xlsx")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        entries = list(_column_entries(workbook.active.iter_rows(values_only=True)))
+    finally:
+        workbook.close()
+    return _build_roster(entries)
+
+
+def read_csv_roster(path) -> TimedRoster:
+    """Read {dance: [dancers]} from a CSV file laid out like the Excel sheet"""
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        return _build_roster(_column_entries(csv.reader(file)))
+
+
+def read_text_roster(path) -> TimedRoster:
+    """Read {dance: [dancers]} from "Dance name: dancer, dancer, ..." lines"""
+    entries = []
+    with open(path, encoding="utf-8-sig") as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            match = _TEXT_LINE.match(line)
+            if match is None:
+                raise ValueError(f"{Path(path).name} line {line_number} has no ':' after the dance name")
+            dance_name, duration = parse_timing(clean_name(match.group(1)))
+            entries.append((dance_name, [match.group(2)], duration))
+    return _build_roster(entries)
+
+
+def read_roster(path) -> TimedRoster:
+    """Read {dance: [dancers]} from a .txt, .csv, .xlsx or compiled .rdtr roster, with dancer names normalized"""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".rdtr":
+        # Names were normalized when the roster was compiled
+        with CompiledRoster(path) as compiled:
+            return TimedRoster(compiled.roster(), compiled.durations(), compiled.change_times())
+    if suffix == ".txt":
+        return read_text_roster(path)
+    if suffix == ".csv":
+        return read_csv_roster(path)
+    if suffix in (".xlsx", ".xls"):
+        return read_excel_roster(path)
+    raise ValueError(f"Unknown roster file type {suffix!r}, expected one of {', '.join(ROSTER_SUFFIXES)}")
+
+
+def _timed_names(roster: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """roster with the running and change times of a TimedRoster written into its names"""
+    durations = getattr(roster, "durations", {})
+    change_times = getattr(roster, "change_times", {})
+    return {format_timing(dance_name, durations.get(dance_name)):
+            [format_timing(dancer, change_times.get(dancer)) for dancer in dancers]
+            for dance_name, dancers in roster.items()}
+
+
+def _roster_columns(roster: Dict[str, List[str]]) -> Iterator[List[str]]:
+    """Rows of the column layout: dance names, then each dance's n-th dancer"""
+    yield list(roster)
+    for row in range(max((len(dancers) for dancers in roster.values()), default=0)):
+        yield [dancers[row] if row < len(dancers) else "" for dancers in roster.values()]
+
+
+def write_roster(roster: Dict[str, List[str]], path):
+    """Write {dance: [dancers]} as a .txt, .csv, .xlsx or compiled .rdtr roster that read_roster reads back.
+
+    The times of a TimedRoster are written after the names they belong to.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".rdtr":
+        write_compiled_roster(path, ConflictGraph(roster.items()), durations=getattr(roster, "durations", None),
+                              change_times=getattr(roster, "change_times", None))
+        return
+    roster = _timed_names(roster)
+    if suffix == ".txt":
+        with open(path, "w", encoding="utf-8") as file:
+            for dance_name, dancers in roster.items():
+                file.write(f"{dance_name}: {', '.join(dancers)}\n")
+    elif suffix == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            csv.writer(file).writerows(_roster_columns(roster))
+    elif suffix == ".xlsx":
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in _roster_columns(roster):
+            sheet.append([cell or None for cell in row])
+        workbook.save(path)
+    else:
+        raise ValueError(f"Unknown roster file type {suffix!r}, expected one of {', '.join(ROSTER_SUFFIXES)}")
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RosterCache:
+    """Parsed rosters on disk, keyed by the SHA-256 of the source file.
+
+    Each source path also remembers the size, mtime and hash it had when it
+    was last read, so an untouched file is found without hashing it again.
+    A file that was only touched is re-hashed and still hits.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory is not None else Path.home() / ".cache" / "rdtshoworder"
+        self.index_path = self.directory / "paths.json"
+        self.hits = 0
+        self.misses = 0
+
+    def _read_json(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, path: Path, data: Dict):
+        """Write atomically; a cache that cannot be written is just a cache that always misses"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix(".tmp")
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False)
+            os.replace(temporary, path)
+        except OSError:
+            pass
+
+    def _digest(self, path: Path, stat: os.stat_result) -> Tuple[str, bool]:
+        """The file's hash, and whether it came from the index rather than re-reading the file"""
+        known = (self._read_json(self.index_path) or {}).get(str(path))
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"], True
+        return file_digest(path), False
+
+    def load(self, path, parse=read_roster) -> TimedRoster:
+        """The roster for path from the cache, or parsed with parse and stored"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        digest, indexed = self._digest(path, stat)
+        entry = self._read_json(self.directory / f"{digest}.json")
+        if entry is not None and entry.get("version") == CACHE_VERSION:
+            self.hits += 1
+            roster = TimedRoster(entry["roster"], entry["durations"], entry["change_times"])
+        else:
+            self.misses += 1
+            roster = parse(path)
+            self._write_json(self.directory / f"{digest}.json", {
+                "version": CACHE_VERSION,
+                "roster": roster,
+                "durations": getattr(roster, "durations", {}),
+                "change_times": getattr(roster, "change_times", {}),
+            })
+        if not indexed:
+            index = self._read_json(self.index_path) or {}
+            index[str(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+            self._write_json(self.index_path, index)
+        return roster
+
+
+def load_roster(path, cache: Optional[RosterCache] = None) -> TimedRoster:
+    """Read the roster in a roster file, through cache if one is given"""
+    if cache is None:
+        return read_roster(path)
+    return cache.load(path)
+
+
+def load_graph(path, cache: Optional[RosterCache] = None) -> ConflictGraph:
+    """The integer-ID roster every engine takes, from a .txt, .csv, .xlsx or compiled .rdtr file"""
+    if Path(path).suffix.lower() == ".rdtr":
+        with CompiledRoster(path) as compiled:
+            return compiled.to_graph()
+    return ConflictGraph(load_roster(path, cache).items())
+
+
+def load_timed_graph(path, cache: Optional[RosterCache] = None) -> Tuple[ConflictGraph, Optional[ShowTiming]]:
+    """load_graph and the ShowTiming of the roster's running and change times, or None if it gives none"""
+    if Path(path).suffix.lower() == ".rdtr":
+        with CompiledRoster(path) as compiled:
+            graph = compiled.to_graph()
+            return graph, show_timing(graph, TimedRoster(durations=compiled.durations(),
+                                                         change_times=compiled.change_times()))
+    roster = load_roster(path, cache)
+    graph = ConflictGraph(roster.items())
+    return graph, show_timing(graph, roster)
@@ -0,0 +1,142 @@
+from array import array
+from typing import Iterable, List, Set, Tuple
+
+from conflict_graph import ConflictGraph, iter_bits, popcount
+
+
+class Roster(ConflictGraph):
+    """A ConflictGraph that also holds the per-dance state the app edits, one array per field.
+
+    positions, locked and weights are indexed by dance ID. Dance and dancer
+    objects are small __slots__ views onto these arrays, made once per ID, so
+    every engine that takes a ConflictGraph can take a Roster directly.
+    """
+
+    def __init__(self, roster: Iterable[Tuple[str, Iterable[str]]]):
+        super().__init__(roster)
+        self._init_state()
+
+    @classmethod
+    def from_casts(cls, *args, **kwargs) -> 'Roster':
+        roster = super().from_casts(*args, **kwargs)
+        roster._init_state()
+        return roster
+
+    def _init_state(self):
+        self.positions = array("l", range(len(self.dance_names)))
+        self.locked = bytearray(len(self.dance_names))
+        self.weights = array("d", bytes(8 * len(self.dance_names)))
+        self.dance_views = [DanceView(self, dance) for dance in range(len(self.dance_names))]
+        self.dancer_views = [DancerView(self, dancer) for dancer in range(len(self.dancer_names))]
+        self.dances = self.dance_views
+
+    def dance(self, dance: int) -> 'DanceView':
+        return self.dance_views[dance]
+
+    def dancer(self, dancer: int) -> 'DancerView':
+        return self.dancer_views[dancer]
+
+
+def graph_of(dances: Iterable) -> ConflictGraph:
+    """The Roster the dances are views of when they are all of its dances, else a graph built from them.
+
+    Either way graph.dances holds the dance objects, but a Roster's dance IDs
+    don't follow the order of dances, so look them up by name.
+    """
+    dances = list(dances)
+    roster = getattr(dances[0], "roster", None) if dances else None
+    if (isinstance(roster, Roster) and len(dances) == len(roster)
+            and all(isinstance(dance, DanceView) and dance.roster is roster for dance in dances)
+            and len({dance.index for dance in dances}) == len(roster)):
+        return roster
+    return ConflictGraph.from_dances(dances)
+
+
+class DanceView:
+    """One dance of a Roster, with the attributes of Dance.
+
+    Two views are equal only when they are the same dance of the same
+    roster, and hash by dance ID, so sets of them iterate in roster order.
+    """
+
+    __slots__ = ("roster", "index")
+
+    def __init__(self, roster: Roster, index: int):
+        self.roster = roster
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self.roster.dance_names[self.index]
+
+    @property
+    def dancers(self) -> List['DancerView']:
+        return [self.roster.dancer_views[dancer] for dancer in iter_bits(self.roster.casts[self.index])]
+
+    @property
+    def nbrs(self) -> Set['DanceView']:
+        return {self.roster.dance_views[nbr] for nbr in iter_bits(self.roster.nbrs[self.index])}
+
+    @property
+    def degree(self) -> int:
+        return popcount(self.roster.nbrs[self.index])
+
+    @property
+    def position(self) -> int:
+        return self.roster.positions[self.index]
+
+    @position.setter
+    def position(self, position: int):
+        self.roster.positions[self.index] = position
+
+    @property
+    def locked(self) -> bool:
+        return bool(self.roster.locked[self.index])
+
+    @locked.setter
+    def locked(self, locked: bool):
+        self.roster.locked[self.index] = bool(locked)
+
+    @property
+    def weight(self) -> float:
+        return self.roster.weights[self.index]
+
+    @weight.setter
+    def weight(self, weight: float):
+        self.roster.weights[self.index] = weight
+
+    def __eq__(self, other):
+        return isinstance(other, DanceView) and other.roster is self.roster and other.index == self.index
+
+    def __hash__(self):
+        return self.index
+
+    def __str__(self):
+        return f"{self.name}: {set(dancer.name for dancer in self.dancers)}"
+
+
+class DancerView:
+    """One dancer of a Roster, with the attributes of Dancer that do not change while scheduling"""
+
+    __slots__ = ("roster", "index")
+
+    def __init__(self, roster: Roster, index: int):
+        self.roster = roster
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self.roster.dancer_names[self.index]
+
+    @property
+    def dances(self) -> int:
+        return len(self.roster.appearances[self.index])
+
+    def __eq__(self, other):
+        return isinstance(other, DancerView) and other.roster is self.roster and other.index == self.index
+
+    def __hash__(self):
+        return self.index
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,241 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from conflict_graph import ConflictGraph, iter_bits, popcount
+from constraints import compile_constraints
+from instrumentation import Instruments, phase, tracing
+
+
+class IndexedHeap:
+    """Binary min-heap of items that can be re-keyed or removed in O(log n)"""
+
+    def __init__(self):
+        self.items = []
+        self.keys = []
+        self.pos: Dict[int, int] = {}
+        self.ops = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.pos
+
+    def push(self, item, key):
+        self.ops += 1
+        self.items.append(item)
+        self.keys.append(key)
+        self.pos[item] = len(self.items) - 1
+        self._sift_up(len(self.items) - 1)
+
+    def update(self, item, key):
+        self.ops += 1
+        i = self.pos[item]
+        old_key = self.keys[i]
+        self.keys[i] = key
+        if key < old_key:
+            self._sift_up(i)
+        elif old_key < key:
+            self._sift_down(i)
+
+    def peek(self):
+        return self.items[0], self.keys[0]
+
+    def pop(self):
+        item, key = self.items[0], self.keys[0]
+        self.remove(item)
+        return item, key
+
+    def remove(self, item):
+        self.ops += 1
+        i = self.pos.pop(item)
+        last_item = self.items.pop()
+        last_key = self.keys.pop()
+        if i == len(self.items):
+            return
+        self.items[i] = last_item
+        self.keys[i] = last_key
+        self.pos[last_item] = i
+        self._sift_up(i)
+        self._sift_down(self.pos[last_item])
+
+    def _swap(self, i, j):
+        self.items[i], self.items[j] = self.items[j], self.items[i]
+        self.keys[i], self.keys[j] = self.keys[j], self.keys[i]
+        self.pos[self.items[i]] = i
+        self.pos[self.items[j]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self.keys[i] < self.keys[parent]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        size = len(self.items)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and self.keys[child] < self.keys[smallest]:
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+
+def quick_change_weight(scheduler: 'GreedyScheduler', dance: int) -> float:
+    """calc_weight_greedy: inf on an instant, otherwise one per quick change"""
+    weight = 0
+    step = scheduler.step
+    for dancer in iter_bits(scheduler.graph.casts[dance]):
+        last = scheduler.last_step[dancer]
+        if last == step - 1:
+            return float('inf')
+        if last == step - 2:
+            weight += 1
+    return weight
+
+
+def degree_weight(scheduler: 'GreedyScheduler', dance: int) -> float:
+    """calc_weight, negated for the min-heap: most unscheduled neighbours first"""
+    step = scheduler.step
+    for dancer in iter_bits(scheduler.graph.casts[dance]):
+        if scheduler.last_step[dancer] == step - 1:
+            return float('inf')
+    return -2 * popcount(scheduler.graph.nbrs[dance] & scheduler.remaining)
+
+
+class GreedyScheduler:
+    """Greedy show builder that keeps every unscheduled dance in an indexed heap.
+
+    A dancer's recency is the step they last performed at, so scheduling a dance
+    only touches its own cast. A weight can only change when a candidate shares
+    dancers with one of the last three dances scheduled, so only those
+    neighbours are re-weighted after each pick.
+    """
+
+    def __init__(self, graph: ConflictGraph,
+                 weight: Callable[['GreedyScheduler', int], float] = quick_change_weight,
+                 tiebreak: Optional[Sequence] = None, instruments: Optional[Instruments] = None):
+        self.graph = graph
+        self.instruments = instruments
+        self.weight_recalcs = 0
+        self.weight = weight
+        self.tiebreak = tiebreak if tiebreak is not None else range(len(graph))
+        self.last_step: List[Optional[int]] = [None] * len(graph.dancer_names)
+        self.step = 0
+        self.recent: List[int] = []
+        self.remaining = 0
+        self.heap = IndexedHeap()
+
+    def perform(self, dance: int):
+        """Record dance at the current step without choosing it from the heap"""
+        for dancer in iter_bits(self.graph.casts[dance]):
+            self.last_step[dancer] = self.step
+        self.remaining &= ~(1 << dance)
+        if dance in self.heap:
+            self.heap.remove(dance)
+        self.step += 1
+
+        touched = self.graph.nbrs[dance]
+        for recent in self.recent[-2:]:
+            touched |= self.graph.nbrs[recent]
+        self.recent.append(dance)
+        for nbr in iter_bits(touched):
+            if nbr in self.heap:
+                self.heap.update(nbr, self._key(nbr))
+
+    def run(self, dances: Iterable[int], previous: Sequence[int] = (),
+            pinned: Optional[Dict[int, int]] = None, constraints=None) -> List[int]:
+        """Order dances after the ones already performed in previous.
+
+        pinned maps a show slot (counting the previous dances) to the dance
+        that has to go there. constraints are ShowConstraints for the slots
+        after previous; each pick is the lightest dance they allow, except
+        that a dance whose last allowed slot has come is placed first.
+        """
+        with phase(self.instruments, "greedy"):
+            order = self._run(dances, previous, pinned, constraints)
+        if self.instruments is not None:
+            self.instruments.count("greedy_placements", len(order))
+            self.instruments.count("weight_recalcs", self.weight_recalcs)
+            self.instruments.count("heap_ops", self.heap.ops)
+        return order
+
+    def _run(self, dances: Iterable[int], previous: Sequence[int],
+             pinned: Optional[Dict[int, int]], constraints) -> List[int]:
+        trace = tracing(self.instruments)
+        pinned = dict(pinned or {})
+        dances = list(dances)
+        constraints = compile_constraints(constraints, self.graph, dances, len(previous))
+        deadlines: Dict[int, List[int]] = {}
+        if constraints is not None:
+            pinned.update(constraints.pinned())
+            for dance in dances:
+                deadlines.setdefault(constraints.latest(dance), []).append(dance)
+        last_slot = len(previous) + len(dances) - 1
+        for slot in pinned:
+            if not len(previous) <= slot <= last_slot:
+                raise ValueError(f"Pinned slot {slot} is outside slots {len(previous)}-{last_slot}")
+        for dance in dances:
+            self.remaining |= 1 << dance
+        for dance in previous:
+            self.perform(dance)
+
+        pinned_dances = set(pinned.values())
+        for dance in dances:
+            if dance not in pinned_dances:
+                self.heap.push(dance, self._key(dance))
+
+        order = []
+        while len(order) < len(dances):
+            dance = pinned.get(self.step)
+            if dance is None and constraints is not None:
+                dance = self._constrained_pick(constraints, deadlines.get(self.step, ()))
+            elif dance is None:
+                dance, _ = self.heap.peek()
+            if trace:
+                key = self.heap.keys[self.heap.pos[dance]] if dance in self.heap else None
+                self.instruments.step("greedy_place", slot=self.step, dance=self.graph.dance_names[dance],
+                                      weight=key[0] if key else None)
+            self.perform(dance)
+            order.append(dance)
+        return order
+
+    def _constrained_pick(self, constraints, due: Iterable[int]) -> int:
+        last = self.recent[-1] if self.recent else None
+        placed = ~self.remaining
+        due = [dance for dance in due if dance in self.heap]
+        if len(due) > 1 or due and not constraints.allowed(due[0], self.step, placed, last):
+            names = ", ".join(self.graph.dance_names[dance] for dance in due)
+            raise ValueError(f"Greedy order cannot place {names} by slot {self.step}")
+        if due:
+            return due[0]
+
+        # Set aside the lightest dances until one is allowed here
+        skipped = []
+        try:
+            while len(self.heap):
+                dance, key = self.heap.pop()
+                skipped.append((dance, key))
+                if constraints.allowed(dance, self.step, placed, last):
+                    return dance
+            raise ValueError(f"No dance can go in slot {self.step} under the show constraints")
+        finally:
+            for dance, key in skipped:
+                self.heap.push(dance, key)
+
+    def _key(self, dance: int):
+        self.weight_recalcs += 1
+        return self.weight(self, dance), self.tiebreak[dance]
+
+
+def schedule_greedy(graph: ConflictGraph, dances: Optional[Iterable[int]] = None,
+                    previous: Sequence[int] = (), pinned: Optional[Dict[int, int]] = None,
+                    weight=quick_change_weight, tiebreak: Optional[Sequence] = None,
+                    constraints=None, instruments: Optional[Instruments] = None) -> List[int]:
+    if dances is None:
+        dances = [dance for dance in range(len(graph)) if dance not in previous]
+    return GreedyScheduler(graph, weight, tiebreak, instruments).run(dances, previous, pinned, constraints)
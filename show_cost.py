@@ -0,0 +1,121 @@
+import weakref
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from conflict_graph import ConflictGraph, popcount
+
+# An instant (a dancer in back-to-back numbers) is treated as this many
+# quick changes when the two are folded into a single cost
+INSTANT_WEIGHT = 100
+
+
+def slot_cost(casts: Sequence[int], before_prev, prev, dance: int) -> Tuple[int, int]:
+    """Quick changes and instants for dance following prev, which followed before_prev.
+
+    Mirrors Dance.qcs: a dancer in prev is an instant, a dancer in before_prev
+    but not in prev is a quick change. Either predecessor may be None.
+    """
+    cast = casts[dance]
+    prev_cast = casts[prev] if prev is not None else 0
+    before_prev_cast = casts[before_prev] if before_prev is not None else 0
+    return popcount(cast & before_prev_cast & ~prev_cast), popcount(cast & prev_cast)
+
+
+def weighted(qcs: int, instants: int) -> int:
+    return qcs + INSTANT_WEIGHT * instants
+
+
+def slot_costs(graph: ConflictGraph, order: Sequence[int], previous: Sequence[int] = ()) -> List[Tuple[int, int]]:
+    """Per-slot (quick changes, instants) for order, after the dances in previous"""
+    show = list(previous) + list(order)
+    costs = []
+    for i in range(len(previous), len(show)):
+        before_prev = show[i - 2] if i >= 2 else None
+        prev = show[i - 1] if i >= 1 else None
+        costs.append(slot_cost(graph.casts, before_prev, prev, show[i]))
+    return costs
+
+
+def order_costs(graph: ConflictGraph, order: Sequence[int], previous: Sequence[int] = ()) -> Tuple[int, int]:
+    """Total (quick changes, instants) for order, after the dances in previous, through the graph's CostCache"""
+    return cost_cache(graph).order_costs(order, previous)
+
+
+def order_cost(graph: ConflictGraph, order: Sequence[int], previous: Sequence[int] = ()) -> int:
+    return weighted(*order_costs(graph, order, previous))
+
+
+class CostCache:
+    """Bounded LRU memo of the (quick changes, instants) of three-slot windows and of whole orders.
+
+    A slot's cost depends only on its dance and the two before it, as in
+    Dance.qcs, so window(before_prev, prev, dance) is shared by every order
+    and every engine scoring the same roster, and a whole order is the sum
+    of its windows. Both memos evict the least recently used entry once
+    full; stats() gives their hits and misses for tuning the sizes. Only
+    the graph's casts are kept, so a cache never keeps its graph alive.
+
+    Memoized costs are never checked against the casts again, so a graph
+    must not be changed in place once it has been scored: edit a copy, as
+    incremental.GraphPatch does, or clear() the cache after the change.
+    """
+
+    def __init__(self, graph: ConflictGraph, max_windows: int = 1 << 17, max_orders: int = 1024):
+        self.casts = graph.casts
+        self.window = lru_cache(maxsize=max_windows)(self._window)
+        self._order = lru_cache(maxsize=max_orders)(self._order_costs)
+
+    def _window(self, before_prev: Optional[int], prev: Optional[int], dance: int) -> Tuple[int, int]:
+        return slot_cost(self.casts, before_prev, prev, dance)
+
+    def window_cost(self, before_prev: Optional[int], prev: Optional[int], dance: int) -> int:
+        qcs, instants = self.window(before_prev, prev, dance)
+        return qcs + INSTANT_WEIGHT * instants
+
+    def _order_costs(self, show: Tuple[int, ...], start: int) -> Tuple[int, int]:
+        window = self.window
+        qcs = instants = 0
+        for i in range(start, len(show)):
+            slot_qcs, slot_instants = window(show[i - 2] if i >= 2 else None, show[i - 1] if i >= 1 else None,
+                                             show[i])
+            qcs += slot_qcs
+            instants += slot_instants
+        return qcs, instants
+
+    def order_costs(self, order: Sequence[int], previous: Sequence[int] = ()) -> Tuple[int, int]:
+        """Total (quick changes, instants) for order, after the dances in previous"""
+        return self._order(tuple(previous) + tuple(order), len(previous))
+
+    def order_cost(self, order: Sequence[int], previous: Sequence[int] = ()) -> int:
+        return weighted(*self.order_costs(order, previous))
+
+    def stats(self) -> Dict[str, int]:
+        windows, orders = self.window.cache_info(), self._order.cache_info()
+        return {
+            "window_hits": windows.hits, "window_misses": windows.misses, "windows": windows.currsize,
+            "order_hits": orders.hits, "order_misses": orders.misses, "orders": orders.currsize,
+        }
+
+    def report(self, instruments):
+        """Add the hit and miss counts to instruments' counters"""
+        for name, value in self.stats().items():
+            if name.endswith(("hits", "misses")):
+                instruments.count(f"cost_cache_{name}", value)
+
+    def clear(self):
+        self.window.cache_clear()
+        self._order.cache_clear()
+
+
+_caches: 'weakref.WeakKeyDictionary[ConflictGraph, CostCache]' = weakref.WeakKeyDictionary()
+
+
+def cost_cache(graph: ConflictGraph) -> CostCache:
+    """The CostCache every engine shares for graph, made on first use and dropped with graph.
+
+    graph must not change in place after it is scored (see CostCache).
+    """
+    cache = _caches.get(graph)
+    if cache is None:
+        cache = _caches[graph] = CostCache(graph)
+    return cache
@@ -0,0 +1,53 @@
+from typing import Iterable, List, Set
+
+
+class ShowLayout:
+    """The show order and slot geometry, kept apart from anything drawn on the canvas.
+
+    Slot i holds order[i] and its box starts at slot_y(i). Every dance's
+    position is kept equal to its slot.
+    """
+
+    def __init__(self, dances: Iterable, margin_top: int = 80, slot_height: int = 100):
+        self.margin_top = margin_top
+        self.slot_height = slot_height
+        self.order: List = []
+        self.reorder(dances)
+
+    def __len__(self):
+        return len(self.order)
+
+    def reorder(self, dances: Iterable):
+        self.order = list(dances)
+        for slot, dance in enumerate(self.order):
+            dance.position = slot
+
+    def slot_y(self, slot: int) -> int:
+        return self.margin_top + slot * self.slot_height
+
+    def total_height(self) -> int:
+        return self.slot_y(len(self.order))
+
+    def visible_slots(self, top: float, bottom: float, overscan: int = 1) -> range:
+        """Slots whose boxes overlap the canvas rows top..bottom, plus overscan either side"""
+        first = int((top - self.margin_top) // self.slot_height) - overscan
+        last = int((bottom - self.margin_top) // self.slot_height) + overscan
+        return range(max(0, first), min(len(self.order), last + 1))
+
+    def locked_slots(self, moving=None) -> Set[int]:
+        """Slots held by locked dances, other than moving"""
+        return {slot for slot, dance in enumerate(self.order) if dance.locked and dance is not moving}
+
+    def with_drop(self, moving, position: int) -> List:
+        """The order after moving goes into the position-th unlocked slot.
+
+        Locked dances keep their slots; the unlocked dances between the old
+        and new slots shift by one to make room.
+        """
+        order = list(self.order)
+        free = [slot for slot, dance in enumerate(order) if not dance.locked or dance is moving]
+        shifting = [order[slot] for slot in free if order[slot] is not moving]
+        shifting.insert(position, moving)
+        for slot, dance in zip(free, shifting):
+            order[slot] = dance
+        return order
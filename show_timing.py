@@ -0,0 +1,111 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from conflict_graph import ConflictGraph, iter_bits
+
+# Used for dances and dancers a timed roster gives no time for. A change
+# that needs more than one number's length but less than two makes a dancer
+# short of time only within the two numbers before they go on, the same
+# reach as the quick changes of the untimed cost.
+DEFAULT_DURATION = 180
+DEFAULT_CHANGE_TIME = 240
+
+
+class ShowTiming:
+    """Running time of every dance and costume-change time of every dancer of a graph, in seconds.
+
+    A dancer is short of time when less than their change time passes
+    between the end of one of their numbers and the start of their next;
+    the cost of an order is the total of those shortfalls in seconds. Once
+    the shortest numbers in between outlast the longest change, no one can
+    be short of time, so a slot's shortfall depends only on its dance and
+    the reach dances before it: window_cost() memoizes it per window, which
+    keeps move deltas as local as the untimed cost's. Only arrays are kept,
+    so for_graph() rebuilds the timing for another graph of the same roster.
+    """
+
+    def __init__(self, graph: ConflictGraph, durations: Dict[str, int], change_times: Dict[str, int],
+                 default_duration: int = DEFAULT_DURATION, default_change_time: int = DEFAULT_CHANGE_TIME):
+        self.named_durations = dict(durations)
+        self.named_change_times = dict(change_times)
+        self.default_duration = default_duration
+        self.default_change_time = default_change_time
+        self.casts = graph.casts
+        self.durations = [durations.get(name, default_duration) for name in graph.dance_names]
+        self.change_times = [change_times.get(name, default_change_time) for name in graph.dancer_names]
+
+        longest = max((self.change_times[dancer] for dancer, dances in enumerate(graph.appearances)
+                       if len(dances) > 1), default=0)
+        self.reach = 0
+        between = 0
+        for duration in sorted(self.durations)[:-1]:
+            if between >= longest:
+                break
+            between += duration
+            self.reach += 1
+        self.window_cost = lru_cache(maxsize=1 << 17)(self._window_cost)
+
+    def __getstate__(self):
+        # The memo is rebuilt empty, so a timing can be sent to worker processes
+        state = dict(self.__dict__)
+        del state["window_cost"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.window_cost = lru_cache(maxsize=1 << 17)(self._window_cost)
+
+    def for_graph(self, graph: ConflictGraph) -> 'ShowTiming':
+        return ShowTiming(graph, self.named_durations, self.named_change_times,
+                          self.default_duration, self.default_change_time)
+
+    def _window_cost(self, window: Sequence[int]) -> int:
+        """Seconds short for the dancers of window[-1], going on after the dances before it"""
+        remaining = self.casts[window[-1]]
+        between = short = 0
+        for prev in reversed(window[:-1]):
+            if not remaining:
+                break
+            changing = remaining & self.casts[prev]
+            for dancer in iter_bits(changing):
+                short += max(0, self.change_times[dancer] - between)
+            remaining &= ~changing
+            between += self.durations[prev]
+        return short
+
+    def slot_shortfall(self, order: Sequence[int], position: int) -> int:
+        return self.window_cost(tuple(order[max(0, position - self.reach):position + 1]))
+
+    def start_times(self, order: Sequence[int]) -> List[int]:
+        """Prefix sums of the running times: when every slot of order starts, then when the show ends"""
+        starts = [0]
+        for dance in order:
+            starts.append(starts[-1] + self.durations[dance])
+        return starts
+
+    def order_shortfall(self, order: Sequence[int]) -> int:
+        """Total seconds short across order, from each dancer's previous number through the start times"""
+        starts = self.start_times(order)
+        last_end: Dict[int, int] = {}
+        short = 0
+        for position, dance in enumerate(order):
+            for dancer in iter_bits(self.casts[dance]):
+                end = last_end.get(dancer)
+                if end is not None:
+                    short += max(0, self.change_times[dancer] - (starts[position] - end))
+                last_end[dancer] = starts[position + 1]
+        return short
+
+    def running_time(self, order: Sequence[int]) -> int:
+        return sum(self.durations[dance] for dance in order)
+
+
+def format_seconds(seconds: int) -> str:
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def show_timing(graph: ConflictGraph, roster) -> Optional[ShowTiming]:
+    """The ShowTiming of a roster read by roster_io, or None if it gives no times"""
+    if not getattr(roster, "timed", False):
+        return None
+    return ShowTiming(graph, roster.durations, roster.change_times)
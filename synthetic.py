@@ -0,0 +1,30 @@
+import random
+from typing import Dict, List, Optional
+
+
+def synthetic_roster(dances: int, dancers: Optional[int] = None, cast_mean: float = 6.0,
+                     cast_spread: float = 2.5, overlap: float = 0.3, core_fraction: float = 0.1,
+                     seed=0) -> Dict[str, List[str]]:
+    """A made-up {dance: [dancers]} roster for benchmarks.
+
+    Cast sizes are drawn from a normal distribution with cast_mean and
+    cast_spread, clipped to at least one dancer. overlap is the chance that a
+    cast place goes to one of the core_fraction busiest dancers rather than
+    anyone in the company, so higher overlap gives a denser conflict graph.
+    dancers defaults to about 1.6 per dance, as in the 2025 roster.
+    """
+    if dancers is None:
+        dancers = max(2, round(1.6 * dances))
+    rng = random.Random(seed)
+    names = [f"Dancer {dancer:04d}" for dancer in range(dancers)]
+    core = names[:max(1, round(core_fraction * dancers))]
+
+    roster = {}
+    for dance in range(dances):
+        size = min(dancers, max(1, round(rng.gauss(cast_mean, cast_spread))))
+        cast = set()
+        while len(cast) < size:
+            pool = core if rng.random() < overlap and len(cast.intersection(core)) < len(core) else names
+            cast.add(rng.choice(pool))
+        roster[f"Dance {dance:04d}"] = sorted(cast)
+    return roster
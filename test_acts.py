@@ -0,0 +1,37 @@
+import pytest
+
+from acts import ActBound, ActPlan, acts_cost, schedule_acts
+from conflict_graph import ConflictGraph
+from constraints import ShowConstraints
+from lower_bound import lower_bound
+from show_cost import order_cost
+from synthetic import synthetic_roster
+
+
+def test_acts_keep_their_dances_and_costs_add_up():
+    graph = ConflictGraph(synthetic_roster(24, dancers=20, cast_mean=4, seed=0).items())
+    plan = ActPlan(2, max_sizes=[10, 14], pinned={"Dance 0003": 1},
+                   constraints={0: ShowConstraints(opener="Dance 0005")})
+    cost, acts = schedule_acts(graph, plan, "anneal", time_limit=0.2, workers=1)
+
+    assert [len(act) for act in acts] == [10, 14]
+    assert sorted(dance for act in acts for dance in act) == list(range(24))
+    assert graph.dance_index["Dance 0003"] in acts[1]
+    assert acts[0][0] == graph.dance_index["Dance 0005"]
+    # An intermission resets recency, so the show costs the sum of its acts
+    assert cost == acts_cost(graph, acts) == sum(order_cost(graph, act) for act in acts)
+
+    bound = ActBound([lower_bound(graph, act) for act in acts])
+    assert bound.cost == sum(lower_bound(graph, act).cost for act in acts)
+    assert bound.gap(cost) == cost - bound.cost
+    assert bound.to_dict(cost)["lower_bound"] == bound.cost
+
+
+def test_plans_that_cannot_fit_are_rejected():
+    graph = ConflictGraph(synthetic_roster(10, dancers=10, cast_mean=3, seed=0).items())
+    with pytest.raises(ValueError):
+        ActPlan(2, max_sizes=[4, 4]).compile(graph)
+    with pytest.raises(ValueError):
+        ActPlan(2, pinned={"Dance 0000": 2}).compile(graph)
+    with pytest.raises(ValueError):
+        ActPlan(2, max_sizes=[1, 9], pinned={"Dance 0000": 0, "Dance 0001": 0}).compile(graph)
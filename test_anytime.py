@@ -0,0 +1,33 @@
+import threading
+import time
+
+from anytime import solve_anytime
+from conflict_graph import ConflictGraph
+from show_cost import order_cost
+from synthetic import synthetic_roster
+
+
+def test_costs_only_improve_until_the_deadline():
+    graph = ConflictGraph(synthetic_roster(30, dancers=40, cast_mean=4, seed=0).items())
+    threads = threading.active_count()
+    started = time.monotonic()
+    results = list(solve_anytime(graph, "anneal", time_limit=60, deadline=0.3))
+    # The deadline, not the time limit, ended the search and its thread
+    assert time.monotonic() - started < 10
+    assert threading.active_count() == threads
+
+    costs = [cost for _, cost, _ in results]
+    assert costs and all(later < earlier for earlier, later in zip(costs, costs[1:]))
+    for order, cost, _ in results:
+        assert sorted(order) == list(range(30))
+        assert cost == order_cost(graph, order)
+
+
+def test_leaving_the_loop_stops_the_search():
+    graph = ConflictGraph(synthetic_roster(30, dancers=40, cast_mean=4, seed=1).items())
+    threads = threading.active_count()
+    started = time.monotonic()
+    for _ in solve_anytime(graph, "anneal", time_limit=60):
+        break
+    assert time.monotonic() - started < 10
+    assert threading.active_count() == threads
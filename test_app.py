@@ -0,0 +1,142 @@
+from benchmark import HeadlessButton, headless_app
+from compiled_roster import compile_dances
+from dances import process_dances
+from roster_io import RosterCache
+
+ROSTER = {
+    "Jazz": ["Ana", "Bea"],
+    "Tap": ["Bea", "Cal"],
+    "Ballet": ["Cal", "Dee"],
+    "Hiphop": ["Dee", "Ana"],
+    "Lyrical": ["Eve", "Bea"],
+    "Contemporary": ["Cal", "Eve"],
+    "Musical": ["Ana", "Fay"],
+}
+
+
+class HeadlessRoot:
+    """Queues root.after callbacks for the test to run"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, delay, callback):
+        self.pending.append(callback)
+
+    def update(self):
+        pass
+
+    def run_pending(self):
+        while self.pending:
+            self.pending.pop(0)()
+
+
+class StatusVar:
+    def __init__(self):
+        self.value = ""
+
+    def set(self, value):
+        self.value = value
+
+
+def app_with_buttons():
+    app = headless_app()
+    app.root = HeadlessRoot()
+    app.status_var = StatusVar()
+    for name in ("upload", "process", "save", "compile", "reset", "optimize"):
+        setattr(app, f"{name}_button", HeadlessButton())
+    return app
+
+
+def test_alternatives_are_found_in_the_background():
+    app = app_with_buttons()
+    app.display_results(*process_dances(ROSTER))
+    app.layout.order[2].locked = True
+    locked = app.layout.order[2]
+
+    app.show_alternative()
+    assert app.alternatives_job is not None
+    assert app.is_optimizing()
+    assert app.alternatives_button.options["state"] == "disabled"
+    app.alternatives_job.thread.join()
+    app.root.run_pending()
+
+    assert app.alternatives_job is None
+    assert app.alternatives_button.options["state"] == "normal"
+    assert app.alternatives_button.options["text"] == f"Alternative 1/{len(app.alternatives)}"
+    cost, dances = app.alternatives[0]
+    assert app.layout.order == dances
+    assert dances[2] is locked
+    assert cost == min(cost for cost, _ in app.alternatives)
+
+
+def test_scrolling_recycles_a_fixed_set_of_boxes():
+    app = app_with_buttons()
+    roster = {f"Dance {number}": [f"Dancer {number}", f"Dancer {number + 1}"] for number in range(40)}
+    app.display_results(*process_dances(roster))
+    canvas, layout = app.canvas, app.layout
+
+    most_in_view = max(len(layout.visible_slots(top, top + canvas.height))
+                       for top in range(0, layout.total_height(), 10))
+    item_counts = []
+    for top in list(range(0, layout.total_height(), 170)) + [1200, 300, 0]:
+        canvas.top = top
+        app.render_viewport()
+        visible = layout.visible_slots(top, top + canvas.height)
+        item_counts.append(len(canvas.items))
+        assert sorted(box.dance.position for box in app.dance_boxes) == list(visible)
+        assert len(app.dance_boxes) + len(app.free_boxes) <= most_in_view
+        for box in app.dance_boxes:
+            slot = box.dance.position
+            assert box.dance is layout.order[slot]
+            assert canvas.items[box.title]["text"] == layout.order[slot].name
+            assert canvas.items[box.box]["coords"][1] == layout.slot_y(slot)
+            assert canvas.items[box.box].get("state", "normal") == "normal"
+        for box in app.free_boxes:
+            assert canvas.items[box.box]["state"] == "hidden"
+    # Once a screenful of boxes and markers exists, scrolling only reuses them
+    full = item_counts.index(max(item_counts))
+    assert set(item_counts[full:]) == {max(item_counts)}
+    assert full <= 2
+
+
+def test_dropping_keeps_locked_slots():
+    app = app_with_buttons()
+    app.display_results(*process_dances(ROSTER))
+    order = list(app.layout.order)
+    order[1].locked = order[4].locked = True
+
+    dropped = app.layout.with_drop(order[5], 1)
+    assert dropped[1] is order[1] and dropped[4] is order[4]
+    assert [dance for dance in dropped if not dance.locked] == [order[0], order[5], order[2], order[3], order[6]]
+    app.drop_box(next(box for box in app.dance_boxes if box.dance is order[5]), 1)
+    assert app.layout.order == dropped
+    assert [dance.position for dance in app.layout.order] == list(range(len(ROSTER)))
+
+
+def test_files_are_read_in_the_background(tmp_path):
+    app = app_with_buttons()
+    app.roster_cache = RosterCache(tmp_path / "cache")
+    app.file_path = str(tmp_path / "show.txt")
+    (tmp_path / "show.txt").write_text("".join(f"{dance}: {', '.join(dancers)}\n" for dance, dancers in ROSTER.items()))
+
+    app.process_file()
+    assert app.layout is None
+    assert app.process_button.options["state"] == "disabled"
+    app.load_job.thread.join()
+    app.root.run_pending()
+
+    assert app.load_job is None
+    assert app.process_button.options["state"] == "normal"
+    assert sorted(dance.name for dance in app.layout.order) == sorted(ROSTER)
+    assert app.status_var.value == "Successfully processed show.txt"
+
+    # A compiled roster opens in the order saved with it
+    order = app.layout.order[::-1]
+    app.apply_order(order)
+    compile_dances(tmp_path / "show.rdtr", order)
+    app.file_path = str(tmp_path / "show.rdtr")
+    app.process_file()
+    app.load_job.thread.join()
+    app.root.run_pending()
+    assert [dance.name for dance in app.layout.order] == [dance.name for dance in order]
@@ -0,0 +1,36 @@
+import random
+
+from appearance_index import AppearanceIndex
+from conflict_graph import ConflictGraph
+from show_cost import order_costs
+from synthetic import synthetic_roster
+
+
+def same_index(index: AppearanceIndex, rebuilt: AppearanceIndex):
+    assert index.order == rebuilt.order
+    assert index.slots == rebuilt.slots
+    assert index.previous == rebuilt.previous
+    assert index.following == rebuilt.following
+    assert index.instant_dancers == rebuilt.instant_dancers
+    assert index.quick_change_dancers == rebuilt.quick_change_dancers
+    assert (index.qcs, index.instants) == (rebuilt.qcs, rebuilt.instants)
+
+
+def test_changes_match_a_rebuilt_index():
+    rng = random.Random(0)
+    for seed in range(10):
+        graph = ConflictGraph(synthetic_roster(20, dancers=25, cast_mean=3, seed=seed).items())
+        index = AppearanceIndex(graph, rng.sample(range(20), 20))
+        for _ in range(50):
+            choice = rng.random()
+            if choice < 0.4:
+                index.swap(*rng.sample(range(20), 2))
+            elif choice < 0.8:
+                index.move(rng.randrange(20), rng.randrange(20))
+            else:
+                order = list(index.order)
+                start = rng.randrange(20)
+                order[start:start + 5] = rng.sample(order[start:start + 5], len(order[start:start + 5]))
+                index.update(order)
+            same_index(index, AppearanceIndex(graph, index.order))
+            assert (index.qcs, index.instants) == order_costs(graph, index.order)
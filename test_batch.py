@@ -0,0 +1,27 @@
+import json
+from pathlib import Path
+
+import batch
+
+ROSTER = "Jazz: Ana, Bea\nTap: Bea, Cal\nBallet: Cal, Ana\nHiphop: Dee\n"
+
+
+def write_rosters(directory):
+    (directory / "good.txt").write_text(ROSTER)
+    (directory / "corrupt.xlsx").write_bytes(b"PK\x03\x04 not really a workbook")
+    return directory
+
+
+def test_corrupt_workbook_is_reported_per_roster(tmp_path):
+    results = batch.schedule_rosters([write_rosters(tmp_path)], workers=1)
+    by_name = {Path(result["roster"]).name: result for result in results}
+    assert "error" in by_name["corrupt.xlsx"]
+    assert "error" not in by_name["good.txt"]
+    assert len(by_name["good.txt"]["order"]) == 4
+
+
+def test_corrupt_workbook_in_process_pool(tmp_path):
+    output = tmp_path / "orders.json"
+    assert batch.main([str(write_rosters(tmp_path)), "--workers", "2", "--output", str(output)]) == 1
+    results = json.loads(output.read_text())
+    assert ["error" in result for result in results] == [True, False]
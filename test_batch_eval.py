@@ -0,0 +1,25 @@
+import random
+
+from batch_eval import BatchEvaluator
+from conflict_graph import ConflictGraph
+from dances import process_dances
+from show_cost import order_cost, order_costs
+from synthetic import synthetic_roster
+
+
+def test_costs_match_order_cost():
+    rng = random.Random(0)
+    for seed, size in enumerate((1, 2, 3, 10, 30)):
+        graph = ConflictGraph(synthetic_roster(size, dancers=20, cast_mean=4, seed=seed).items())
+        evaluator = BatchEvaluator.from_graph(graph)
+        orders = [rng.sample(range(size), size) for _ in range(25)]
+        assert evaluator.costs(orders).tolist() == [order_cost(graph, order) for order in orders]
+        qcs, instants, _ = evaluator.score(orders, chunk_size=4)
+        assert list(zip(qcs.tolist(), instants.tolist())) == [order_costs(graph, order) for order in orders]
+
+
+def test_one_dance_roster():
+    dances, dancers = process_dances({"Solo": ["Ana", "Bea"]})
+    qcs, instants, min_gaps = BatchEvaluator(dances, dancers).score([[0]])
+    assert qcs.tolist() == [0] and instants.tolist() == [0]
+    assert min_gaps.tolist() == [[0, 0]]
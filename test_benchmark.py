@@ -0,0 +1,14 @@
+import json
+
+import benchmark
+
+
+def test_benchmark_runs_every_stage(tmp_path):
+    output = tmp_path / "benchmark.json"
+    assert benchmark.main(["--sizes", "8", "--repeat", "1", "--anneal-iterations", "200",
+                           "--batch-orders", "4", "--slot-queries", "10", "--output", str(output)]) == 0
+    result, = json.loads(output.read_text())["results"]
+    assert result["dances"] == 8
+    for stage in ("parse_xlsx", "greedy_degree", "anneal", "exact", "display_results", "find_nearest_slot"):
+        assert stage in result["stages"]
+    assert result["costs"]["exact"] <= result["costs"]["anneal"]
@@ -0,0 +1,48 @@
+from compiled_roster import CompiledRoster, compile_dances
+from dances import process_dances
+from roster_io import load_timed_graph, read_roster, write_roster
+from roster_model import Roster
+
+ROSTER = {
+    "Jazz": ["Ana", "Bea"],
+    "Tap": ["Bea", "Cal"],
+    "Ballet": ["Cal", "Dee"],
+    "Lyrical": ["Eve"],
+}
+
+
+def test_compiled_dances_open_as_the_same_roster(tmp_path):
+    dances, _ = process_dances(ROSTER)
+    order = sorted(dances, key=lambda dance: -dance.index)
+    for position, dance in enumerate(order):
+        dance.position = position
+    order[2].locked = True
+    path = tmp_path / "show.rdtr"
+    compile_dances(path, order)
+
+    with CompiledRoster(path) as compiled:
+        roster = compiled.to_graph(Roster)
+        saved, locked = compiled.saved_order("current")
+    assert isinstance(roster, Roster)
+    assert roster.nbrs == order[0].roster.nbrs
+    assert [roster.dance_names[dance] for dance in saved] == [dance.name for dance in order]
+    assert {slot: roster.dance_names[dance] for slot, dance in locked.items()} == {2: order[2].name}
+
+
+def test_scripts_read_and_write_compiled_rosters(tmp_path):
+    path = tmp_path / "show.rdtr"
+    write_roster(ROSTER, path)
+    assert read_roster(path) == ROSTER
+
+
+def test_compiled_rosters_keep_their_times(tmp_path):
+    timed = tmp_path / "show.txt"
+    timed.write_text("Jazz [3:05]: Ana [1:30], Bea\nTap: Bea, Cal\n")
+    path = tmp_path / "show.rdtr"
+    write_roster(read_roster(timed), path)
+
+    roster = read_roster(path)
+    assert roster.durations == {"Jazz": 185}
+    assert roster.change_times == {"Ana": 90}
+    _, timing = load_timed_graph(path)
+    assert timing.named_durations == {"Jazz": 185}
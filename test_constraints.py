@@ -0,0 +1,60 @@
+import pytest
+
+from conflict_graph import ConflictGraph
+from constraints import ShowConstraints
+
+ROSTER = {
+    "Jazz": ["Ana"],
+    "Tap": ["Bea"],
+    "Ballet": ["Cal"],
+    "Hiphop": ["Dee"],
+    "Lyrical": ["Eve"],
+}
+
+
+def ids(graph, *names):
+    return [graph.dance_index[name] for name in names]
+
+
+def test_two_dances_pinned_to_one_slot_conflict():
+    graph = ConflictGraph(ROSTER.items())
+    with pytest.raises(ValueError):
+        ShowConstraints(pinned={"Jazz": 2, "Tap": 2}).compile(graph)
+    with pytest.raises(ValueError):
+        ShowConstraints(opener="Jazz", pinned={"Tap": 0}).compile(graph)
+    with pytest.raises(ValueError):
+        ShowConstraints(pinned={"Jazz": 5}).compile(graph)
+
+
+def test_predecessor_chains_narrow_and_fail():
+    graph = ConflictGraph(ROSTER.items())
+    chain = ShowConstraints(before=[("Jazz", "Tap"), ("Tap", "Ballet"), ("Ballet", "Hiphop")])
+    compiled = chain.compile(graph)
+    jazz, tap, ballet, hiphop = ids(graph, "Jazz", "Tap", "Ballet", "Hiphop")
+    assert (compiled.earliest(jazz), compiled.latest(jazz)) == (0, 1)
+    assert (compiled.earliest(hiphop), compiled.latest(hiphop)) == (3, 4)
+    assert not compiled.allowed(tap, 1, placed=0)
+    assert compiled.allowed(tap, 1, placed=1 << jazz)
+
+    with pytest.raises(ValueError):
+        ShowConstraints(before=chain.before, closer="Jazz").compile(graph)
+    with pytest.raises(ValueError):
+        ShowConstraints(before=chain.before + [("Hiphop", "Jazz")]).compile(graph)
+    with pytest.raises(ValueError):
+        ShowConstraints(before=chain.before, pinned={"Ballet": 1}).compile(graph)
+
+
+def test_apart_dances_are_kept_apart():
+    graph = ConflictGraph(ROSTER.items())
+    compiled = ShowConstraints(opener="Jazz", not_adjacent=[("Jazz", "Tap")]).compile(graph)
+    jazz, tap, ballet, hiphop, lyrical = ids(graph, "Jazz", "Tap", "Ballet", "Hiphop", "Lyrical")
+    # Next to a pinned dance is ruled out by propagation
+    assert not compiled.domains[tap] >> 1 & 1
+    assert not compiled.allowed(tap, 1, placed=1 << jazz, last=jazz)
+    assert compiled.allowed(ballet, 1, placed=1 << jazz, last=jazz)
+    assert compiled.violations([jazz, ballet, tap, hiphop, lyrical]) == []
+    problems = compiled.violations([jazz, tap, ballet, hiphop, lyrical])
+    assert any("back-to-back" in problem for problem in problems)
+
+    with pytest.raises(ValueError):
+        ShowConstraints(opener="Jazz", pinned={"Tap": 1}, not_adjacent=[("Jazz", "Tap")]).compile(graph)
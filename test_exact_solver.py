@@ -0,0 +1,61 @@
+from itertools import permutations
+
+from conflict_graph import ConflictGraph
+from constraints import ShowConstraints
+from exact_solver import ExactSolver, solve_exact
+from instrumentation import Instruments
+from layered_dp import cheapest_split
+from roster_io import load_timed_graph
+from show_cost import order_cost
+from synthetic import synthetic_roster
+from textbased_greedy import CONSTRAINTS
+
+
+def test_cheapest_split_matches_every_order():
+    for seed in range(20):
+        graph = ConflictGraph(synthetic_roster(7, dancers=10, cast_mean=3, seed=seed).items())
+        previous = [6][:seed % 2]
+        dances = [dance for dance in range(7) if dance not in previous]
+        best = min(order_cost(graph, list(order), previous) for order in permutations(dances))
+
+        split = cheapest_split(graph, dances, previous, cap=best)
+        assert split.cost == best
+        assert sorted(split.head + split.tail) == dances
+        assert cheapest_split(graph, dances, previous, cap=best - 1) is None
+
+
+def test_cheapest_split_keeps_pins_and_constraints():
+    rules = ShowConstraints(before=[("Dance 0004", "Dance 0001")], not_adjacent=[("Dance 0002", "Dance 0005")])
+    for seed in range(20):
+        graph = ConflictGraph(synthetic_roster(8, dancers=10, cast_mean=3, seed=seed).items())
+        previous = [7][:seed % 2]
+        dances = list(range(7))
+        pinned = {len(previous) + 2: 3}
+        constraints = rules.compile(graph, dances, len(previous))
+        best = min(order_cost(graph, list(order), previous) for order in permutations(dances)
+                   if order[2] == 3 and not constraints.violations(order))
+
+        split = cheapest_split(graph, dances, previous, cap=best, pinned=pinned, constraints=constraints)
+        assert split.cost == best
+        assert 3 in split.head
+        assert cheapest_split(graph, dances, previous, cap=best - 1, pinned=pinned, constraints=constraints) is None
+
+
+def test_split_settles_the_constrained_2025_show():
+    graph, _ = load_timed_graph("2025dances.txt")
+    instruments = Instruments()
+    cost, order = solve_exact(graph, constraints=CONSTRAINTS, instruments=instruments)
+    # Proven by branch and bound alone, which takes close to a minute
+    assert cost == 9 == order_cost(graph, order)
+    assert CONSTRAINTS.compile(graph).violations(order) == []
+    assert "exact_split" in instruments.timers
+
+
+def test_stopped_search_bound_never_passes_the_optimum():
+    graph = ConflictGraph(synthetic_roster(12, cast_mean=4, seed=1).items())
+    best, _ = ExactSolver(graph).solve(range(12))
+
+    solver = ExactSolver(graph)
+    solver.solve(range(12), should_stop=lambda: True)
+    assert not solver.proven
+    assert solver.lower_bound <= best
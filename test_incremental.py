@@ -0,0 +1,80 @@
+import pytest
+
+from compiled_roster import CompiledRoster, read_compiled_roster, write_compiled_roster
+from conflict_graph import ConflictGraph
+import incremental
+from roster_io import write_roster
+
+ROSTER = {
+    "Jazz": ["Ana", "Bea"],
+    "Tap": ["Bea", "Cal"],
+    "Ballet": ["Cal", "Dee"],
+    "Hiphop": ["Dee", "Eve"],
+    "Lyrical": ["Eve", "Ana"],
+    "Contemporary": ["Fay"],
+}
+
+
+def test_main_keeps_every_saved_order(tmp_path):
+    graph = ConflictGraph(ROSTER.items())
+    compiled = tmp_path / "show.rdtr"
+    draft = [graph.dance_index[name] for name in ("Tap", "Jazz", "Ballet", "Contemporary", "Lyrical", "Hiphop")]
+    write_compiled_roster(compiled, graph, {
+        "current": (list(range(len(graph))), {0: 0}),
+        "draft": (draft, {1: graph.dance_index["Jazz"]}),
+    })
+    edited = dict(ROSTER, Tap=["Bea", "Gus"], Finale=["Ana", "Fay"])
+    del edited["Contemporary"]
+    roster = tmp_path / "roster.txt"
+    roster.write_text("".join(f"{dance}: {', '.join(dancers)}\n" for dance, dancers in edited.items()))
+
+    assert incremental.main([str(compiled), str(roster)]) == 0
+
+    new_graph, orders = read_compiled_roster(compiled)
+    assert set(orders) == {"current", "draft"}
+    order, locked = orders["draft"]
+    names = [new_graph.dance_names[dance] for dance in order]
+    assert names == ["Tap", "Jazz", "Ballet", "Lyrical", "Hiphop", "Finale"]
+    assert locked == {1: new_graph.dance_index["Jazz"]}
+    current, current_locked = orders["current"]
+    assert sorted(current) == list(range(len(new_graph)))
+    assert current_locked == {0: new_graph.dance_index["Jazz"]}
+
+
+def test_main_keeps_the_compiled_times(tmp_path):
+    graph = ConflictGraph(ROSTER.items())
+    compiled = tmp_path / "show.rdtr"
+    write_compiled_roster(compiled, graph, {"current": (list(range(len(graph))), {})},
+                          durations={"Jazz": 185, "Contemporary": 200}, change_times={"Bea": 90})
+    edited = dict(ROSTER, Tap=["Bea", "Gus"])
+    del edited["Contemporary"]
+    roster = tmp_path / "roster.txt"
+    roster.write_text("".join(f"{dance}: {', '.join(dancers)}\n" for dance, dancers in edited.items()))
+
+    assert incremental.main([str(compiled), str(roster)]) == 0
+    with CompiledRoster(compiled) as result:
+        assert result.durations() == {"Jazz": 185}
+        assert result.change_times() == {"Bea": 90}
+
+    roster.write_text("Jazz [2:00]: Ana, Bea [1:00]\nTap: Bea, Gus\n")
+    assert incremental.main([str(compiled), str(roster)]) == 0
+    with CompiledRoster(compiled) as result:
+        assert result.durations() == {"Jazz": 120}
+        assert result.change_times() == {"Bea": 60}
+
+
+def test_main_starts_a_file_without_orders_from_greedy(tmp_path):
+    compiled = tmp_path / "show.rdtr"
+    write_roster(ROSTER, compiled)
+    edited = dict(ROSTER, Tap=["Bea", "Gus"])
+    roster = tmp_path / "roster.txt"
+    roster.write_text("".join(f"{dance}: {', '.join(dancers)}\n" for dance, dancers in edited.items()))
+
+    assert incremental.main([str(compiled), str(roster)]) == 0
+    new_graph, orders = read_compiled_roster(compiled)
+    order, locked = orders["current"]
+    assert sorted(order) == list(range(len(new_graph)))
+    assert locked == {}
+
+    with pytest.raises(SystemExit):
+        incremental.main([str(compiled), str(roster), "--order", "draft"])
@@ -0,0 +1,54 @@
+import time
+
+import textbased_greedy
+from conflict_graph import ConflictGraph
+from instrumentation import Instruments, phase
+from scheduler import schedule_greedy
+from synthetic import synthetic_roster
+
+
+def test_phases_time_and_counters_add_up():
+    instruments = Instruments(trace=True)
+    with instruments.phase("sleep"):
+        time.sleep(0.01)
+    with phase(instruments, "sleep"):
+        time.sleep(0.01)
+    with phase(None, "ignored"):
+        pass
+    assert instruments.timers["sleep"] >= 0.02
+    assert "ignored" not in instruments.timers
+
+    instruments.count("moves")
+    instruments.count("moves", 4)
+    assert instruments.counters == {"moves": 5}
+
+    heard = []
+    instruments.add_hook(lambda event, data: heard.append(event))
+    instruments.step("place", slot=0)
+    assert instruments.steps == [{"slot": 0, "event": "place"}]
+    assert heard == ["place"]
+    assert instruments.to_dict()["counters"] == {"moves": 5}
+
+
+def test_greedy_reports_its_work():
+    graph = ConflictGraph(synthetic_roster(20, dancers=25, cast_mean=3, seed=0).items())
+    instruments = Instruments()
+    schedule_greedy(graph, instruments=instruments)
+    assert instruments.counters["greedy_placements"] == 20
+    assert instruments.timers["greedy"] > 0
+    assert instruments.steps == []
+
+
+def test_verbose_run_prints_each_dance(tmp_path, capsys):
+    path = tmp_path / "show.txt"
+    path.write_text("Jazz: Ana, Bea\nTap: Bea, Cal\nBallet: Ana\n")
+    order = textbased_greedy.main(str(path), constraints=None, verbose=True)
+    lines = capsys.readouterr().out.splitlines()
+    scheduled = [line for line in lines if line.startswith("Scheduled: ")]
+    assert len(scheduled) == len(order) == 3
+    assert "inf since last dance" in scheduled[0]
+    assert any(line.startswith("Quick Changes: ") for line in lines)
+    assert any(line.startswith("Optimality: ") for line in lines)
+
+    textbased_greedy.main(str(path), constraints=None)
+    assert not any(line.startswith("Scheduled: ") for line in capsys.readouterr().out.splitlines())
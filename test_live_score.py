@@ -0,0 +1,53 @@
+import random
+
+from conflict_graph import ConflictGraph
+from live_score import LiveScore
+from show_cost import order_costs
+from show_timing import ShowTiming
+from synthetic import synthetic_roster
+
+
+def random_timing(graph: ConflictGraph, rng: random.Random) -> ShowTiming:
+    durations = {name: rng.randint(60, 300) for name in graph.dance_names}
+    change_times = {name: rng.randint(30, 600) for name in graph.dancer_names}
+    return ShowTiming(graph, durations, change_times)
+
+
+def test_running_shortfall_matches_the_whole_order():
+    rng = random.Random(0)
+    for seed in range(10):
+        graph = ConflictGraph(synthetic_roster(15, dancers=20, cast_mean=3, seed=seed).items())
+        timing = random_timing(graph, rng)
+        order = list(range(15))
+        score = LiveScore(graph, order, timing)
+        assert score.shortfall == timing.order_shortfall(order)
+        for _ in range(30):
+            order = list(order)
+            dance = order.pop(rng.randrange(15))
+            order.insert(rng.randrange(15), dance)
+            assert score.preview(order)[2] == timing.order_shortfall(order)
+            score.update(order)
+            assert score.shortfall == timing.order_shortfall(order)
+
+
+def test_incremental_totals_match_a_full_rescore():
+    rng = random.Random(1)
+    for seed in range(10):
+        graph = ConflictGraph(synthetic_roster(20, dancers=25, cast_mean=3, seed=seed).items())
+        order = rng.sample(range(20), 20)
+        score = LiveScore(graph, order)
+        for _ in range(50):
+            order = list(order)
+            if rng.random() < 0.5:
+                i, j = rng.sample(range(20), 2)
+                order[i], order[j] = order[j], order[i]
+            else:
+                order.insert(rng.randrange(20), order.pop(rng.randrange(20)))
+            changed = score.changed_slots(order)
+            assert all(slot in changed for slot in range(20)
+                       if order[max(0, slot - 2):slot + 1] != score.order[max(0, slot - 2):slot + 1])
+            qcs, instants, _, _ = score.preview(order)
+            assert (qcs, instants) == order_costs(graph, order)
+            score.update(order)
+            assert (score.qcs, score.instants) == order_costs(graph, order)
+            assert score.slots == LiveScore(graph, order).slots
@@ -0,0 +1,48 @@
+import random
+
+from conflict_graph import ConflictGraph
+from local_search import LocalSearch
+from show_cost import order_cost
+from show_timing import ShowTiming
+from synthetic import synthetic_roster
+
+
+def test_move_deltas_match_the_whole_order():
+    rng = random.Random(0)
+    for seed in range(10):
+        graph = ConflictGraph(synthetic_roster(20, dancers=25, cast_mean=3, seed=seed).items())
+        timing = None
+        if seed % 2:
+            timing = ShowTiming(graph, {name: rng.randint(60, 300) for name in graph.dance_names},
+                                {name: rng.randint(30, 600) for name in graph.dancer_names})
+        score = timing.order_shortfall if timing is not None else lambda order: order_cost(graph, order)
+        order = rng.sample(range(20), 20)
+        locked = {position: order[position] for position in rng.sample(range(20), 4)}
+        search = LocalSearch(graph, order, locked, seed=seed, timing=timing)
+        assert search.cost == score(search.order)
+
+        for _ in range(300):
+            move = search.propose()
+            if move is None:
+                continue
+            kind, args = move
+            before = score(search.order)
+            if kind == "swap":
+                delta = search.swap_delta(*args)
+                search.swap(*args)
+            else:
+                delta = search.rotate_delta(*args)
+                search.rotate(*args)
+            assert delta == score(search.order) - before
+            assert all(search.order[position] == dance for position, dance in locked.items())
+            assert search.position == {dance: position for position, dance in enumerate(search.order)}
+
+
+def test_annealing_keeps_locked_dances():
+    graph = ConflictGraph(synthetic_roster(20, dancers=25, cast_mean=3, seed=1).items())
+    order = list(range(20))
+    locked = {0: 0, 7: 7, 8: 8, 19: 19}
+    cost, best = LocalSearch(graph, order, locked, seed=1).run(iterations=2000)
+    assert cost == order_cost(graph, best)
+    assert sorted(best) == order
+    assert all(best[position] == dance for position, dance in locked.items())
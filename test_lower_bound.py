@@ -0,0 +1,15 @@
+from conflict_graph import ConflictGraph
+from lower_bound import lower_bound
+
+
+def test_zero_bound_is_reported_as_trivial():
+    spaced = lower_bound(ConflictGraph({"Jazz": ["Ana"], "Tap": ["Bea"], "Ballet": ["Ana"], "Hiphop": ["Cal"]}.items()))
+    assert spaced.trivial
+    assert "trivial" in spaced.describe(508)
+    assert spaced.describe_gap(508) == "unknown (trivial bound)"
+    assert spaced.describe(0) == "cost 0, lower bound 0 (gap 0, 0.0%)"
+
+    crowded = lower_bound(ConflictGraph({"Jazz": ["Ana"], "Tap": ["Ana"], "Ballet": ["Bea"]}.items()))
+    assert not crowded.trivial
+    assert crowded.describe_gap(crowded.cost + 1) == "1"
+    assert crowded.to_dict()["trivial_bound"] is False
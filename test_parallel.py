@@ -0,0 +1,36 @@
+from conflict_graph import ConflictGraph
+from constraints import ShowConstraints
+from engines import run_engine
+from parallel import parallel_search
+from show_cost import order_cost
+from synthetic import synthetic_roster
+
+CONSTRAINTS = ShowConstraints(opener="Dance 0003", closer="Dance 0007", before=[("Dance 0005", "Dance 0001")],
+                              not_adjacent=[("Dance 0002", "Dance 0004")])
+
+
+def test_parallel_search_keeps_locks_and_constraints():
+    graph = ConflictGraph(synthetic_roster(12, cast_mean=4, seed=1).items())
+    locked = {5: 9}
+    cost, order, seed = parallel_search(graph, restarts=4, locked=locked, time_limit=0.1, workers=2,
+                                        constraints=CONSTRAINTS)
+
+    assert sorted(order) == list(range(12))
+    assert cost == order_cost(graph, order)
+    assert seed in range(4)
+    assert order[5] == 9
+    assert CONSTRAINTS.compile(graph).violations(order) == []
+
+
+def test_parallel_engine_orders_some_of_a_roster():
+    graph = ConflictGraph(synthetic_roster(12, cast_mean=4, seed=1).items())
+    dances = list(range(1, 9))
+    constraints = ShowConstraints(opener="Dance 0003", before=[("Dance 0005", "Dance 0001")])
+    improved = []
+    cost, order = run_engine(graph, "parallel", dances, time_limit=0.1, constraints=constraints, workers=2,
+                             on_improve=lambda order, cost: improved.append(cost))
+
+    assert sorted(order) == dances
+    assert cost == order_cost(graph, order) == improved[-1]
+    assert order[0] == 3
+    assert order.index(5) < order.index(1)
@@ -0,0 +1,25 @@
+from roster_io import NameTable, name_key, read_roster
+
+
+def test_spellings_of_one_name_merge():
+    for spelling in ("marisol saenz", "Marisol  Sáenz", " MARISOL SAENZ ", "Marisol Sáenz"):
+        assert name_key(spelling) == name_key("Marisol Sáenz")
+    for other in ("Marisol Sanz", "Marisol Saenz-Ruiz", "Maris Olsaenz"):
+        assert name_key(other) != name_key("Marisol Sáenz")
+
+    names = NameTable()
+    keys = {names.add(spelling) for spelling in ("Marisol Sáenz", "marisol saenz", "Marisol Sáenz", "Ana Li")}
+    assert len(keys) == 2
+    assert names.canonical(name_key("MARISOL SAENZ")) == "Marisol Sáenz"
+
+
+def test_rosters_merge_spellings_across_dances(tmp_path):
+    path = tmp_path / "show.txt"
+    path.write_text("Jazz: Marisol Sáenz, Ana Li\nTap: marisol  saenz, Ana Lee\nBallet: Marisol Sáenz\n",
+                    encoding="utf-8")
+    roster = read_roster(path)
+    assert roster == {
+        "Jazz": ["Marisol Sáenz", "Ana Li"],
+        "Tap": ["Marisol Sáenz", "Ana Lee"],
+        "Ballet": ["Marisol Sáenz"],
+    }
@@ -0,0 +1,39 @@
+from dances import process_dances
+from local_search import optimize_dances
+from optimize_job import OptimizeJob
+from roster_model import graph_of
+
+ROSTER = {
+    "Jazz": ["Ana", "Bea"],
+    "Tap": ["Bea", "Cal"],
+    "Ballet": ["Cal", "Dee"],
+    "Hiphop": ["Dee", "Ana"],
+    "Lyrical": ["Eve"],
+}
+
+
+def test_engines_share_the_loaded_roster():
+    dances, _ = process_dances(ROSTER)
+    roster = next(iter(dances)).roster
+    order = sorted(dances, key=lambda dance: -dance.index)
+    for position, dance in enumerate(order):
+        dance.position = position
+    order[1].locked = True
+
+    assert graph_of(order) is roster
+    job = OptimizeJob(order, time_limit=0.1)
+    assert job.graph is roster
+    assert job.search.locked == {1: order[1].index}
+
+    optimized = optimize_dances(order, time_limit=0.1, seed=0)
+    assert optimized[1] is order[1]
+    assert [dance.position for dance in optimized] == list(range(len(ROSTER)))
+
+
+def test_some_of_a_roster_gets_its_own_graph():
+    dances, _ = process_dances(ROSTER)
+    some = sorted(dances, key=lambda dance: dance.index)[:3]
+
+    graph = graph_of(some)
+    assert graph is not some[0].roster
+    assert graph.dances == some
@@ -0,0 +1,73 @@
+import random
+
+from conflict_graph import ConflictGraph, iter_bits
+from constraints import ShowConstraints
+from scheduler import GreedyScheduler, degree_weight, quick_change_weight, schedule_greedy
+from synthetic import synthetic_roster
+
+
+def baseline_weight(graph, weight, dance, last_step, step, remaining):
+    """calc_weight_greedy and calc_weight as the original scripts worked them out"""
+    lasts = [last_step[dancer] for dancer in iter_bits(graph.casts[dance])]
+    if step - 1 in lasts:
+        return float('inf')
+    if weight is degree_weight:
+        return -2 * len([nbr for nbr in iter_bits(graph.nbrs[dance]) if nbr in remaining])
+    return lasts.count(step - 2)
+
+
+def baseline_order(graph, weight, tiebreak, constraints=None):
+    """Re-weigh every unscheduled dance at every step and take the lightest allowed one"""
+    remaining = set(range(len(graph)))
+    last_step = [None] * len(graph.dancer_names)
+    order = []
+    while remaining:
+        step = len(order)
+        placed = sum(1 << dance for dance in order)
+        due = [dance for dance in remaining if constraints is not None and constraints.latest(dance) == step]
+        allowed = due or [dance for dance in remaining if constraints is None
+                          or constraints.allowed(dance, step, placed, order[-1] if order else None)]
+        dance = min(allowed, key=lambda dance: (
+            baseline_weight(graph, weight, dance, last_step, step, remaining), tiebreak[dance]))
+        for dancer in iter_bits(graph.casts[dance]):
+            last_step[dancer] = step
+        remaining.remove(dance)
+        order.append(dance)
+    return order
+
+
+def test_heap_picks_the_baseline_order():
+    rng = random.Random(0)
+    for seed in range(20):
+        graph = ConflictGraph(synthetic_roster(25, dancers=30, cast_mean=4, seed=seed).items())
+        for weight in (quick_change_weight, degree_weight):
+            tiebreak = [rng.random() for _ in range(len(graph))] if seed % 2 else range(len(graph))
+            assert (schedule_greedy(graph, weight=weight, tiebreak=tiebreak)
+                    == baseline_order(graph, weight, tiebreak))
+
+
+def test_constrained_picks_match_the_baseline():
+    rules = ShowConstraints(before=[("Dance 0003", "Dance 0000"), ("Dance 0007", "Dance 0002")],
+                            not_adjacent=[("Dance 0001", "Dance 0004")])
+    for seed in range(20):
+        graph = ConflictGraph(synthetic_roster(15, dancers=25, cast_mean=3, seed=seed).items())
+        constraints = rules.compile(graph)
+        assert schedule_greedy(graph, constraints=constraints) == baseline_order(
+            graph, quick_change_weight, range(len(graph)), constraints)
+
+
+def test_constrained_pick_puts_skipped_dances_back():
+    graph = ConflictGraph(synthetic_roster(8, dancers=12, cast_mean=3, seed=0).items())
+    constraints = ShowConstraints(before=[("Dance 0005", "Dance 0000"), ("Dance 0005", "Dance 0001"),
+                                          ("Dance 0005", "Dance 0002")]).compile(graph)
+    scheduler = GreedyScheduler(graph)
+    scheduler.remaining = (1 << len(graph)) - 1
+    for dance in range(len(graph)):
+        scheduler.heap.push(dance, scheduler._key(dance))
+    keys = {dance: scheduler.heap.keys[scheduler.heap.pos[dance]] for dance in range(len(graph))}
+
+    # Dances 0-2 are the lightest by tie-break but have to wait for dance 5
+    assert scheduler._constrained_pick(constraints, ()) == 3
+    assert len(scheduler.heap) == len(graph)
+    assert {dance: scheduler.heap.keys[scheduler.heap.pos[dance]] for dance in range(len(graph))} == keys
+    assert scheduler.heap.peek()[0] == 0
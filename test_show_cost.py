@@ -0,0 +1,26 @@
+import gc
+
+from conflict_graph import ConflictGraph
+import show_cost
+from show_cost import cost_cache, order_costs
+from synthetic import synthetic_roster
+
+
+def test_cache_hits_and_is_dropped_with_its_graph():
+    graph = ConflictGraph(synthetic_roster(10, cast_mean=3, seed=0).items())
+    cache = cost_cache(graph)
+    assert cost_cache(graph) is cache
+    order = list(range(10))
+
+    first = order_costs(graph, order)
+    stats = cache.stats()
+    assert stats["order_misses"] == 1 and stats["window_misses"] == 10
+    assert order_costs(graph, order) == first
+    assert cache.stats()["order_hits"] == 1
+    order_costs(graph, order[:5] + order[6:7] + order[5:6] + order[7:])
+    assert cache.stats()["window_hits"] >= 5
+
+    assert graph in show_cost._caches
+    del graph
+    gc.collect()
+    assert len([cached for cached in show_cost._caches.values() if cached is cache]) == 0
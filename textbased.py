@@ -1,68 +1,64 @@
+import math
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
 from textbased_dance import Dance
 from textbased_dancer import Dancer
+import conflict_graph
+from conflict_graph import ConflictGraph, iter_bits
+from constraints import ShowConstraints
+from roster_io import read_roster
+from scheduler import degree_weight, schedule_greedy
 
+CONSTRAINTS = ShowConstraints(
+    opener="Sol Jazz",
+    pinned={"Magic Mike": 14},
+)
 
-def add_edges(dances: set['Dance']):
-    for dance_1 in dances:
-        for dance_2 in dances:
-            if dance_1.name != dance_2.name and len(dance_1.dancers.intersection(dance_2.dancers)) > 0:
-                dance_1.add_nbr(dance_2)
 
-def weight_dances(dances: set['Dance']):
-    for dance in dances:
-        dance.calc_weight()
+def add_edges(dances: set['Dance']):
+    return conflict_graph.add_edges(dances)
 
 
-file = open("dances.txt")
+def load_dances(path) -> Tuple[List[Dance], Dict[str, Dancer]]:
+    """Dance objects for the roster in path, and every dancer by name"""
+    dances = []
+    all_dancers = {}
+    for name, dancer_names in read_roster(path).items():
+        dancers = set()
+        for dancer_str in dancer_names:
+            if dancer_str in all_dancers:
+                all_dancers[dancer_str].add_dance()
+            else:
+                all_dancers[dancer_str] = Dancer(dancer_str)
+            dancers.add(all_dancers[dancer_str])
+        dance = Dance(name, dancers)
+        dances.append(dance)
+    return dances, all_dancers
 
-dances = set()
-all_dancers = {}
 
-magic_mike = None
-olivia = None
+def perform(graph: ConflictGraph, order: Sequence[int], verbose: bool = False):
+    """Schedule the dances in order, printing each one and its dancers' time since their last dance when verbose"""
+    last_slot: Dict[int, int] = {}
+    for slot, dance in enumerate(order):
+        cast = list(iter_bits(graph.casts[dance]))
+        if verbose:
+            dancers = {f"{graph.dancer_names[dancer]}, {slot - last_slot.get(dancer, -math.inf)} since last dance"
+                       for dancer in cast}
+            print(f"Scheduled: {graph.dance_names[dance]}: {dancers}")
+        for dancer in cast:
+            last_slot[dancer] = slot
+        graph.dances[dance].schedule_dance()
 
-for line in file:
-    [name, dancers_str] = line.split(":")
-    dancers_names = set(dancers_str.strip().split(","))
-    dancers = set()
-    for dancer in dancers_names:
-        if dancer in all_dancers:
-            all_dancers[dancer].add_dance()
-        else:
-            all_dancers[dancer] = Dancer(dancer)
-        dancers.add(all_dancers[dancer])
-    dance = Dance(name, dancers)
-    dances.add(dance)
-    if (name == "Sol Jazz"):
-        dance.schedule_dance()
-        dances.remove(dance)
-        for dancer in dancers:
-            dancer.time_since_last_dance = 0
-    if (name == "Magic Mike"):
-        magic_mike = dance
-    if (name == "Olivia Contemp"):
-        olivia = dance
 
-add_edges(dances)
-weight_dances(dances)
+def main(path="dances.txt", constraints: Optional[ShowConstraints] = CONSTRAINTS,
+         verbose: bool = False) -> List[int]:
+    dances, _ = load_dances(path)
+    graph = add_edges(dances)
+    order = schedule_greedy(graph, weight=degree_weight, constraints=constraints)
+    perform(graph, order, verbose)
+    return order
 
-num_dance = 0
 
-while len(dances) != 0:
-    if num_dance == 13:
-        magic_mike.schedule_dance()
-        dances.remove(magic_mike)
-        # olivia.schedule_dance()
-        num_dance += 1
-        # dances.remove(olivia)
-        weight_dances(dances)
-        continue
-    max_dance = max(dances)
-    if max_dance.weight == - float('inf'):
-        print("All remaining dances share a member with this dance")
-    max_dance.schedule_dance()
-    dances.remove(max_dance)
-    weight_dances(dances)
-    for dancer in all_dancers.values():
-        dancer.time_since_last_dance += 1
-    num_dance += 1
+if __name__ == "__main__":
+    main(*sys.argv[1:2], verbose=True)